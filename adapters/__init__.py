@@ -1,13 +1,69 @@
+import os
+import subprocess
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, Dict, Iterator, List, Optional
 from models import App
+from utils.logger import setup_logger
+from utils.privileged import get_helper
+from utils.process import CancelToken, CommandCancelled, stream_command
+from utils.progress import ProgressParser
+
+logger = setup_logger('orbit.adapters')
+
+# pkexec exit statuses for a dismissed or failed authentication
+_PKEXEC_DENIED = (126, 127)
+
+def stat_fingerprint(*paths) -> str:
+    """
+    Build a cheap change stamp from the mtime and size of the given paths.
+
+    Missing paths contribute a placeholder, so a file appearing or
+    disappearing also changes the stamp.
+    """
+    parts = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_mtime_ns}:{st.st_size}")
+        except OSError:
+            parts.append(f"{path}:-")
+    return "|".join(parts)
 
 class PackageAdapter(ABC):
+    # Whether search_apps can find anything; adapters that cannot are
+    # skipped by remote searches
+    supports_search = False
+    # Seconds search results from this source stay valid in the search cache
+    SEARCH_TTL = 300
+    # Whether get_updates can tell which installed apps have updates
+    supports_update_check = False
+    # utils.versions scheme ordering this source's versions, if they can be
+    # compared; pending updates no newer than the installed version are ignored
+    version_scheme = None
+    # Output line of a batch command that starts work on a package; the
+    # first group is the package as the command names it
+    BATCH_PROGRESS = None
+    # utils.progress parser for the output of batch commands
+    PROGRESS_PARSER = ProgressParser
+    # Whether a batch command may be stopped at any point; otherwise it is
+    # only stopped before it starts changing packages
+    CANCEL_ANYTIME = False
+
     @abstractmethod
     def get_installed_apps(self) -> List[App]:
         """Returns a list of installed applications for this source."""
         pass
 
+    def iter_installed_apps(self) -> Iterator[List[App]]:
+        """
+        Yields installed applications in chunks as they are discovered.
+
+        Adapters that read long command output can override this so the
+        first results reach the UI early. The default yields everything
+        from get_installed_apps as a single chunk.
+        """
+        yield self.get_installed_apps()
+
     @abstractmethod
     def update_app(self, app_id: str) -> bool:
         """Updates the specified application. Returns True if successful."""
@@ -19,10 +75,218 @@ class PackageAdapter(ABC):
         pass
 
     @abstractmethod
-    def search_apps(self, query: str) -> List[App]:
-        """Searches for applications matching the query."""
+    def search_apps(self, query: str, token: CancelToken = None) -> List[App]:
+        """
+        Searches for applications matching the query.
+
+        Commands should be run with utils.process.run_command and the
+        token, so an abandoned search stops its processes. Sources that
+        stop at a result limit return models.SearchResults with truncated
+        set when they hit it.
+        """
         pass
 
+    def get_watch_paths(self) -> List[str]:
+        """Returns files or directories that change whenever installed apps change."""
+        return []
+
+    def get_fingerprint(self) -> Optional[str]:
+        """
+        Returns a cheap stamp of the source's installed state.
+
+        When the stamp is unchanged since the last refresh, the previous
+        results are reused instead of calling get_installed_apps again.
+        By default it is built from get_watch_paths; None means the source
+        is always queried.
+        """
+        paths = self.get_watch_paths()
+        return stat_fingerprint(*paths) if paths else None
+
+    def get_search_fingerprint(self) -> Optional[str]:
+        """
+        Returns a cheap stamp of the metadata search_apps reads.
+
+        Cached search results are dropped when it changes. None means the
+        cache relies on SEARCH_TTL alone.
+        """
+        return None
+
+    def get_batch_command(self, action: str, app_ids: List[str]) -> Optional[List[str]]:
+        """
+        Returns one command applying an action to several apps, if the source has one.
+
+        Args:
+            action: "install", "update" or "remove"
+            app_ids: Apps to act on
+
+        Returns:
+            The command, or None to act on the apps one at a time. Commands
+            needing root start with "pkexec" and must be one of the
+            operations helper.py accepts.
+        """
+        return None
+
+    def stream_command(self, command: List[str], on_line: Callable[[str], None], token: CancelToken = None,
+                       can_stop: Callable[[], bool] = None) -> int:
+        """
+        Run a command like utils.process.stream_command.
+
+        Commands starting with "pkexec" are run by the privileged helper,
+        which is authorized once per session, instead of a new pkexec.
+        """
+        if command[0] == "pkexec":
+            return get_helper().run(command[1:], on_line, token, can_stop)
+        return stream_command(command, on_line, token, can_stop)
+
+    def run_privileged(self, command: List[str]):
+        """
+        Run a command as root through the privileged helper, discarding its output.
+
+        Args:
+            command: Command and arguments, without pkexec
+
+        Raises:
+            subprocess.CalledProcessError: The command failed or was not authorized
+        """
+        try:
+            status = get_helper().run(command)
+        except FileNotFoundError:
+            raise
+        except (OSError, ValueError) as e:
+            logger.error(f"Privileged helper failed to run {command[0]}: {e}")
+            status = 1
+        if status != 0:
+            raise subprocess.CalledProcessError(status, command)
+
+    def update_apps(self, app_ids: List[str], on_package: Callable[[str], None] = None,
+                    token: CancelToken = None, on_progress: Callable = None) -> Dict[str, Optional[bool]]:
+        """
+        Updates several applications, in a single transaction when the source allows it.
+
+        Args:
+            app_ids: Apps to update
+            on_package: Called with an app id when work on that app starts
+            token: Optional token; cancelling it stops the operation at the
+                next point where that is safe
+            on_progress: Called as on_progress(app_id, event) with the
+                utils.progress.ProgressEvents parsed from the output; the
+                app id is None when the output does not name an app
+
+        Returns:
+            Mapping of app id -> whether it was updated, or None if it was
+            not attempted because the operation was cancelled
+        """
+        return self._run_batch("update", app_ids, self.update_app, on_package, token, on_progress)
+
+    def remove_apps(self, app_ids: List[str], on_package: Callable[[str], None] = None,
+                    token: CancelToken = None, on_progress: Callable = None) -> Dict[str, Optional[bool]]:
+        """Removes several applications, like update_apps."""
+        return self._run_batch("remove", app_ids, self.remove_app, on_package, token, on_progress)
+
+    def install_apps(self, app_ids: List[str], on_package: Callable[[str], None] = None,
+                     token: CancelToken = None, on_progress: Callable = None) -> Dict[str, Optional[bool]]:
+        """Installs several applications, like update_apps; sources without install_app fail them all."""
+        install_app = getattr(self, "install_app", None)
+        if install_app is None:
+            return {app_id: False for app_id in app_ids}
+        return self._run_batch("install", app_ids, install_app, on_package, token, on_progress)
+
+    def _run_batch(self, action: str, app_ids: List[str], run_single: Callable[[str], bool],
+                   on_package: Callable[[str], None] = None, token: CancelToken = None,
+                   on_progress: Callable = None) -> Dict[str, Optional[bool]]:
+        """
+        Run the batch command for an action, falling back to one command per app.
+
+        A failed batch does not tell which apps failed, so each app is then
+        retried on its own; apps the batch already handled succeed again
+        without work. A refused authentication is not retried, as that
+        would only ask again for every app.
+
+        Cancelling stops the batch command only while it resolves or
+        downloads packages (any time for sources with CANCEL_ANYTIME);
+        once packages are being changed it runs to completion, and only
+        the apps after it are skipped.
+
+        An exception running a lone app is raised rather than logged, so
+        the caller can report what went wrong.
+        """
+        command = self.get_batch_command(action, app_ids)
+        if command is not None:
+            names = {}
+            for app_id in app_ids:
+                names[app_id] = app_id
+                # Commands may name a package without the architecture or with its version
+                names.setdefault(app_id.split(":", 1)[0], app_id)
+
+            def resolve(name):
+                return (names.get(name) or names.get(name.split(":", 1)[0])
+                        or names.get(name.rsplit("-", 2)[0]) or names.get(name.rsplit("-", 3)[0]))
+
+            parser = self.PROGRESS_PARSER()
+
+            def on_line(line):
+                match = self.BATCH_PROGRESS.search(line) if self.BATCH_PROGRESS else None
+                if match and on_package:
+                    app_id = resolve(match.group(1))
+                    if app_id:
+                        on_package(app_id)
+                event = parser.feed(line)
+                if event is not None and on_progress:
+                    on_progress(resolve(event.package) if event.package else None, event)
+
+            # Sources that can stop at any point are killed right away, even
+            # when the command hangs without printing anything
+            can_stop = None if self.CANCEL_ANYTIME else (lambda: parser.phase in ("prepare", "download"))
+            try:
+                status = self.stream_command(command, on_line, token, can_stop)
+            except FileNotFoundError:
+                return {app_id: False for app_id in app_ids}
+            except CommandCancelled:
+                logger.info(f"Batch {action} of {len(app_ids)} apps cancelled")
+                return {app_id: None for app_id in app_ids}
+            if status == 0:
+                return {app_id: True for app_id in app_ids}
+            denied = command[0] == "pkexec" and status in _PKEXEC_DENIED
+            if denied:
+                logger.warning(f"Authorization refused for {command[1]}")
+            # A single app has nothing left to retry on its own
+            if denied or len(app_ids) == 1:
+                return {app_id: False for app_id in app_ids}
+            logger.warning(f"Batch {action} of {len(app_ids)} apps failed with status {status}, "
+                           f"retrying them one at a time")
+
+        results = {}
+        for app_id in app_ids:
+            if token is not None and token.cancelled:
+                results[app_id] = None
+                continue
+            if on_package:
+                on_package(app_id)
+            try:
+                results[app_id] = run_single(app_id)
+            except Exception as e:
+                if len(app_ids) == 1:
+                    raise
+                logger.error(f"Failed to {action} {app_id}: {e}")
+                results[app_id] = False
+        return results
+
+    def get_updates(self, token: CancelToken = None) -> Dict[str, str]:
+        """
+        Lists every installed app with a pending update, using a single command.
+
+        Failures must raise rather than return an empty mapping, so apps
+        are not wrongly reported as up to date.
+
+        Returns:
+            Mapping of app id -> version the update would install
+        """
+        return {}
+
+    def get_available_version(self, app_id: str) -> Optional[str]:
+        """Returns the version the source would install, or None if unknown."""
+        return None
+
     def get_details(self, app: App) -> App:
         """Retrieves detailed information for the application. Default implementation returns app as is."""
         return app
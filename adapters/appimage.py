@@ -41,6 +41,10 @@ class AppImageAdapter(PackageAdapter):
                 ))
         return apps
 
+    def get_watch_paths(self) -> List[str]:
+        # Adding, renaming or deleting a file updates its directory's mtime
+        return self.search_paths
+
     def update_app(self, app_id: str) -> bool:
         return False
 
@@ -54,5 +58,5 @@ class AppImageAdapter(PackageAdapter):
                 return False
         return False
 
-    def search_apps(self, query: str) -> List[App]:
+    def search_apps(self, query: str, token=None) -> List[App]:
         return []
@@ -1,52 +1,245 @@
+import glob
+import gzip
+import lzma
+import os
+import re
 import subprocess
-from typing import List
-from models import App, PackageSource, UpdateStatus
+from typing import Dict, Iterator, List, Optional
+from models import App, PackageSource, SearchResults, UpdateStatus
+from inventory import format_size
+from utils.process import CancelToken, run_command
+from utils.progress import AptProgressParser
+from utils.versions import DPKG
+from .catalog import Catalog, CatalogRecord
 from . import PackageAdapter
 
 class AptAdapter(PackageAdapter):
+    # Apps per chunk handed out by iter_installed_apps
+    CHUNK_SIZE = 250
+    # Package lists downloaded by apt update
+    LISTS_DIR = "/var/lib/apt/lists"
+    # Searches read the package lists, which only change on apt update
+    supports_search = True
+    SEARCH_TTL = 3600
+    supports_update_check = True
+    version_scheme = DPKG
+    # dpkg reports each package it unpacks, configures or removes
+    BATCH_PROGRESS = re.compile(r"^(?:Unpacking|Setting up|Removing) (\S+)")
+    PROGRESS_PARSER = AptProgressParser
+    # Stanza fields copied into the catalog
+    STANZA_FIELDS = {"Package", "Version", "Section", "Installed-Size", "Description", "Maintainer", "Homepage"}
+
+    def __init__(self):
+        # apt installs the newest version any list offers
+        self.catalog = Catalog('apt', versions=DPKG)
+        self._architectures = None
+
     def get_installed_apps(self) -> List[App]:
-        apps = []
+        return [app for chunk in self.iter_installed_apps() for app in chunk]
+
+    def iter_installed_apps(self) -> Iterator[List[App]]:
         try:
-            # Using dpkg-query for faster listing of installed packages
-            result = subprocess.run(
-                ["dpkg-query", "-W", "-f=${Package}\t${Version}\t${Description}\n"],
-                capture_output=True, text=True, check=True
+            # Using dpkg-query for faster listing of installed packages.
+            # binary:Package carries the :arch suffix for foreign-architecture
+            # and Multi-Arch: same packages, which keeps ids unique on
+            # multiarch systems.
+            proc = subprocess.Popen(
+                ["dpkg-query", "-W", "-f=${binary:Package}\t${Package}\t${Version}\t${Installed-Size}\t${Description}\n"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
             )
-            for line in result.stdout.strip().split('\n'):
-                parts = line.split('\t')
-                if len(parts) >= 2:
-                    pkg_name, version = parts[0], parts[1]
-                    summary = parts[2] if len(parts) > 2 else ""
+        except FileNotFoundError:
+            return
+
+        chunk = []
+        with proc:
+            for line in proc.stdout:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) >= 3:
+                    pkg_id, pkg_name, version = parts[0], parts[1], parts[2]
+                    # Installed-Size is in KiB and may be empty for virtual packages
+                    size_kib = parts[3] if len(parts) > 3 else ""
+                    summary = parts[4] if len(parts) > 4 else ""
                     # Filter for GUI apps usually involves checking .desktop files, 
                     # but for MVP we list packages. 
                     # Note: Listing ALL apt packages might be too many. 
                     # We might want to filter for 'Section: utils/games/graphics' etc later.
-                    apps.append(App(
-                        id=pkg_name,
+                    chunk.append(App(
+                        id=pkg_id,
                         name=pkg_name,
                         source=PackageSource.APT,
                         version=version,
                         summary=summary,
-                        sandboxed=False
+                        sandboxed=False,
+                        size=format_size(int(size_kib) * 1024) if size_kib.isdigit() else ""
                     ))
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            pass
-        return apps
+                if len(chunk) >= self.CHUNK_SIZE:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+
+    def get_watch_paths(self) -> List[str]:
+        # dpkg rewrites its status file on every install, upgrade and removal
+        return ["/var/lib/dpkg/status"]
 
     def update_app(self, app_id: str) -> bool:
-        # Requires root. Using pkexec for PolicyKit integration.
+        # Requires root; the privileged helper asks PolicyKit once per session
         try:
-            subprocess.run(["pkexec", "apt-get", "install", "--only-upgrade", "-y", app_id], check=True)
+            self.run_privileged(["apt-get", "install", "--only-upgrade", "-y", app_id])
             return True
         except subprocess.CalledProcessError:
             return False
 
     def remove_app(self, app_id: str) -> bool:
         try:
-            subprocess.run(["pkexec", "apt-get", "remove", "-y", app_id], check=True)
+            self.run_privileged(["apt-get", "remove", "-y", app_id])
+            return True
+        except subprocess.CalledProcessError:
+            return False
+
+    def get_batch_command(self, action: str, app_ids: List[str]) -> Optional[List[str]]:
+        if action == "update":
+            return ["pkexec", "apt-get", "-o", "APT::Status-Fd=1", "install", "--only-upgrade", "-y", *app_ids]
+        if action == "remove":
+            return ["pkexec", "apt-get", "-o", "APT::Status-Fd=1", "remove", "-y", *app_ids]
+        return None
+
+    def install_app(self, app_id: str) -> bool:
+        try:
+            self.run_privileged(["apt-get", "install", "-y", app_id])
             return True
         except subprocess.CalledProcessError:
             return False
 
-    def search_apps(self, query: str) -> List[App]:
-        return []
+    def search_apps(self, query: str, token=None) -> List[App]:
+        self._update_catalog()
+        records = self.catalog.search(query)
+        return SearchResults((record.to_app(PackageSource.APT, sandboxed=False) for record in records), records.truncated)
+
+    def get_search_fingerprint(self) -> str:
+        return "|".join(f"{path}={stamp}" for path, stamp in sorted(self._catalog_parts().items()))
+
+    def get_updates(self, token: CancelToken = None) -> Dict[str, str]:
+        # Lines look like "firefox/jammy-updates 120.0-1 amd64 [upgradable from: 119.0-1]"
+        result = run_command(["apt", "list", "--upgradable"], token=token)
+        upgradable = []
+        for line in result.stdout.splitlines():
+            if "/" not in line or "[upgradable" not in line:
+                continue
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            upgradable.append((parts[0].split("/", 1)[0], parts[2], parts[1]))
+        if not upgradable:
+            return {}
+
+        # Ids come from ${binary:Package}, which adds the architecture to
+        # foreign and Multi-Arch: same packages alike, so ask dpkg which form
+        # each installed package takes
+        names = sorted({name for name, _, _ in upgradable})
+        listed = run_command(["dpkg-query", "-W", "-f=${binary:Package}\n", *names], token=token, check=False)
+        installed = set(listed.stdout.split())
+        updates = {}
+        for name, arch, version in upgradable:
+            qualified = f"{name}:{arch}"
+            updates[qualified if qualified in installed else name] = version
+        return updates
+
+    def get_available_version(self, app_id: str) -> Optional[str]:
+        self._update_catalog()
+        records = self.catalog.lookup(app_id.split(':', 1)[0])
+        return records[0].version if records else None
+
+    def get_details(self, app: App) -> App:
+        # Long descriptions and homepages come from the package lists
+        self._update_catalog()
+        records = self.catalog.lookup(app.id.split(':', 1)[0])
+        if records:
+            record = records[0]
+            app.description = app.description or record.description or record.summary
+            app.homepage = app.homepage or record.homepage
+            app.developer = app.developer or record.developer
+            app.size = app.size or record.size
+        return app
+
+    def _update_catalog(self):
+        self.catalog.update(self._catalog_parts(), self._read_packages)
+
+    def _catalog_parts(self) -> Dict[str, str]:
+        """Package list files for the native architectures, with their stamps."""
+        parts = {}
+        for path in sorted(glob.glob(os.path.join(self.LISTS_DIR, "*_Packages*"))):
+            if not path.endswith(("_Packages", ".gz", ".xz")):
+                continue
+            arch = path.rsplit("_binary-", 1)[1].split("_", 1)[0] if "_binary-" in path else "all"
+            architectures = self._get_architectures()
+            if architectures and arch not in architectures:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            parts[path] = f"{st.st_mtime_ns}:{st.st_size}"
+        return parts
+
+    def _get_architectures(self) -> set:
+        """
+        Native architecture plus "all", so lists for foreign architectures
+        are left out. Empty if dpkg cannot tell, in which case every list
+        is indexed.
+        """
+        if self._architectures is None:
+            try:
+                result = subprocess.run(["dpkg", "--print-architecture"], capture_output=True, text=True, check=True)
+                self._architectures = {"all", result.stdout.strip()}
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                self._architectures = set()
+        return self._architectures
+
+    def _read_packages(self, path: str) -> Iterator[CatalogRecord]:
+        """Parse the stanzas of a Packages file."""
+        if path.endswith(".gz"):
+            f = gzip.open(path, "rt", encoding="utf-8", errors="replace")
+        elif path.endswith(".xz"):
+            f = lzma.open(path, "rt", encoding="utf-8", errors="replace")
+        else:
+            f = open(path, encoding="utf-8", errors="replace")
+
+        with f:
+            fields = {}
+            description = []
+            in_description = False
+            for line in f:
+                if line[0] in " \t":
+                    if in_description:
+                        text = line.strip()
+                        description.append("" if text == "." else text)
+                    continue
+                if line == "\n":
+                    if "Package" in fields:
+                        yield self._make_record(fields, description)
+                    fields = {}
+                    description = []
+                    in_description = False
+                    continue
+                key, _, value = line.partition(":")
+                in_description = key == "Description"
+                if key in self.STANZA_FIELDS:
+                    fields[key] = value.strip()
+            if "Package" in fields:
+                yield self._make_record(fields, description)
+
+    @staticmethod
+    def _make_record(fields: dict, description: List[str]) -> CatalogRecord:
+        size_kib = fields.get("Installed-Size", "")
+        return CatalogRecord(
+            id=fields["Package"],
+            name=fields["Package"],
+            version=fields.get("Version", ""),
+            summary=fields.get("Description", ""),
+            description="\n".join(description),
+            section=fields.get("Section", ""),
+            size=format_size(int(size_kib) * 1024) if size_kib.isdigit() else "",
+            developer=fields.get("Maintainer", ""),
+            homepage=fields.get("Homepage", "")
+        )
@@ -0,0 +1,391 @@
+"""Offline package catalogs built from the metadata package managers keep on disk."""
+
+import hashlib
+import mmap
+import os
+import re
+import struct
+import threading
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from models import App, PackageSource, SearchResults
+from utils.logger import setup_logger
+from utils.versions import VersionScheme
+
+logger = setup_logger('orbit.catalog')
+
+@dataclass(slots=True)
+class CatalogRecord:
+    """One available package as described by repository metadata."""
+    id: str
+    name: str = ""
+    version: str = ""
+    summary: str = ""
+    description: str = ""
+    section: str = ""
+    size: str = ""
+    developer: str = ""
+    license: str = ""
+    homepage: str = ""
+    icon: str = ""
+
+    def to_app(self, source: PackageSource, **overrides) -> App:
+        """Build an uninstalled App for search results."""
+        values = dict(
+            id=self.id,
+            name=self.name or self.id,
+            source=source,
+            version=self.version,
+            summary=self.summary,
+            size=self.size,
+            is_installed=False
+        )
+        if self.icon:
+            values['icon'] = self.icon
+        values.update(overrides)
+        app = App(**values)
+        app.description = self.description
+        app.developer = self.developer
+        app.license = self.license
+        app.homepage = self.homepage
+        return app
+
+_FIELDS = [f.name for f in fields(CatalogRecord)]
+_FIELD_COUNT = len(_FIELDS)
+_WHITESPACE = re.compile(r'\s+')
+_ESCAPES = re.compile(r'\\(.)')
+_UNESCAPED = {'t': '\t', 'n': '\n', '\\': '\\'}
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+def _unescape(value: str) -> str:
+    if '\\' not in value:
+        return value
+    return _ESCAPES.sub(lambda m: _UNESCAPED.get(m.group(1), m.group(1)), value)
+
+def _search_key(record: CatalogRecord) -> bytes:
+    """Lowercase text matched by searches; starts with the id so lookups can bisect."""
+    text = _WHITESPACE.sub(' ', f"{record.name} {record.summary}".lower()).strip()
+    return f"{record.id.lower()} {text}".encode()
+
+class CatalogIndex:
+    """
+    One memory-mapped index file.
+
+    The file has a small header, a search section and a record section.
+    The search section holds one sorted, lowercase line per package,
+    "<id> <name> <summary>\\t<record offset>", so a query is a plain
+    byte search over compact text and a lookup by id is a binary search.
+    The record section holds the escaped, tab-separated fields, which
+    are only decoded for packages that are returned.
+    """
+
+    MAGIC = b'ORBITCAT'
+    VERSION = 1
+    _HEADER = struct.Struct('>8sHHQ')
+
+    def __init__(self, path: Path, file, data: mmap.mmap, stamp: str, search_start: int, records_start: int):
+        self.path = path
+        self.stamp = stamp
+        self._file = file
+        self._data = data
+        self._search_start = search_start
+        self._records_start = records_start
+
+    @classmethod
+    def write(cls, path: Path, stamp: str, records: Iterable[CatalogRecord]):
+        """Build an index file from records, replacing any previous one."""
+        entries = sorted(((_search_key(record), record) for record in records if record.id),
+                         key=lambda entry: entry[0])
+        search_lines = []
+        record_lines = []
+        offset = 0
+        for key, record in entries:
+            line = ('\t'.join([_escape(getattr(record, name)) for name in _FIELDS]) + '\n').encode()
+            search_lines.append(key + b'\t%x\n' % offset)
+            record_lines.append(line)
+            offset += len(line)
+        search = b''.join(search_lines)
+        stamp_bytes = stamp.encode()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(cls._HEADER.pack(cls.MAGIC, cls.VERSION, len(stamp_bytes), len(search)))
+            f.write(stamp_bytes)
+            f.write(search)
+            f.writelines(record_lines)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path: Path) -> Optional['CatalogIndex']:
+        """Map an index file, or return None if it is missing or from another version."""
+        try:
+            file = open(path, 'rb')
+        except OSError:
+            return None
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, stamp_length, search_length = cls._HEADER.unpack_from(data, 0)
+            if magic != cls.MAGIC or version != cls.VERSION:
+                data.close()
+                file.close()
+                return None
+        except (OSError, ValueError, struct.error):
+            file.close()
+            return None
+        search_start = cls._HEADER.size + stamp_length
+        stamp = data[cls._HEADER.size:search_start].decode()
+        return cls(path, file, data, stamp, search_start, search_start + search_length)
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+    def search(self, tokens: List[bytes], limit: int) -> Tuple[List[tuple], bool]:
+        """
+        Find packages whose search key contains every token.
+
+        Packages whose id starts with the first token are collected first,
+        from the sorted position of that token; the rest of the section is
+        then scanned for the longest token. Each step stops after limit
+        matches, so broad queries cost about the same as narrow ones.
+
+        Returns:
+            List of (search key, record offset) pairs, and whether a step
+            stopped at the limit, in which case more packages may match
+        """
+        data = self._data
+        matches = {}  # line start -> (search key, record offset)
+
+        position = self._lower_bound(tokens[0])
+        while position < self._records_start and len(matches) < limit:
+            line_end = data.find(b'\n', position, self._records_start)
+            key, offset = data[position:line_end].rsplit(b'\t', 1)
+            if not key.startswith(tokens[0]):
+                break
+            if all(token in key for token in tokens):
+                matches[position] = (key, int(offset, 16))
+            position = line_end + 1
+        truncated = len(matches) >= limit
+
+        # Scan for the longest word; the others are checked per line
+        needle = max(tokens, key=len)
+        found = 0
+        position = data.find(needle, self._search_start, self._records_start)
+        while position != -1 and found < limit:
+            line_start = data.rfind(b'\n', self._search_start, position) + 1 or self._search_start
+            line_end = data.find(b'\n', position, self._records_start)
+            tab = data.rfind(b'\t', line_start, line_end)
+            # Hits in the offset column do not count
+            if position + len(needle) <= tab:
+                key = data[line_start:tab]
+                if all(token in key for token in tokens):
+                    found += 1
+                    matches[line_start] = (key, int(data[tab + 1:line_end], 16))
+            # Continue on the next line
+            position = data.find(needle, line_end, self._records_start)
+        return list(matches.values()), truncated or found >= limit
+
+    def lookup(self, app_id: str) -> List[int]:
+        """Return the record offsets of packages whose id matches exactly."""
+        data = self._data
+        prefix = app_id.lower().encode() + b' '
+        offsets = []
+        position = self._lower_bound(prefix)
+        while position < self._records_start:
+            line_end = data.find(b'\n', position, self._records_start)
+            line = data[position:line_end]
+            if not line.startswith(prefix):
+                break
+            offsets.append(int(line.rsplit(b'\t', 1)[1], 16))
+            position = line_end + 1
+        return [offset for offset in offsets if self.record(offset).id == app_id]
+
+    def _lower_bound(self, prefix: bytes) -> int:
+        """Start of the first search line that sorts at or after prefix."""
+        data = self._data
+        low, high = self._search_start, self._records_start
+        while low < high:
+            middle = (low + high) // 2
+            line_start = data.rfind(b'\n', self._search_start, middle) + 1 or self._search_start
+            line_end = data.find(b'\n', middle, self._records_start)
+            if line_end == -1:
+                line_end = self._records_start
+            if data[line_start:line_end] < prefix:
+                low = line_end + 1
+            else:
+                high = line_start
+        return low
+
+    def record(self, offset: int) -> CatalogRecord:
+        """Decode the record stored at the given offset of the record section."""
+        start = self._records_start + offset
+        end = self._data.find(b'\n', start)
+        values = self._data[start:end].decode().split('\t')
+        if len(values) != _FIELD_COUNT:
+            values = (values + [''] * _FIELD_COUNT)[:_FIELD_COUNT]
+        return CatalogRecord(*(_unescape(value) for value in values))
+
+class Catalog:
+    """
+    Searchable catalog of available packages for one source.
+
+    Repository metadata usually comes as several files (one per
+    repository or list). Each file, called a part here, gets its own
+    index under ~/.cache/orbit/catalog/<name>/, stamped with the state of
+    the file it was built from. update() rebuilds only the parts whose
+    stamp changed, so refreshing one repository does not re-parse the
+    others.
+
+    A package offered by several parts resolves to its newest version
+    when the catalog has a version scheme, and to the first part that has
+    it otherwise.
+    """
+
+    # Results returned by a search, best match first
+    SEARCH_LIMIT = 200
+
+    def __init__(self, name: str, cache_dir: str = None, versions: VersionScheme = None):
+        base = Path(cache_dir) if cache_dir else Path.home() / '.cache' / 'orbit' / 'catalog'
+        self.name = name
+        self.versions = versions
+        self.index_dir = base / name
+        self._lock = threading.Lock()
+        self._parts = {}  # part -> CatalogIndex
+
+    def update(self, parts: Dict[str, str], build: Callable[[str], Iterable[CatalogRecord]]):
+        """
+        Bring the catalog in line with the metadata on disk.
+
+        Args:
+            parts: Every current part (usually a metadata file path) mapped
+                to a stamp of its state, such as an mtime or checksum
+            build: Called as build(part) to read the records of a part
+                whose index is missing or stale
+        """
+        with self._lock:
+            for part in list(self._parts):
+                if part not in parts:
+                    self._parts.pop(part).close()
+
+            for part, stamp in parts.items():
+                index = self._parts.get(part)
+                if index is not None and index.stamp == stamp:
+                    continue
+                if index is not None:
+                    index.close()
+                path = self._index_path(part)
+                index = CatalogIndex.open(path)
+                if index is None or index.stamp != stamp:
+                    if index is not None:
+                        index.close()
+                    try:
+                        CatalogIndex.write(path, stamp, build(part))
+                    except Exception as e:
+                        # A damaged metadata file must not break searching the others
+                        logger.warning(f"Could not index {part}: {e}")
+                        self._parts.pop(part, None)
+                        continue
+                    logger.info(f"Indexed {self.name} metadata from {part}")
+                    index = CatalogIndex.open(path)
+                if index is None:
+                    self._parts.pop(part, None)
+                else:
+                    self._parts[part] = index
+
+            # Indexes of parts that disappeared while Orbit was not running
+            current = {self._index_path(part).name for part in parts}
+            for path in self.index_dir.glob('*.idx'):
+                if path.name not in current:
+                    self._remove(path)
+
+    @property
+    def fingerprint(self) -> str:
+        """Stamp of every indexed part, for caches built on top of the catalog."""
+        with self._lock:
+            return '|'.join(f"{part}={index.stamp}" for part, index in sorted(self._parts.items()))
+
+    def search(self, query: str, limit: int = None) -> SearchResults:
+        """
+        Find packages whose id, name or summary contain every word of the query.
+
+        Packages found in several parts are returned once, with their
+        newest version or from the first part in the order given to
+        update() (see the class description).
+
+        Returns:
+            Matching records, best match first; truncated is set when the
+            search stopped at the limit
+        """
+        tokens = [token.encode() for token in query.lower().split()]
+        if not tokens:
+            return SearchResults()
+        limit = limit or self.SEARCH_LIMIT
+
+        with self._lock:
+            found = {}  # package id -> (negated score, search key, index, record offset)
+            truncated = False
+            for index in self._parts.values():
+                matches, stopped = index.search(tokens, limit)
+                truncated = truncated or stopped
+                for key, offset in matches:
+                    app_id = key.split(b' ', 1)[0]
+                    if app_id in found:
+                        if self.versions is not None:
+                            found[app_id] = self._newer(found[app_id], (index, offset))
+                        continue
+                    found[app_id] = (-self._score(app_id, key, tokens), key, index, offset)
+            ranked = sorted(found.values(), key=lambda item: (item[0], item[1]))
+            records = [index.record(offset) for _, _, index, offset in ranked[:limit]]
+            return SearchResults(records, truncated or len(ranked) > limit)
+
+    def lookup(self, app_id: str) -> List[CatalogRecord]:
+        """
+        Return every record of the package with the given id.
+
+        Returns:
+            Records newest first when the catalog has a version scheme,
+            in part order otherwise
+        """
+        with self._lock:
+            records = [index.record(offset) for index in self._parts.values() for offset in index.lookup(app_id)]
+        if self.versions is not None and len(records) > 1:
+            # Stable, so equal versions keep part order
+            records.sort(key=lambda record: self.versions.key(record.version), reverse=True)
+        return records
+
+    def _newer(self, current: tuple, candidate: tuple) -> tuple:
+        """Keep the search entry of whichever record has the newer version."""
+        score, key, index, offset = current
+        candidate_index, candidate_offset = candidate
+        if self.versions.compare(candidate_index.record(candidate_offset).version,
+                                 index.record(offset).version) > 0:
+            return score, key, candidate_index, candidate_offset
+        return current
+
+    @staticmethod
+    def _score(app_id: bytes, key: bytes, tokens: List[bytes]) -> int:
+        score = 0
+        for token in tokens:
+            if token == app_id:
+                score += 100
+            elif app_id.startswith(token):
+                score += 60
+            elif token in app_id:
+                score += 40
+            else:
+                score += 10
+        return score
+
+    def _index_path(self, part: str) -> Path:
+        return self.index_dir / (hashlib.sha1(part.encode()).hexdigest()[:16] + '.idx')
+
+    @staticmethod
+    def _remove(path: Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
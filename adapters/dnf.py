@@ -1,9 +1,56 @@
+import bz2
+import glob
+import gzip
+import lzma
+import os
+import re
+import shutil
+import sqlite3
 import subprocess
-from typing import List
-from models import App, PackageSource, UpdateStatus
+import tempfile
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional
+from models import App, PackageSource, SearchResults, UpdateStatus
+from inventory import format_size
+from utils.process import CancelToken, run_command
+from utils.progress import DnfProgressParser
+from utils.versions import RPM
+from .catalog import Catalog, CatalogRecord
 from . import PackageAdapter
 
+_REPO_NS = "{http://linux.duke.edu/metadata/repo}"
+_COMMON_NS = "{http://linux.duke.edu/metadata/common}"
+_RPM_NS = "{http://linux.duke.edu/metadata/rpm}"
+
+_OPENERS = {".gz": gzip.open, ".xz": lzma.open, ".bz2": bz2.open}
+
+def _open_metadata(path: str):
+    """Open a metadata file for binary reading, decompressing it if needed."""
+    opener = _OPENERS.get(os.path.splitext(path)[1], open)
+    return opener(path, "rb")
+
 class DnfAdapter(PackageAdapter):
+    RPMDB_PATHS = [
+        "/usr/lib/sysimage/rpm/rpmdb.sqlite",
+        "/var/lib/rpm/rpmdb.sqlite",
+        "/var/lib/rpm/Packages",
+    ]
+    # Repository metadata caches of dnf and dnf5, one directory per repository
+    CACHE_DIRS = ["/var/cache/dnf", "/var/cache/libdnf5"]
+    # Searches read the cached repodata, which only changes on a metadata refresh
+    supports_search = True
+    SEARCH_TTL = 3600
+    supports_update_check = True
+    version_scheme = RPM
+    # Transaction lines name the full NEVRA, e.g. "Upgrading : vim-2:9.1-1.fc39.x86_64"
+    # (dnf) or "[2/6] Upgrading vim-2:9.1-1.fc39.x86_64" (dnf5)
+    BATCH_PROGRESS = re.compile(r"^\s*(?:\[\d+/\d+\]\s*)?(?:Upgrading|Erasing|Removing)\s*:?\s+(\S+)")
+    PROGRESS_PARSER = DnfProgressParser
+
+    def __init__(self):
+        # dnf installs the newest version any repository offers
+        self.catalog = Catalog('dnf', versions=RPM)
+
     def get_installed_apps(self) -> List[App]:
         apps = []
         try:
@@ -17,7 +64,7 @@ class DnfAdapter(PackageAdapter):
             for line in lines:
                 parts = line.split()
                 if len(parts) >= 2:
-                    pkg_name = parts[0].split('.')[0] # Remove architecture e.g. .x86_64
+                    pkg_name = parts[0].rsplit('.', 1)[0] # Remove architecture e.g. .x86_64
                     version = parts[1]
                     apps.append(App(
                         id=pkg_name,
@@ -30,19 +77,205 @@ class DnfAdapter(PackageAdapter):
             pass
         return apps
 
+    def get_watch_paths(self) -> List[str]:
+        return self.RPMDB_PATHS
+
     def update_app(self, app_id: str) -> bool:
         try:
-            subprocess.run(["pkexec", "dnf", "upgrade", "-y", app_id], check=True)
+            self.run_privileged(["dnf", "upgrade", "-y", app_id])
             return True
         except subprocess.CalledProcessError:
             return False
 
     def remove_app(self, app_id: str) -> bool:
         try:
-            subprocess.run(["pkexec", "dnf", "remove", "-y", app_id], check=True)
+            self.run_privileged(["dnf", "remove", "-y", app_id])
             return True
         except subprocess.CalledProcessError:
             return False
 
-    def search_apps(self, query: str) -> List[App]:
-        return []
+    def get_batch_command(self, action: str, app_ids: List[str]) -> Optional[List[str]]:
+        if action == "update":
+            return ["pkexec", "dnf", "upgrade", "-y", *app_ids]
+        if action == "remove":
+            return ["pkexec", "dnf", "remove", "-y", *app_ids]
+        return None
+
+    def install_app(self, app_id: str) -> bool:
+        try:
+            self.run_privileged(["dnf", "install", "-y", app_id])
+            return True
+        except subprocess.CalledProcessError:
+            return False
+
+    def search_apps(self, query: str, token=None) -> List[App]:
+        self._update_catalog()
+        records = self.catalog.search(query)
+        return SearchResults((record.to_app(PackageSource.DNF, sandboxed=False) for record in records), records.truncated)
+
+    def get_search_fingerprint(self) -> str:
+        return "|".join(f"{repomd}={stamp}" for repomd, stamp in sorted(self._catalog_parts().items()))
+
+    def get_updates(self, token: CancelToken = None) -> Dict[str, str]:
+        # Lines look like "firefox.x86_64   120.0-1.fc39   updates"
+        result = run_command(["dnf", "check-update", "--quiet"], token=token, check=False)
+        # 100 means updates are available, 0 that there are none
+        if result.returncode not in (0, 100):
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+        updates = {}
+        pending = ""
+        for line in result.stdout.splitlines():
+            if line.startswith("Obsoleting"):
+                break
+            # Long package names push the rest of the entry onto the next line
+            parts = (pending + " " + line).split()
+            pending = ""
+            if len(parts) == 1 and "." in parts[0]:
+                pending = parts[0]
+            elif len(parts) == 3 and "." in parts[0]:
+                # Ids are listed without the architecture
+                updates[parts[0].rsplit(".", 1)[0]] = parts[1]
+        return updates
+
+    def get_available_version(self, app_id: str) -> Optional[str]:
+        self._update_catalog()
+        records = self.catalog.lookup(app_id)
+        return records[0].version if records else None
+
+    def get_details(self, app: App) -> App:
+        self._update_catalog()
+        records = self.catalog.lookup(app.id)
+        if records:
+            record = records[0]
+            app.description = app.description or record.description or record.summary
+            app.license = app.license or record.license
+            app.homepage = app.homepage or record.homepage
+            app.developer = app.developer or record.developer
+            app.size = app.size or record.size
+        return app
+
+    def _update_catalog(self):
+        self.catalog.update(self._catalog_parts(), self._read_repository)
+
+    def _catalog_parts(self) -> Dict[str, str]:
+        """
+        repomd.xml of every cached repository, stamped with the checksum
+        of the primary metadata it points to.
+        """
+        parts = {}
+        for cache_dir in self.CACHE_DIRS:
+            for repomd in sorted(glob.glob(os.path.join(cache_dir, "*", "repodata", "repomd.xml"))):
+                primary = self._find_primary(repomd)
+                if primary:
+                    parts[repomd] = f"{primary[1]}:{primary[2]}"
+        return parts
+
+    @staticmethod
+    def _find_primary(repomd: str) -> Optional[tuple]:
+        """
+        Locate the cached primary metadata of a repository.
+
+        Returns:
+            (path, kind, checksum) with kind "primary_db" or "primary",
+            or None if repomd.xml is unreadable or no usable file is cached
+        """
+        try:
+            root = ET.parse(repomd).getroot()
+        except (OSError, ET.ParseError):
+            return None
+        repo_dir = os.path.dirname(os.path.dirname(repomd))
+        entries = {data.get("type"): data for data in root.iter(f"{_REPO_NS}data")}
+        # The sqlite database is faster to read than the XML
+        for kind in ("primary_db", "primary"):
+            data = entries.get(kind)
+            if data is None:
+                continue
+            location = data.find(f"{_REPO_NS}location")
+            checksum = data.find(f"{_REPO_NS}checksum")
+            if location is None or checksum is None:
+                continue
+            path = os.path.join(repo_dir, location.get("href", ""))
+            # zchunk (.zck) files need libzck; fall back to another format
+            if os.path.exists(path) and os.path.splitext(path)[1] in (".sqlite", ".xml", *_OPENERS):
+                return path, kind, checksum.text.strip()
+        return None
+
+    def _read_repository(self, repomd: str) -> Iterator[CatalogRecord]:
+        primary = self._find_primary(repomd)
+        if primary is None:
+            return
+        path, kind, _ = primary
+        if kind == "primary_db":
+            yield from self._read_primary_db(path)
+        else:
+            yield from self._read_primary_xml(path)
+
+    def _read_primary_db(self, path: str) -> Iterator[CatalogRecord]:
+        """Read packages from primary.sqlite, decompressing it to a temporary file first."""
+        with tempfile.TemporaryDirectory(prefix="orbit-dnf-") as tmp_dir:
+            database = path
+            if not path.endswith(".sqlite"):
+                database = os.path.join(tmp_dir, "primary.sqlite")
+                with _open_metadata(path) as src, open(database, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            connection = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+            try:
+                rows = connection.execute(
+                    "SELECT name, epoch, version, release, summary, description, url,"
+                    " rpm_license, rpm_packager, rpm_group, size_installed"
+                    " FROM packages WHERE arch != 'src'"
+                )
+                for name, epoch, version, release, summary, description, url, license, packager, group, size in rows:
+                    yield self._make_record(name, epoch, version, release, summary, description,
+                                            url, license, packager, group, size)
+            finally:
+                connection.close()
+
+    def _read_primary_xml(self, path: str) -> Iterator[CatalogRecord]:
+        """Stream packages out of primary.xml without building the whole tree."""
+        with _open_metadata(path) as f:
+            root = None
+            for event, element in ET.iterparse(f, events=("start", "end")):
+                if root is None:
+                    root = element
+                if event != "end" or element.tag != f"{_COMMON_NS}package":
+                    continue
+                if element.findtext(f"{_COMMON_NS}arch") != "src":
+                    version = element.find(f"{_COMMON_NS}version")
+                    size = element.find(f"{_COMMON_NS}size")
+                    rpm_format = element.find(f"{_COMMON_NS}format")
+                    yield self._make_record(
+                        element.findtext(f"{_COMMON_NS}name"),
+                        version.get("epoch") if version is not None else None,
+                        version.get("ver") if version is not None else "",
+                        version.get("rel") if version is not None else "",
+                        element.findtext(f"{_COMMON_NS}summary"),
+                        element.findtext(f"{_COMMON_NS}description"),
+                        element.findtext(f"{_COMMON_NS}url"),
+                        rpm_format.findtext(f"{_RPM_NS}license") if rpm_format is not None else "",
+                        element.findtext(f"{_COMMON_NS}packager"),
+                        rpm_format.findtext(f"{_RPM_NS}group") if rpm_format is not None else "",
+                        size.get("installed") if size is not None else None
+                    )
+                # Drop parsed packages so memory stays flat
+                root.clear()
+
+    @staticmethod
+    def _make_record(name, epoch, version, release, summary, description,
+                     url, license, packager, group, size) -> CatalogRecord:
+        full_version = f"{version}-{release}" if release else (version or "")
+        if epoch and str(epoch) != "0":
+            full_version = f"{epoch}:{full_version}"
+        size = str(size or "")
+        return CatalogRecord(
+            id=name or "",
+            name=name or "",
+            version=full_version,
+            summary=summary or "",
+            description=description or "",
+            section=group or "",
+            size=format_size(int(size)) if size.isdigit() else "",
+            developer=packager or "",
+            license=license or "",
+            homepage=url or ""
+        )
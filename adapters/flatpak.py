@@ -1,16 +1,46 @@
+import glob
+import gzip
 import os
+import re
 import subprocess
-from typing import List
-from models import App, PackageSource, UpdateStatus
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional
+from models import App, PackageSource, SearchResults, UpdateStatus
+from utils.process import CancelToken, run_command
+from utils.progress import FlatpakProgressParser
+from .catalog import Catalog, CatalogRecord
 from . import PackageAdapter
 
+_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
 class FlatpakAdapter(PackageAdapter):
+    supports_search = True
+    # Searches read the local appstream copy, which only changes when it is refreshed
+    SEARCH_TTL = 3600
+
+    INSTALLATIONS = [
+        "/var/lib/flatpak",
+        os.path.expanduser("~/.local/share/flatpak"),
+    ]
+    supports_update_check = True
+    # Lines look like "Updating org.gnome.Maps/x86_64/stable" or
+    # "Uninstalling app/org.gnome.Maps/x86_64/stable"
+    BATCH_PROGRESS = re.compile(r"^\s*(?:Updating|Uninstalling)\S*:?\s+(?:app/)?([A-Za-z0-9_.-]+)")
+    PROGRESS_PARSER = FlatpakProgressParser
+    # Flatpak deploys each ref atomically, so stopping it never leaves an app half updated
+    CANCEL_ANYTIME = True
+    # Largest cached appstream icon worth loading
+    ICON_SIZE = 128
+
+    def __init__(self):
+        self.catalog = Catalog('flatpak')
+
     def get_installed_apps(self) -> List[App]:
         apps = []
         try:
-            # --columns=application,name,version,options
+            # --columns=application,name,version,options,size
             result = subprocess.run(
-                ["flatpak", "list", "--columns=application,name,version,options"],
+                ["flatpak", "list", "--columns=application,name,version,options,size"],
                 capture_output=True, text=True, check=True
             )
             for line in result.stdout.strip().split('\n'):
@@ -19,17 +49,40 @@ class FlatpakAdapter(PackageAdapter):
                 if len(parts) >= 3:
                     app_id, name, version = parts[0], parts[1], parts[2]
                     options = parts[3] if len(parts) > 3 else ""
+                    size = parts[4] if len(parts) > 4 else ""
                     apps.append(App(
                         id=app_id,
                         name=name,
                         source=PackageSource.FLATPAK,
                         version=version,
-                        sandboxed=True # Flatpaks are sandboxed by default
+                        sandboxed=True, # Flatpaks are sandboxed by default
+                        size=size
                     ))
         except (subprocess.CalledProcessError, FileNotFoundError):
             pass
         return apps
 
+    def get_watch_paths(self) -> List[str]:
+        # flatpak touches .changed in the installation after every transaction
+        paths = []
+        for installation in self.INSTALLATIONS:
+            for entry in (".changed", "app", "runtime", "repo"):
+                paths.append(os.path.join(installation, entry))
+        return paths
+
+    def get_search_fingerprint(self) -> str:
+        return "|".join(f"{active}={stamp}" for active, stamp in self._catalog_parts().items())
+
+    def get_updates(self, token: CancelToken = None) -> Dict[str, str]:
+        # Covers both the system and the user installation
+        result = run_command(["flatpak", "remote-ls", "--updates", "--columns=application,version"], token=token)
+        updates = {}
+        for line in result.stdout.splitlines():
+            parts = line.split("\t")
+            if parts[0]:
+                updates[parts[0]] = parts[1] if len(parts) > 1 else ""
+        return updates
+
     def update_app(self, app_id: str) -> bool:
         try:
             subprocess.run(["flatpak", "update", "-y", app_id], check=True)
@@ -44,14 +97,27 @@ class FlatpakAdapter(PackageAdapter):
         except subprocess.CalledProcessError:
             return False
 
-    def search_apps(self, query: str) -> List[App]:
+    def get_batch_command(self, action: str, app_ids: List[str]) -> Optional[List[str]]:
+        # Refs are updated or removed one by one, so a failure leaves the others done
+        if action == "update":
+            return ["flatpak", "update", "-y", "--noninteractive", *app_ids]
+        if action == "remove":
+            return ["flatpak", "uninstall", "-y", "--noninteractive", *app_ids]
+        return None
+
+    def search_apps(self, query: str, token: CancelToken = None) -> List[App]:
+        if self._update_catalog():
+            records = self.catalog.search(query)
+            return SearchResults((record.to_app(PackageSource.FLATPAK, sandboxed=True) for record in records),
+                                 records.truncated)
+        # No appstream data on disk yet; let flatpak search the remotes
+        return self._run_search(query, token)
+
+    def _run_search(self, query: str, token: CancelToken = None) -> List[App]:
         apps = []
         try:
             # flatpak search --columns=application,name,version,description
-            result = subprocess.run(
-                ["flatpak", "search", "--columns=application,name,version,description", query],
-                capture_output=True, text=True, check=True
-            )
+            result = run_command(["flatpak", "search", "--columns=application,name,version,description", query], token=token)
             for line in result.stdout.strip().split('\n'):
                 if not line: continue
                 parts = line.split('\t')
@@ -85,6 +151,20 @@ class FlatpakAdapter(PackageAdapter):
             return False
 
     def get_details(self, app: App) -> App:
+        # Descriptions, homepages and icons come from the appstream catalog
+        if self._update_catalog():
+            records = self.catalog.lookup(app.id)
+            if records:
+                record = records[0]
+                app.description = app.description or record.description or record.summary
+                app.homepage = app.homepage or record.homepage
+                app.license = app.license or record.license
+                app.developer = app.developer or record.developer
+                if record.icon:
+                    app.icon = record.icon
+        if not app.is_installed:
+            return app
+
         try:
             # flatpak info <app_id>
             # We can use specific columns to make parsing easier
@@ -119,3 +199,101 @@ class FlatpakAdapter(PackageAdapter):
         except subprocess.CalledProcessError:
             pass
         return app
+
+    def _update_catalog(self) -> bool:
+        """Index changed appstream data; returns False if there is none on disk."""
+        parts = self._catalog_parts()
+        self.catalog.update(parts, self._read_appstream)
+        return bool(parts)
+
+    def _catalog_parts(self) -> Dict[str, str]:
+        """
+        The active appstream directory of every remote and architecture,
+        stamped with the checksum directory the "active" symlink points to.
+        """
+        parts = {}
+        for installation in self.INSTALLATIONS:
+            for active in sorted(glob.glob(os.path.join(installation, "appstream", "*", "*", "active"))):
+                try:
+                    # Refreshing a remote's appstream repoints the symlink
+                    parts[active] = os.readlink(active) if os.path.islink(active) else str(os.stat(active).st_mtime_ns)
+                except OSError:
+                    continue
+        return parts
+
+    def _read_appstream(self, active: str) -> Iterator[CatalogRecord]:
+        """Stream the components of a remote's appstream XML."""
+        remote = os.path.basename(os.path.dirname(os.path.dirname(active)))
+        path = os.path.join(active, "appstream.xml.gz")
+        if os.path.exists(path):
+            f = gzip.open(path, "rb")
+        else:
+            f = open(os.path.join(active, "appstream.xml"), "rb")
+
+        with f:
+            root = None
+            for event, element in ET.iterparse(f, events=("start", "end")):
+                if root is None:
+                    root = element
+                    continue
+                if event == "end" and element.tag == "component":
+                    record = self._parse_component(element, remote, active)
+                    if record:
+                        yield record
+                    # Drop parsed components so memory stays flat
+                    root.clear()
+
+    def _parse_component(self, component, remote: str, active: str) -> Optional[CatalogRecord]:
+        # Only applications; runtimes and extensions are not searchable
+        bundle = component.findtext("bundle") or ""
+        if not bundle.startswith("app/"):
+            return None
+
+        def untranslated(tag):
+            for child in component.findall(tag):
+                if _LANG not in child.attrib:
+                    return (child.text or "").strip()
+            return ""
+
+        paragraphs = []
+        for description in component.findall("description"):
+            if _LANG in description.attrib:
+                continue
+            for child in description.iter():
+                if child.tag in ("p", "li") and _LANG not in child.attrib:
+                    text = " ".join("".join(child.itertext()).split())
+                    paragraphs.append(f"• {text}" if child.tag == "li" else text)
+            break
+
+        homepage = ""
+        for url in component.findall("url"):
+            if url.get("type") == "homepage":
+                homepage = (url.text or "").strip()
+                break
+
+        release = component.find("releases/release")
+        return CatalogRecord(
+            id=bundle.split("/")[1],
+            name=untranslated("name"),
+            version=release.get("version", "") if release is not None else "",
+            summary=untranslated("summary"),
+            description="\n\n".join(paragraphs),
+            section=remote,
+            developer=untranslated("developer_name") or component.findtext("developer/name") or "",
+            license=untranslated("project_license"),
+            homepage=homepage,
+            icon=self._cached_icon(component, active)
+        )
+
+    def _cached_icon(self, component, active: str) -> str:
+        """Path of the largest cached icon up to ICON_SIZE, or "" if there is none."""
+        best = None
+        for icon in component.findall("icon"):
+            if icon.get("type") != "cached" or not icon.text:
+                continue
+            size = int(icon.get("height") or icon.get("width") or 64)
+            if size <= self.ICON_SIZE and (best is None or size > best[0]):
+                best = (size, icon.text.strip())
+        if best is None:
+            return ""
+        return os.path.join(active, "icons", f"{best[0]}x{best[0]}", best[1])
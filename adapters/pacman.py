@@ -1,9 +1,35 @@
+import glob
+import os
+import re
 import subprocess
-from typing import List
-from models import App, PackageSource, UpdateStatus
+import tarfile
+from typing import Dict, Iterator, List, Optional
+from models import App, PackageSource, SearchResults, UpdateStatus
+from inventory import format_size
+from utils.process import CancelToken, run_command
+from utils.progress import PacmanProgressParser
+from utils.versions import PACMAN
+from .catalog import Catalog, CatalogRecord
 from . import PackageAdapter
 
 class PacmanAdapter(PackageAdapter):
+    # Repository databases downloaded by pacman -Sy
+    SYNC_DIR = "/var/lib/pacman/sync"
+    # Searches read the sync databases, which only change on pacman -Sy
+    supports_search = True
+    SEARCH_TTL = 3600
+    supports_update_check = True
+    version_scheme = PACMAN
+    # Lines look like "(2/5) upgrading firefox" or "(1/1) removing firefox"
+    BATCH_PROGRESS = re.compile(r"^\(\s*\d+/\d+\) (?:upgrading|reinstalling|installing|removing) (\S+)")
+    PROGRESS_PARSER = PacmanProgressParser
+
+    def __init__(self):
+        # pacman installs from the first repository in pacman.conf that has
+        # a package, whatever its version, so the catalog must not pick the
+        # newest one
+        self.catalog = Catalog('pacman')
+
     def get_installed_apps(self) -> List[App]:
         apps = []
         try:
@@ -28,9 +54,13 @@ class PacmanAdapter(PackageAdapter):
             pass
         return apps
 
+    def get_watch_paths(self) -> List[str]:
+        # Each installed package is a directory under the local database
+        return ["/var/lib/pacman/local"]
+
     def update_app(self, app_id: str) -> bool:
         try:
-            subprocess.run(["pkexec", "pacman", "-S", "--noconfirm", app_id], check=True)
+            self.run_privileged(["pacman", "-S", "--noconfirm", app_id])
             return True
         except subprocess.CalledProcessError:
             return False
@@ -38,15 +68,126 @@ class PacmanAdapter(PackageAdapter):
     def remove_app(self, app_id: str) -> bool:
         try:
             # pacman -Rs removes package and its unneeded dependencies
-            subprocess.run(["pkexec", "pacman", "-Rs", "--noconfirm", app_id], check=True)
+            self.run_privileged(["pacman", "-Rs", "--noconfirm", app_id])
+            return True
+        except subprocess.CalledProcessError:
+            return False
+
+    def get_batch_command(self, action: str, app_ids: List[str]) -> Optional[List[str]]:
+        if action == "update":
+            return ["pkexec", "pacman", "-S", "--noconfirm", *app_ids]
+        if action == "remove":
+            return ["pkexec", "pacman", "-Rs", "--noconfirm", *app_ids]
+        return None
+
+    def install_app(self, app_id: str) -> bool:
+        try:
+            self.run_privileged(["pacman", "-S", "--noconfirm", app_id])
             return True
         except subprocess.CalledProcessError:
             return False
 
-    def search_apps(self, query: str) -> List[App]:
-        return []
+    def search_apps(self, query: str, token=None) -> List[App]:
+        self._update_catalog()
+        records = self.catalog.search(query)
+        return SearchResults((record.to_app(PackageSource.PACMAN, sandboxed=False) for record in records), records.truncated)
+
+    def get_search_fingerprint(self) -> str:
+        return "|".join(f"{path}={stamp}" for path, stamp in sorted(self._catalog_parts().items()))
+
+    def get_updates(self, token: CancelToken = None) -> Dict[str, str]:
+        # Lines look like "firefox 119.0-1 -> 120.0-1"; compares against the
+        # sync databases as they are, without syncing them
+        result = run_command(["pacman", "-Qu"], token=token, check=False)
+        # Exit status 1 with no output means there is nothing to upgrade
+        if result.returncode not in (0, 1) or (result.returncode == 1 and result.stdout.strip()):
+            raise subprocess.CalledProcessError(result.returncode, result.args, result.stdout, result.stderr)
+        updates = {}
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            if len(parts) >= 4 and parts[2] == "->":
+                updates[parts[0]] = parts[3]
+        return updates
+
+    def get_available_version(self, app_id: str) -> Optional[str]:
+        self._update_catalog()
+        records = self.catalog.lookup(app_id)
+        return records[0].version if records else None
+
+    def _update_catalog(self):
+        self.catalog.update(self._catalog_parts(), self._read_sync_db)
+
+    def _catalog_parts(self) -> Dict[str, str]:
+        """Sync databases with their stamps."""
+        parts = {}
+        for path in sorted(glob.glob(os.path.join(self.SYNC_DIR, "*.db"))):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            parts[path] = f"{st.st_mtime_ns}:{st.st_size}"
+        return parts
+
+    def _read_sync_db(self, path: str) -> Iterator[CatalogRecord]:
+        """Stream the desc entries of a sync database without extracting it."""
+        repository = os.path.basename(path)[:-len(".db")]
+        # "r|*" reads the compressed archive as a stream, one member at a time
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.endswith("/desc"):
+                    continue
+                desc = archive.extractfile(member).read().decode("utf-8", errors="replace")
+                record = self._parse_desc(desc, repository)
+                if record:
+                    yield record
+
+    @staticmethod
+    def _parse_desc(desc: str, repository: str) -> Optional[CatalogRecord]:
+        """Parse a desc file: %FIELD% headers, each followed by value lines."""
+        fields = {}
+        key = None
+        for line in desc.split("\n"):
+            if line.startswith("%") and line.endswith("%") and len(line) > 2:
+                key = line[1:-1]
+                fields[key] = []
+            elif not line:
+                key = None
+            elif key:
+                fields[key].append(line)
+
+        def first(name):
+            values = fields.get(name)
+            return values[0] if values else ""
+
+        if not first("NAME"):
+            return None
+        size = first("ISIZE")
+        return CatalogRecord(
+            id=first("NAME"),
+            name=first("NAME"),
+            version=first("VERSION"),
+            summary=first("DESC"),
+            section=repository,
+            size=format_size(int(size)) if size.isdigit() else "",
+            developer=first("PACKAGER"),
+            license=", ".join(fields.get("LICENSE", [])),
+            homepage=first("URL")
+        )
 
     def get_details(self, app: App) -> App:
+        if not app.is_installed:
+            # Search results are not in the local database; use the sync databases
+            self._update_catalog()
+            records = self.catalog.lookup(app.id)
+            if records:
+                record = records[0]
+                app.description = app.description or record.summary
+                app.license = record.license
+                app.homepage = record.homepage
+                app.developer = record.developer
+                app.size = app.size or record.size
+            return app
+
         try:
             # pacman -Qi <package_name>
             result = subprocess.run(
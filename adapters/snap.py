@@ -1,9 +1,19 @@
+import re
 import subprocess
-from typing import List
+from typing import Dict, List, Optional
 from models import App, PackageSource, UpdateStatus
-from . import PackageAdapter
+from utils.process import CancelToken, run_command
+from utils.progress import SnapProgressParser
+from . import PackageAdapter, stat_fingerprint
 
 class SnapAdapter(PackageAdapter):
+    supports_search = True
+    SEARCH_TTL = 600
+    supports_update_check = True
+    # snapd only reports results, e.g. "firefox 120.0 from Mozilla refreshed" or "firefox removed"
+    BATCH_PROGRESS = re.compile(r"^(\S+)\b.*\b(?:refreshed|removed)$")
+    PROGRESS_PARSER = SnapProgressParser
+
     def get_installed_apps(self) -> List[App]:
         apps = []
         try:
@@ -29,9 +39,29 @@ class SnapAdapter(PackageAdapter):
             pass
         return apps
 
+    def get_watch_paths(self) -> List[str]:
+        # snapd keeps one <name>_<rev>.snap file per installed revision here
+        return ["/var/lib/snapd/snaps"]
+
+    def get_search_fingerprint(self) -> str:
+        # snapd refreshes its catalog of store snap names periodically
+        return stat_fingerprint("/var/cache/snapd/names")
+
+    def get_updates(self, token: CancelToken = None) -> Dict[str, str]:
+        # Prints a "Name Version Rev ..." table, or "All snaps up to date." on stderr
+        result = run_command(["snap", "refresh", "--list"], token=token)
+        updates = {}
+        lines = result.stdout.strip().split('\n')
+        if lines and lines[0].startswith("Name"):
+            for line in lines[1:]:
+                parts = line.split()
+                if len(parts) >= 2:
+                    updates[parts[0]] = parts[1]
+        return updates
+
     def update_app(self, app_id: str) -> bool:
         try:
-            subprocess.run(["pkexec", "snap", "refresh", app_id], check=True)
+            self.run_privileged(["snap", "refresh", app_id])
             return True
         except subprocess.CalledProcessError:
             return False
@@ -43,14 +73,18 @@ class SnapAdapter(PackageAdapter):
         except subprocess.CalledProcessError:
             return False
 
-    def search_apps(self, query: str) -> List[App]:
+    def get_batch_command(self, action: str, app_ids: List[str]) -> Optional[List[str]]:
+        if action == "update":
+            return ["pkexec", "snap", "refresh", *app_ids]
+        if action == "remove":
+            return ["snap", "remove", *app_ids]
+        return None
+
+    def search_apps(self, query: str, token: CancelToken = None) -> List[App]:
         apps = []
         try:
             # snap find "query"
-            result = subprocess.run(
-                ["snap", "find", query],
-                capture_output=True, text=True, check=True
-            )
+            result = run_command(["snap", "find", query], token=token)
             # Skip header
             lines = result.stdout.strip().split('\n')[1:]
             for line in lines:
@@ -76,7 +110,7 @@ class SnapAdapter(PackageAdapter):
 
     def install_app(self, app_id: str) -> bool:
         try:
-            subprocess.run(["pkexec", "snap", "install", app_id], check=True)
+            self.run_privileged(["snap", "install", app_id])
             return True
         except subprocess.CalledProcessError:
             return False
@@ -0,0 +1,234 @@
+"""
+Privileged helper for Orbit.
+
+Started once per session through pkexec by utils.privileged, it runs the
+package manager commands that need root, so polkit is asked once instead
+of for every operation.
+
+It listens on a unix socket that only the user who started it can use,
+and takes one JSON request per connection:
+
+    {"argv": ["apt-get", "remove", "-y", "vim"]}
+
+The command must be one of OPERATIONS followed by package names only.
+Output is streamed back as {"line": "..."} messages and ends with
+{"status": <exit status>, "cancelled": <bool>}; refused requests get
+{"error": "..."}. Sending {"cancel": true} kills the command, while a
+client that merely disconnects leaves it to finish, so a crashing Orbit
+never interrupts a package manager halfway. The helper exits when its
+standard input is closed, which happens when Orbit exits, once the
+commands it is running have finished.
+
+This runs as root, so it only uses the standard library.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import threading
+
+# Commands the helper runs; each may only be followed by package names
+OPERATIONS = (
+    ('apt-get', '-o', 'APT::Status-Fd=1', 'install', '--only-upgrade', '-y'),
+    ('apt-get', '-o', 'APT::Status-Fd=1', 'remove', '-y'),
+    ('apt-get', 'install', '--only-upgrade', '-y'),
+    ('apt-get', 'remove', '-y'),
+    ('apt-get', 'install', '-y'),
+    ('dnf', 'upgrade', '-y'),
+    ('dnf', 'remove', '-y'),
+    ('dnf', 'install', '-y'),
+    ('pacman', '-S', '--noconfirm'),
+    ('pacman', '-Rs', '--noconfirm'),
+    ('snap', 'refresh'),
+    ('snap', 'install'),
+)
+# Package names, optionally with an architecture; never an option
+PACKAGE = re.compile(r'[A-Za-z0-9_][A-Za-z0-9_.+:@~-]{0,255}\Z')
+MAX_PACKAGES = 10000
+MAX_REQUEST = 1 << 20
+# Where root looks for package managers, whatever PATH it was given
+SAFE_PATH = '/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin'
+
+_PEERCRED = struct.Struct('3i')
+
+def validate(argv) -> list:
+    """
+    Check a requested command against OPERATIONS.
+
+    Returns:
+        The command as a list of strings
+
+    Raises:
+        ValueError: The command is not allowed
+    """
+    if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+        raise ValueError("argv must be a list of strings")
+    for operation in OPERATIONS:
+        if tuple(argv[:len(operation)]) == operation:
+            packages = argv[len(operation):]
+            break
+    else:
+        raise ValueError(f"Operation not allowed: {' '.join(argv[:3])}")
+    if not packages or len(packages) > MAX_PACKAGES:
+        raise ValueError(f"Expected between 1 and {MAX_PACKAGES} packages")
+    for package in packages:
+        if not PACKAGE.match(package):
+            raise ValueError(f"Invalid package name: {package!r}")
+    return argv
+
+class Helper:
+    """Serves requests of one user, each connection in its own thread."""
+
+    def __init__(self, socket_path: str, owner: int):
+        self.socket_path = socket_path
+        self.owner = owner
+        self.privileged = os.geteuid() == 0
+        self.env = dict(os.environ, LC_ALL='C')
+        if self.privileged:
+            self.env['PATH'] = SAFE_PATH
+        self._running = 0
+        self._idle = threading.Condition()
+        self._directory = None  # Descriptor of the socket's directory, see listen()
+
+    def listen(self) -> socket.socket:
+        """Create the socket, reachable by the owner only."""
+        directory = os.path.dirname(self.socket_path)
+        # The directory was made by the client, which can swap the entries in
+        # it at any time, so it is pinned by descriptor and nothing in it is
+        # ever chowned or chmodded: a symlink put in place of the socket would
+        # hand its target to the client. The descriptor is kept for remove_socket().
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+        try:
+            info = os.fstat(fd)
+            if info.st_uid != self.owner or info.st_mode & 0o077:
+                raise PermissionError(f"Unsafe socket directory: {directory}")
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            # Others cannot reach into the directory and handle() checks the
+            # uid of every peer, so the socket itself may be open to all
+            umask = os.umask(0o111)
+            os.fchdir(fd)
+            try:
+                server.bind(os.path.basename(self.socket_path))
+            finally:
+                os.umask(umask)
+                os.chdir('/')
+        except BaseException:
+            os.close(fd)
+            raise
+        self._directory = fd
+        server.listen()
+        return server
+
+    def remove_socket(self):
+        """
+        Unlink the socket from the directory pinned by listen().
+
+        The directory itself belongs to the client, which removes it.
+        """
+        if self._directory is None:
+            return
+        try:
+            os.unlink(os.path.basename(self.socket_path), dir_fd=self._directory)
+        except OSError:
+            pass
+
+    def serve(self, server: socket.socket):
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn: socket.socket):
+        with conn:
+            _, uid, _ = _PEERCRED.unpack(conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _PEERCRED.size))
+            if uid not in (self.owner, 0):
+                return
+            reader = conn.makefile('rb')
+            try:
+                argv = validate(json.loads(reader.readline(MAX_REQUEST)).get('argv'))
+            except (ValueError, AttributeError) as e:
+                _send(conn, {'error': str(e)})
+                return
+            executable = shutil.which(argv[0], path=self.env.get('PATH'))
+            if executable is None:
+                _send(conn, {'error': f"{argv[0]} is not installed", 'missing': True})
+                return
+            self.run(conn, reader, [executable, *argv[1:]])
+
+    def wait_idle(self):
+        """Block until no command is running."""
+        with self._idle:
+            self._idle.wait_for(lambda: self._running == 0)
+
+    def run(self, conn: socket.socket, reader, argv: list):
+        with self._idle:
+            self._running += 1
+        try:
+            self._run(conn, reader, argv)
+        finally:
+            with self._idle:
+                self._running -= 1
+                self._idle.notify_all()
+
+    def _run(self, conn: socket.socket, reader, argv: list):
+        process = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   stdin=subprocess.DEVNULL, env=self.env)
+        cancelled = threading.Event()
+
+        def watch():
+            try:
+                for raw in reader:
+                    message = json.loads(raw)
+                    if isinstance(message, dict) and message.get('cancel') and process.poll() is None:
+                        cancelled.set()
+                        process.kill()
+            except (OSError, ValueError):
+                pass
+
+        threading.Thread(target=watch, daemon=True).start()
+        connected = True
+        with process:
+            for raw in process.stdout:
+                # Keep draining a command whose client left, so it never blocks on a full pipe
+                if connected:
+                    line = raw.decode('utf-8', 'replace').rstrip('\n')
+                    connected = _send(conn, {'line': line})
+        if connected:
+            _send(conn, {'status': process.returncode, 'cancelled': cancelled.is_set()})
+
+def _send(conn: socket.socket, message: dict) -> bool:
+    try:
+        conn.sendall(json.dumps(message).encode() + b'\n')
+        return True
+    except OSError:
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Orbit privileged helper")
+    parser.add_argument('--socket', required=True, help="Path of the unix socket to listen on")
+    args = parser.parse_args()
+
+    # pkexec tells which user authorized the helper; run unprivileged, it is the caller
+    owner = int(os.environ.get('PKEXEC_UID', os.getuid()))
+    helper = Helper(args.socket, owner)
+    server = helper.listen()
+
+    def watch_parent():
+        # Orbit holds the other end of stdin; EOF means it has exited
+        sys.stdin.read()
+        helper.remove_socket()
+        # Running commands would get SIGPIPE once their output pipe closes
+        helper.wait_idle()
+        os._exit(0)
+
+    threading.Thread(target=watch_parent, daemon=True).start()
+    print('ready', flush=True)
+    helper.serve(server)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,399 @@
+"""Indexed in-memory inventory of applications."""
+
+import re
+import threading
+from typing import Iterable, List, Optional
+from models import App, PackageSource, UpdateStatus
+
+_SEPARATORS = re.compile(r'[\s_\-]+')
+
+def normalize_name(name: str) -> str:
+    """Normalize an app name for indexing: lowercase, separators collapsed to one space."""
+    return _SEPARATORS.sub(' ', (name or '').strip().lower())
+
+_SIZE = re.compile(r'^\s*([\d.,]+)\s*([kmgt]?)(i?)b?\s*$', re.IGNORECASE)
+_SIZE_POWERS = {'': 0, 'k': 1, 'm': 2, 'g': 3, 't': 4}
+
+def parse_size(size: str) -> int:
+    """
+    Parse a human-readable size such as "1.2 GB", "340 KiB" or "12,5 MB".
+
+    Returns:
+        Size in bytes, or 0 if the string is empty or not understood
+    """
+    match = _SIZE.match(size or '')
+    if not match:
+        return 0
+    number, prefix, binary = match.groups()
+    try:
+        value = float(number.replace(',', '.'))
+    except ValueError:
+        return 0
+    base = 1024 if binary else 1000
+    return int(value * base ** _SIZE_POWERS[prefix.lower()])
+
+def format_size(size: int) -> str:
+    """Format a byte count the way package managers usually print it."""
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if size < 1000:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1000
+    return f"{size:.1f} TB"
+
+class StatisticsAggregator:
+    """
+    Running totals over the inventory.
+
+    The store reports every app that is added, removed or changed, and
+    the totals are adjusted by that app's contribution alone. Each app's
+    last contribution is remembered, so an app that was modified in place
+    can be re-counted correctly.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._contributions = {}  # key -> (source, has update, sandboxed, bytes)
+        self.by_source = {}
+        self.size_by_source = {}
+        self.updates_available = 0
+        self.sandboxed = 0
+
+    def add(self, app: App):
+        contribution = (
+            app.source,
+            app.update_status == UpdateStatus.UPDATE_AVAILABLE,
+            app.sandboxed,
+            parse_size(app.size)
+        )
+        self._contributions[app.key] = contribution
+        self._apply(contribution, 1)
+
+    def remove(self, key):
+        contribution = self._contributions.pop(key, None)
+        if contribution:
+            self._apply(contribution, -1)
+
+    def snapshot(self) -> dict:
+        """Return the totals in the format of OrbitManager.get_statistics."""
+        return {
+            'total': len(self._contributions),
+            'by_source': {source.value: count for source, count in self.by_source.items() if count},
+            'updates_available': self.updates_available,
+            'sandboxed': self.sandboxed,
+            'disk_usage': {source.value: size for source, size in self.size_by_source.items() if size}
+        }
+
+    def _apply(self, contribution, sign: int):
+        source, has_update, sandboxed, size = contribution
+        self.by_source[source] = self.by_source.get(source, 0) + sign
+        self.size_by_source[source] = self.size_by_source.get(source, 0) + sign * size
+        self.updates_available += sign * has_update
+        self.sandboxed += sign * sandboxed
+
+class InventoryStore:
+    """
+    Applications keyed by (source, id) with secondary indexes.
+
+    Besides the primary key, apps are indexed by normalized name, by
+    source and by update status, so filters only touch the apps they
+    return. The name-sorted view is built lazily and cached until the
+    next change.
+    """
+
+    def __init__(self, apps: Iterable[App] = ()):
+        self._lock = threading.RLock()
+        self._apps = {}  # (source, id) -> App
+        self._by_name = {}  # normalized name -> set of keys
+        self._by_source = {}  # PackageSource -> set of keys
+        self._by_status = {}  # UpdateStatus -> set of keys
+        self._sorted = None
+        self._rank = None
+        self.stats = StatisticsAggregator()
+        self.replace_all(apps)
+
+    def __len__(self) -> int:
+        return len(self._apps)
+
+    def __contains__(self, key) -> bool:
+        return key in self._apps
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def replace_all(self, apps: Iterable[App]):
+        """
+        Replace the whole inventory.
+
+        Args:
+            apps: Apps in their preferred order; ties in the name sort keep it
+        """
+        with self._lock:
+            self._apps = {}
+            self._by_name = {}
+            self._by_source = {}
+            self._by_status = {}
+            self.stats.clear()
+            for app in apps:
+                self._insert(app)
+            self._invalidate()
+
+    def clear(self):
+        """Remove every app."""
+        self.replace_all(())
+
+    def add(self, app: App):
+        """Add an app, replacing any app with the same (source, id)."""
+        with self._lock:
+            self._discard(app.key)
+            self._insert(app)
+            self._invalidate()
+
+    def remove(self, key) -> Optional[App]:
+        """
+        Remove an app by key.
+
+        Returns:
+            The removed app, or None if it was not present
+        """
+        with self._lock:
+            app = self._discard(key)
+            if app is not None:
+                self._invalidate()
+            return app
+
+    def set_update_status(self, key, status: UpdateStatus):
+        """Change an app's update status and keep the status index current."""
+        with self._lock:
+            app = self._apps.get(key)
+            if app is None or app.update_status == status:
+                return
+            self._by_status.get(app.update_status, set()).discard(key)
+            app.update_status = status
+            self._by_status.setdefault(status, set()).add(key)
+            self.stats.remove(key)
+            self.stats.add(app)
+
+    def touch(self, key):
+        """Re-count an app that was modified in place (size, sandboxing)."""
+        with self._lock:
+            app = self._apps.get(key)
+            if app is not None:
+                self.stats.remove(key)
+                self.stats.add(app)
+
+    def get(self, source: PackageSource, app_id: str) -> Optional[App]:
+        """Look up an app by its primary key."""
+        return self._apps.get((source, app_id))
+
+    def find_by_name(self, name: str) -> List[App]:
+        """Return all apps whose normalized name matches."""
+        with self._lock:
+            return self._ordered(self._by_name.get(normalize_name(name), ()))
+
+    def by_source(self, source: PackageSource) -> List[App]:
+        """Return the apps of one source in name order."""
+        with self._lock:
+            return self._ordered(self._by_source.get(source, ()))
+
+    def with_status(self, status: UpdateStatus) -> List[App]:
+        """Return the apps with the given update status in name order."""
+        with self._lock:
+            return self._ordered(self._by_status.get(status, ()))
+
+    def count_by_source(self) -> dict:
+        """Return the number of apps per source."""
+        with self._lock:
+            return {source: len(keys) for source, keys in self._by_source.items() if keys}
+
+    def count_with_status(self, status: UpdateStatus) -> int:
+        """Return the number of apps with the given update status."""
+        return len(self._by_status.get(status, ()))
+
+    def all(self) -> List[App]:
+        """
+        Return every app sorted by name.
+
+        The returned list is shared until the next change and must not be
+        modified.
+        """
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._apps.values(), key=lambda app: app.name.lower())
+                self._rank = {app.key: index for index, app in enumerate(self._sorted)}
+            return self._sorted
+
+    def query(self, text: str = None, sources: Iterable[PackageSource] = None,
+              update_status: UpdateStatus = None, installed: bool = None,
+              sort: str = 'name', offset: int = 0, limit: int = None) -> List[App]:
+        """
+        Filter, sort and page the inventory.
+
+        The narrowest index among the given filters picks the candidates,
+        so the cost follows the size of the result rather than the whole
+        inventory.
+
+        Args:
+            text: Case-insensitive substring matched against name and id
+            sources: Only include apps from these sources
+            update_status: Only include apps with this update status
+            installed: If given, only include apps whose is_installed matches
+            sort: 'name' or 'source'
+            offset: Number of matching apps to skip
+            limit: Maximum number of apps to return
+
+        Returns:
+            List of matching apps
+        """
+        with self._lock:
+            candidates = None
+            if update_status is not None:
+                candidates = set(self._by_status.get(update_status, ()))
+            if sources is not None:
+                by_source = set()
+                for source in sources:
+                    by_source.update(self._by_source.get(source, ()))
+                candidates = by_source if candidates is None else candidates & by_source
+
+            if candidates is None:
+                apps = list(self.all())
+            else:
+                apps = self._ordered(candidates)
+
+            if installed is not None:
+                apps = [app for app in apps if app.is_installed == installed]
+            if text:
+                text = text.lower()
+                apps = [app for app in apps if text in app.name.lower() or text in app.id.lower()]
+            if sort == 'source':
+                apps.sort(key=lambda app: app.source.value)
+
+            end = offset + limit if limit is not None else None
+            return apps[offset:end]
+
+    def _ordered(self, keys) -> List[App]:
+        """Return the apps for the given keys in name order."""
+        self.all()
+        rank = self._rank
+        return [self._apps[key] for key in sorted(keys, key=rank.__getitem__)]
+
+    def _insert(self, app: App):
+        key = app.key
+        self._apps[key] = app
+        self._by_name.setdefault(normalize_name(app.name), set()).add(key)
+        self._by_source.setdefault(app.source, set()).add(key)
+        self._by_status.setdefault(app.update_status, set()).add(key)
+        self.stats.add(app)
+
+    def _discard(self, key) -> Optional[App]:
+        app = self._apps.pop(key, None)
+        if app is not None:
+            self._by_name.get(normalize_name(app.name), set()).discard(key)
+            self._by_source.get(app.source, set()).discard(key)
+            self._by_status.get(app.update_status, set()).discard(key)
+            self.stats.remove(key)
+        return app
+
+    def _invalidate(self):
+        self._sorted = None
+        self._rank = None
+
+_REVERSE_DNS = re.compile(r'^[a-z][a-z0-9\-]*(\.[A-Za-z0-9_\-]+){2,}$')
+
+def identity_tokens(app: App) -> set:
+    """
+    Return the normalized identities an app can be recognized by.
+
+    These are its normalized name and, for reverse-DNS ids such as
+    org.gnome.Calculator (which double as desktop ids), the full id and
+    its last segment.
+    """
+    tokens = {'name:' + normalize_name(app.name)}
+    if _REVERSE_DNS.match(app.id):
+        tokens.add('id:' + app.id.lower())
+        last = app.id.rsplit('.', 1)[1]
+        if not last.isdigit():
+            tokens.add('name:' + normalize_name(last))
+    return tokens
+
+class ConflictGroup:
+    """Apps from different sources that are the same application."""
+
+    __slots__ = ('identity', 'members')
+
+    def __init__(self, identity: str, members: List[App]):
+        self.identity = identity
+        self.members = members
+
+    @property
+    def sources(self) -> List[PackageSource]:
+        """Distinct sources in the group, in member order."""
+        return list(dict.fromkeys(app.source for app in self.members))
+
+    def others(self, app: App) -> List[App]:
+        """Members of the group from other sources than the given app."""
+        return [member for member in self.members if member.source != app.source]
+
+class ConflictIndex:
+    """
+    Groups of apps installed from more than one source.
+
+    Built in a single pass: apps sharing any identity token are merged
+    with a union-find, and groups spanning at least two sources are kept.
+    Lookups by app key and the counts used for statistics are O(1).
+    """
+
+    def __init__(self, apps: Iterable[App] = ()):
+        apps = list(apps)
+        parent = list(range(len(apps)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        owner = {}  # identity token -> first app index carrying it
+        for index, app in enumerate(apps):
+            for token in identity_tokens(app):
+                other = owner.setdefault(token, index)
+                if other != index:
+                    parent[find(index)] = find(other)
+
+        buckets = {}
+        for index, app in enumerate(apps):
+            buckets.setdefault(find(index), []).append(app)
+
+        self.groups = []
+        self._by_key = {}
+        for members in buckets.values():
+            if len({app.source for app in members}) < 2:
+                continue
+            group = ConflictGroup(normalize_name(members[0].name), members)
+            self.groups.append(group)
+            for app in members:
+                self._by_key[app.key] = group
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    @property
+    def app_count(self) -> int:
+        """Number of apps that belong to a conflict group."""
+        return len(self._by_key)
+
+    def group_for(self, key) -> Optional[ConflictGroup]:
+        """Return the conflict group of the app with the given key, if any."""
+        return self._by_key.get(key)
+
+    def changed_keys(self, other: 'ConflictIndex') -> set:
+        """Keys of apps whose conflict group differs between this index and another."""
+        changed = set()
+        for key in self._by_key.keys() | other._by_key.keys():
+            mine, theirs = self._by_key.get(key), other._by_key.get(key)
+            if (mine is None) != (theirs is None):
+                changed.add(key)
+            elif mine is not None and [a.key for a in mine.members] != [a.key for a in theirs.members]:
+                changed.add(key)
+        return changed
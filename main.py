@@ -10,6 +10,8 @@ from ui.window import OrbitWindow
 from utils.logger import setup_logger
 from utils.config import Config
 from utils.notifications import NotificationManager
+from utils.scheduler import UpdateScheduler
+from utils.watcher import InventoryWatcher
 
 # Setup logging
 logger = setup_logger('orbit')
@@ -23,6 +25,8 @@ class OrbitApplication(Adw.Application):
         self.manager = OrbitManager()
         self.config = Config()
         self.notifications = NotificationManager()
+        self.watcher = None
+        self.scheduler = None
         
         # Set global app reference IMMEDIATELY
         global app
@@ -35,7 +39,18 @@ class OrbitApplication(Adw.Application):
         window = self.get_active_window()
         if not window:
             window = OrbitWindow(application=self)
+            self.scheduler = UpdateScheduler(self.manager, self.config, window.apply_changes,
+                                             self.on_updates_found)
+            # Render the last known inventory right away, then revalidate it
+            self.scheduler.restore()
+            cached = self.manager.load_cached_apps()
+            if cached:
+                window.show_apps(cached)
             self.load_apps_async(window)
+            if self.config.get('watch_for_changes', True):
+                self.watcher = InventoryWatcher(self.manager, window.apply_changes)
+                self.watcher.start()
+            self.scheduler.start()
         window.present()
 
     def load_css(self):
@@ -52,21 +67,36 @@ class OrbitApplication(Adw.Application):
         except Exception as e:
             logger.error(f"Failed to load CSS: {e}")
 
-    def load_apps_async(self, window):
-        """Load applications in a background thread."""
+    def load_apps_async(self, window, check_updates: bool = False):
+        """
+        Load applications in a background thread.
+
+        Args:
+            window: Window to show the apps in
+            check_updates: Check for updates even if the last check is recent
+        """
+        # With nothing on screen yet, show each source as soon as it answers
+        stream = not window.apps
+
+        def on_chunk(apps, changes):
+            GLib.idle_add(window.show_partial, apps, changes)
+
         def load():
             try:
                 logger.info("Starting app refresh in background thread")
-                apps = self.manager.refresh_apps()
-                GLib.idle_add(window.show_apps, apps)
-                
-                # Check for updates and notify
-                stats = self.manager.get_statistics()
-                if stats['updates_available'] > 0 and self.config.get('show_notifications'):
-                    GLib.idle_add(
-                        self.notifications.send_update_available,
-                        stats['updates_available']
-                    )
+                apps = self.manager.refresh_apps(on_chunk if stream else None)
+                GLib.idle_add(window.apply_changes, apps, self.manager.last_changes)
+
+                # Updates applied through Orbit are no longer pending
+                self.scheduler.save()
+                # Operations the last exit interrupted can be judged now that the inventory is current
+                interrupted = self.manager.operations.recover()
+                if interrupted:
+                    GLib.idle_add(window.offer_resume, interrupted)
+                if check_updates:
+                    self.scheduler.check_now()
+                else:
+                    self.scheduler.check_if_due()
             except Exception as e:
                 logger.error(f"Error loading apps: {e}")
                 GLib.idle_add(window.show_error, str(e))
@@ -74,6 +104,12 @@ class OrbitApplication(Adw.Application):
         thread = threading.Thread(target=load, daemon=True)
         thread.start()
 
+    def on_updates_found(self, count):
+        """Notify about updates found by a scheduled check."""
+        if self.config.get('show_notifications'):
+            self.notifications.send_update_available(count)
+        return GLib.SOURCE_REMOVE
+
 if __name__ == "__main__":
     orbit_app = OrbitApplication()
     sys.exit(orbit_app.run(sys.argv))
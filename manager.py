@@ -1,4 +1,7 @@
-from typing import List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import List, Optional
 from models import App, PackageSource, UpdateStatus
 from adapters.apt import AptAdapter
 from adapters.flatpak import FlatpakAdapter
@@ -7,6 +10,12 @@ from adapters.appimage import AppImageAdapter
 from adapters.pacman import PacmanAdapter
 from adapters.dnf import DnfAdapter
 from utils.logger import setup_logger
+from utils.cache import InventoryCache
+from utils.process import CancelToken, CommandCancelled
+from inventory import ConflictIndex, InventoryStore
+from search import SearchCache, SearchIndex
+from transactions import SourceLocks, TransactionPlanner
+from operations import PRIORITY_BATCH, PRIORITY_INTERACTIVE, Operation, OperationQueue
 
 logger = setup_logger('orbit.manager')
 
@@ -27,7 +36,51 @@ class ProviderRegistry:
     def all_adapters(self):
         return self._adapters.values()
 
+    def items(self):
+        return self._adapters.items()
+
+class _InventoryStream:
+    """
+    Feeds adapter chunks into the inventory store while a refresh runs.
+
+    Every chunk is reported to the callback as a diff against what was
+    reported before.
+    """
+
+    def __init__(self, store: InventoryStore, search_index: SearchIndex, callback):
+        self.store = store
+        self.search_index = search_index
+        self.callback = callback
+        self._lock = threading.Lock()
+        self._closed = False
+        store.clear()
+        search_index.clear()
+
+    def add(self, chunk: List[App]):
+        with self._lock:
+            if self._closed or not chunk:
+                return
+            added = [app.copy() for app in chunk]
+            for app in added:
+                self.store.add(app)
+                self.search_index.add(app)
+            self.callback(list(self.store.all()), {'removed': [], 'added': added})
+
+    def close(self):
+        """Ignore chunks from adapters that are still running after the refresh ended."""
+        with self._lock:
+            self._closed = True
+
 class OrbitManager:
+    # Upper bound on adapters queried at the same time during a refresh
+    MAX_REFRESH_WORKERS = 6
+    # Seconds to wait for a single adapter before giving up on its results
+    ADAPTER_TIMEOUT = 30
+    # Seconds to wait for a source's remote search results
+    SEARCH_TIMEOUT = 15
+    # Seconds to wait for a source's update check
+    UPDATE_CHECK_TIMEOUT = 120
+
     def __init__(self):
         self.registry = ProviderRegistry()
         self.registry.register(PackageSource.APT, AptAdapter())
@@ -36,141 +89,464 @@ class OrbitManager:
         self.registry.register(PackageSource.APPIMAGE, AppImageAdapter())
         self.registry.register(PackageSource.PACMAN, PacmanAdapter())
         self.registry.register(PackageSource.DNF, DnfAdapter())
-        self.apps = []
+        self.inventory = InventoryStore()
+        self.conflicts = ConflictIndex()
+        self.search_index = SearchIndex()
+        self.search_cache = SearchCache()
+        self.planner = TransactionPlanner(self.registry)
+        # Held while a package operation runs on a source
+        self.source_locks = SourceLocks()
+        # Every install, update and removal goes through this queue
+        self.operations = OperationQueue(self)
+        self.refresh_timings = {}
+        self.cache = InventoryCache()
+        self.last_changes = None
+        # source -> {app id: new version} from the last successful update check
+        self.available_updates = {}
+        # source -> (fingerprint, apps) from the last time the adapter ran
+        self._source_state = {}
+        # source -> pristine adapter results the inventory was built from
+        self._sections = {}
+        self._lock = threading.Lock()
         logger.info("OrbitManager initialized")
 
-    def refresh_apps(self) -> List[App]:
-        """Refresh the list of installed applications."""
+    @property
+    def apps(self) -> List[App]:
+        """All installed applications sorted by name (read-only view of the inventory)."""
+        return self.inventory.all()
+
+    def refresh_apps(self, on_chunk=None) -> List[App]:
+        """
+        Refresh the list of installed applications.
+
+        Adapters are queried concurrently, so a refresh takes about as long
+        as the slowest source. Results are merged in registration order
+        before sorting, which keeps the final list deterministic.
+
+        Args:
+            on_chunk: Optional callback(apps, changes) called from worker
+                threads as results stream in, with the provisional sorted
+                inventory and its changes in the format of diff_apps. When
+                given, last_changes is relative to the streamed inventory.
+        """
         logger.info("Refreshing application list")
-        self.apps = []
-        for adapter in self.registry.all_adapters():
-            try:
-                apps = adapter.get_installed_apps()
-                self.apps.extend(apps)
-                logger.debug(f"Loaded {len(apps)} apps from {adapter.__class__.__name__}")
-            except Exception as e:
-                logger.error(f"Error loading apps from {adapter.__class__.__name__}: {e}")
-        
-        # Sort by name
-        self.apps.sort(key=lambda x: x.name.lower())
-        self.detect_conflicts()
+        sources = list(self.registry.items())
+        timings = {}
+        results = {}
+        stream = _InventoryStream(self.inventory, self.search_index, on_chunk) if on_chunk else None
+
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, min(self.MAX_REFRESH_WORKERS, len(sources))),
+            thread_name_prefix='orbit-refresh'
+        )
+        try:
+            futures = {
+                source: executor.submit(self._load_adapter, adapter, timings, source, stream)
+                for source, adapter in sources
+            }
+            deadline = time.monotonic() + self.ADAPTER_TIMEOUT
+            for source, adapter in sources:
+                name = adapter.__class__.__name__
+                try:
+                    results[source] = futures[source].result(timeout=max(0, deadline - time.monotonic()))
+                    logger.debug(f"Loaded {len(results[source])} apps from {name} in {timings[source]:.3f}s")
+                except FutureTimeoutError:
+                    logger.error(f"Timed out loading apps from {name} after {self.ADAPTER_TIMEOUT}s")
+                except Exception as e:
+                    logger.error(f"Error loading apps from {name}: {e}")
+        finally:
+            # Do not block on adapters that timed out; their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+            if stream:
+                stream.close()
+
+        self.refresh_timings = timings
+        with self._lock:
+            previous = self.apps
+            redraw = self._build_inventory({source: results[source] for source, _ in sources if source in results})
+            self.last_changes = self.diff_apps(previous, self.apps, redraw)
+        self._save_snapshot()
         logger.info(f"Total apps loaded: {len(self.apps)}")
         return self.apps
 
-    def detect_conflicts(self):
-        """Identify apps with same name but different sources."""
-        name_map = {}
-        for app in self.apps:
-            if app.name not in name_map:
-                name_map[app.name] = []
-            name_map[app.name].append(app)
-        
-        for name, apps in name_map.items():
-            if len(apps) > 1:
-                for app in apps:
-                    app.summary = f"⚠️ Bu uygulamanın {len(apps)-1} farklı kaynağı daha mevcut. " + (app.summary or "")
-                logger.warning(f"Conflict detected for {name}: {len(apps)} sources")
+    def refresh_source(self, source: PackageSource) -> dict:
+        """
+        Re-query a single source and merge its results into the inventory.
+
+        Args:
+            source: The package source that changed
+
+        Returns:
+            Changes to the inventory, in the format of diff_apps
+        """
+        adapter = self.registry.get_adapter(source)
+        if not adapter:
+            return {'removed': [], 'added': []}
+
+        timings = {}
+        try:
+            apps = self._load_adapter(adapter, timings, source)
+        except Exception as e:
+            logger.error(f"Error reloading apps from {adapter.__class__.__name__}: {e}")
+            return {'removed': [], 'added': []}
+
+        with self._lock:
+            if apps is self._sections.get(source):
+                return {'removed': [], 'added': []}
+            sections = dict(self._sections)
+            sections[source] = apps
+            previous = self.apps
+            redraw = self._build_inventory(sections)
+            changes = self.diff_apps(previous, self.apps, redraw)
+        self._save_snapshot()
+        logger.info(f"Reloaded {source.value}: {len(changes['removed'])} removed, {len(changes['added'])} added")
+        return changes
+
+    def _save_snapshot(self):
+        """Write the current sections and their fingerprints to disk."""
+        try:
+            self.cache.save(self._sections, {'fingerprints': {
+                source.value: state[0] for source, state in self._source_state.items()
+            }})
+        except OSError as e:
+            logger.warning(f"Could not write inventory snapshot: {e}")
+
+    def load_cached_apps(self) -> List[App]:
+        """
+        Populate the inventory from the on-disk snapshot of the last refresh.
+
+        Returns:
+            The cached apps, or an empty list if no usable snapshot exists
+        """
+        snapshot = self.cache.load()
+        if not snapshot or not snapshot[0]:
+            return []
+        sections, meta = snapshot
+        fingerprints = meta.get('fingerprints', {})
+        for source, apps in sections.items():
+            fingerprint = fingerprints.get(source.value)
+            if fingerprint is not None:
+                self._source_state[source] = (fingerprint, apps)
+        with self._lock:
+            self._build_inventory(sections)
+        self.last_changes = None
+        logger.info(f"Loaded {len(self.apps)} apps from inventory snapshot")
+        return self.apps
+
+    def _build_inventory(self, sections: dict) -> set:
+        """
+        Merge per-source results into the sorted inventory.
+
+        Returns:
+            Keys of apps whose conflict state changed
+        """
+        self._sections = sections
+        apps = []
+        for source, _ in self.registry.items():
+            # Copies keep the sections pristine when shown apps are
+            # updated in place (details, update status)
+            apps.extend(app.copy() for app in sections.get(source, []))
+        for app, status in zip(apps, self._known_statuses(apps)):
+            app.update_status = status or app.update_status
+
+        # Sorted by name on access, ties keep registration order
+        self.inventory.replace_all(apps)
+        self.search_index.replace_all(apps)
+        return self.detect_conflicts()
+
+    @staticmethod
+    def diff_apps(old: List[App], new: List[App], redraw=()) -> dict:
+        """
+        Compute the difference between two inventories.
+
+        Args:
+            old: Previous list of apps
+            new: Current list of apps
+            redraw: Keys to report as changed even if the apps are equal
+
+        Returns:
+            Dictionary with the keys of apps that disappeared or changed
+            ('removed') and the apps that appeared or changed ('added')
+        """
+        old_map, new_map = {}, {}
+        for app in old:
+            old_map.setdefault(app.key, []).append(app)
+        for app in new:
+            new_map.setdefault(app.key, []).append(app)
+
+        changed = {key for key, apps in new_map.items() if old_map.get(key) != apps}
+        changed.update(key for key in redraw if key in old_map and key in new_map)
+        removed = [key for key, apps in old_map.items() if key in changed or key not in new_map]
+        added = [app for key, apps in new_map.items() if key in changed for app in apps]
+        return {'removed': removed, 'added': added}
+
+    def _load_adapter(self, adapter, timings: dict, source: PackageSource, stream=None) -> List[App]:
+        """
+        Run a single adapter and record how long it took.
+
+        If the adapter's fingerprint matches the one from its last run, the
+        previous results are reused and no subprocess is spawned. Chunks
+        are forwarded to the stream, if any, as the adapter yields them.
+        """
+        started = time.monotonic()
+        try:
+            fingerprint = adapter.get_fingerprint()
+            previous = self._source_state.get(source)
+            if fingerprint is not None and previous and previous[0] == fingerprint:
+                logger.debug(f"{adapter.__class__.__name__} unchanged, reusing {len(previous[1])} apps")
+                if stream:
+                    stream.add(previous[1])
+                return previous[1]
+
+            apps = []
+            for chunk in adapter.iter_installed_apps():
+                apps.extend(chunk)
+                if stream:
+                    stream.add(chunk)
+            if fingerprint is not None:
+                self._source_state[source] = (fingerprint, apps)
+            else:
+                self._source_state.pop(source, None)
+            return apps
+        finally:
+            timings[source] = time.monotonic() - started
+
+    def check_updates(self, token: CancelToken = None) -> dict:
+        """
+        Find pending updates for every source that can tell.
+
+        Each adapter lists all of its updates with a single command, and
+        the sources are checked concurrently. Results are merged into the
+        inventory by (source, id). A source whose check fails or times out
+        keeps its previous statuses.
+
+        Args:
+            token: Optional token; cancelling it kills the running checks
+
+        Returns:
+            Apps whose update status changed, in the format of diff_apps
+        """
+        sources = [(source, adapter) for source, adapter in self.registry.items() if adapter.supports_update_check]
+        if not sources:
+            return {'removed': [], 'added': []}
+        logger.info("Checking for updates")
+
+        results = {}
+        check_token = CancelToken(token)
+        executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix='orbit-updates')
+        try:
+            futures = {executor.submit(adapter.get_updates, check_token): source for source, adapter in sources}
+            try:
+                for future in as_completed(futures, timeout=self.UPDATE_CHECK_TIMEOUT):
+                    source = futures[future]
+                    try:
+                        results[source] = future.result()
+                    except CommandCancelled:
+                        break
+                    except FileNotFoundError:
+                        # Package manager not installed on this system
+                        continue
+                    except Exception as e:
+                        logger.error(f"Error checking updates for {source.value}: {e}")
+                        continue
+                    logger.debug(f"{source.value} has {len(results[source])} updates")
+            except FutureTimeoutError:
+                pending = [source.value for future, source in futures.items() if not future.done()]
+                logger.error(f"Timed out checking updates for {', '.join(pending)} after {self.UPDATE_CHECK_TIMEOUT}s")
+        finally:
+            check_token.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if token is not None and token.cancelled:
+            return {'removed': [], 'added': []}
+
+        changes = self.merge_updates(results)
+        logger.info(f"Update check complete: {self.inventory.count_with_status(UpdateStatus.UPDATE_AVAILABLE)} updates available")
+        return changes
+
+    def merge_updates(self, results: dict) -> dict:
+        """
+        Record the pending updates of some sources and apply them to the inventory.
+
+        Used by check_updates, and to restore the results of an earlier
+        check without running the package managers again.
+
+        Args:
+            results: Dictionary of PackageSource -> {app id: new version}
+
+        Returns:
+            Apps whose update status changed, in the format of diff_apps
+        """
+        changed = []
+        with self._lock:
+            self.available_updates.update(results)
+            for source in results:
+                apps = self.inventory.by_source(source)
+                for app, status in zip(apps, self._known_statuses(apps)):
+                    if status != app.update_status:
+                        self.inventory.set_update_status(app.key, status)
+                        changed.append(app)
+        return {'removed': [app.key for app in changed], 'added': changed}
+
+    def get_available_updates(self) -> dict:
+        """
+        Return a copy of the results of the last update checks.
+
+        Returns:
+            Dictionary of PackageSource -> {app id: new version}
+        """
+        with self._lock:
+            return {source: dict(updates) for source, updates in self.available_updates.items()}
+
+    def _known_statuses(self, apps: List[App]) -> List[Optional[UpdateStatus]]:
+        """
+        Update status of each app according to the last update check of its source.
+
+        A pending update that is not newer than the installed version, for
+        example because the app was upgraded outside Orbit since the check,
+        is ignored for sources whose versions can be compared. Versions are
+        compared one column per source.
+
+        Returns:
+            One status per app, None where its source was never checked
+        """
+        statuses = []
+        pending = {}  # source -> [(position, installed version, new version)]
+        for position, app in enumerate(apps):
+            updates = self.available_updates.get(app.source)
+            if updates is None:
+                statuses.append(None)
+            elif app.id in updates:
+                statuses.append(UpdateStatus.UPDATE_AVAILABLE)
+                pending.setdefault(app.source, []).append((position, app.version, updates[app.id]))
+            else:
+                statuses.append(UpdateStatus.UP_TO_DATE)
+
+        for source, entries in pending.items():
+            adapter = self.registry.get_adapter(source)
+            scheme = adapter.version_scheme if adapter else None
+            if scheme is None:
+                continue
+            newer = scheme.is_newer([entry[2] for entry in entries], [entry[1] for entry in entries])
+            for (position, installed, _), is_newer in zip(entries, newer):
+                if installed and not is_newer:
+                    statuses[position] = UpdateStatus.UP_TO_DATE
+        return statuses
+
+    def detect_conflicts(self) -> set:
+        """
+        Identify apps installed from more than one source.
+
+        Returns:
+            Keys of apps whose conflict state changed since the last run
+        """
+        previous = self.conflicts
+        self.conflicts = ConflictIndex(self.apps)
+        for group in self.conflicts.groups:
+            logger.warning(f"Conflict detected for {group.identity}: {len(group.members)} sources")
+        return previous.changed_keys(self.conflicts)
 
     def get_apps(self) -> List[App]:
         """Get the current list of applications."""
-        if not self.apps:
+        if not self.inventory:
             return self.refresh_apps()
         return self.apps
 
     def update_app(self, app: App) -> bool:
-        """Update a single application."""
+        """
+        Update a single application, waiting for its turn in the operation queue.
+
+        Raises:
+            OrbitException: The update failed with an error rather than
+                the package manager reporting failure
+        """
         logger.info(f"Updating app: {app.name} ({app.source.value})")
-        adapter = self.registry.get_adapter(app.source)
-        if adapter:
-            try:
-                result = adapter.update_app(app.id)
-                if result:
-                    logger.info(f"Successfully updated {app.name}")
-                else:
-                    logger.warning(f"Failed to update {app.name}")
-                return result
-            except Exception as e:
-                logger.error(f"Error updating {app.name}: {e}")
-                raise OrbitException(f"Failed to update {app.name}: {e}")
-        return False
+        return self._run_operation('update', app)
+
+    def _run_operation(self, action: str, app: App) -> bool:
+        """Queue an action on one app and wait for it; returns whether it succeeded."""
+        operation = self.operations.submit(action, [app], PRIORITY_INTERACTIVE)
+        operation.wait()
+        error = operation.errors.get(app.key)
+        if error is not None:
+            raise OrbitException(f"Failed to {action} {app.name}: {error}")
+        return bool(operation.results.get(app.key))
+
+    def _mark_updated(self, app: App):
+        """Record that an app no longer has a pending update."""
+        with self._lock:
+            self.available_updates.get(app.source, {}).pop(app.id, None)
+            self.inventory.set_update_status(app.key, UpdateStatus.UP_TO_DATE)
 
     def remove_app(self, app: App) -> bool:
-        """Remove a single application."""
+        """
+        Remove a single application, waiting for its turn in the operation queue.
+
+        Raises:
+            OrbitException: The removal failed with an error
+        """
         logger.info(f"Removing app: {app.name} ({app.source.value})")
-        adapter = self.registry.get_adapter(app.source)
-        if adapter:
-            try:
-                result = adapter.remove_app(app.id)
-                if result:
-                    logger.info(f"Successfully removed {app.name}")
-                else:
-                    logger.warning(f"Failed to remove {app.name}")
-                return result
-            except Exception as e:
-                logger.error(f"Error removing {app.name}: {e}")
-                raise OrbitException(f"Failed to remove {app.name}: {e}")
-        return False
+        return self._run_operation('remove', app)
 
-    def update_all(self, progress_callback=None) -> dict:
+    def update_all(self, progress_callback=None, token: CancelToken = None, event_callback=None) -> dict:
         """
         Update all applications that have updates available.
+
+        Apps are grouped by source and each source updates its apps with a
+        single package manager command.
         
         Args:
             progress_callback: Optional callback function(current, total, app_name)
+            token: Optional token to cancel the batch
+            event_callback: Optional callback function(source, app, event)
+                receiving the download and install progress parsed from the
+                package managers' output; app is None for events about a
+                whole transaction
             
         Returns:
-            Dictionary with success and failure counts
+            Dictionary with success, failure and cancelled counts
         """
-        logger.info("Starting batch update")
-        updatable_apps = [app for app in self.apps if app.update_status == UpdateStatus.UPDATE_AVAILABLE]
-        
-        results = {'success': 0, 'failed': 0, 'total': len(updatable_apps)}
-        
-        for i, app in enumerate(updatable_apps):
-            if progress_callback:
-                progress_callback(i + 1, len(updatable_apps), app.name)
-            
-            try:
-                if self.update_app(app):
-                    results['success'] += 1
-                else:
-                    results['failed'] += 1
-            except Exception as e:
-                logger.error(f"Error in batch update for {app.name}: {e}")
-                results['failed'] += 1
-        
-        logger.info(f"Batch update complete: {results['success']} success, {results['failed']} failed")
-        return results
+        operation = self.submit_update_all(on_progress=progress_callback, on_event=event_callback, token=token)
+        operation.wait()
+        return operation.summary()
+
+    def submit_update_all(self, token: CancelToken = None, **listeners) -> Operation:
+        """
+        Queue the update of all applications that have updates available.
+
+        Args:
+            token: Optional token to cancel the batch
+            listeners: on_done, on_progress and on_event, see Operation.add_listener
 
-    def remove_multiple(self, apps: List[App], progress_callback=None) -> dict:
+        Returns:
+            The queued operation
+        """
+        updatable_apps = self.inventory.with_status(UpdateStatus.UPDATE_AVAILABLE)
+        logger.info(f"Starting batch update of {len(updatable_apps)} apps")
+        return self.operations.submit('update', updatable_apps, PRIORITY_BATCH, token=token, **listeners)
+
+    def remove_multiple(self, apps: List[App], progress_callback=None, token: CancelToken = None,
+                        event_callback=None) -> dict:
         """
-        Remove multiple applications.
+        Remove multiple applications, with one package manager command per source.
         
         Args:
             apps: List of apps to remove
             progress_callback: Optional callback function(current, total, app_name)
+            token: Optional token to cancel the batch
+            event_callback: Optional callback function(source, app, event), as for update_all
             
         Returns:
-            Dictionary with success and failure counts
+            Dictionary with success, failure and cancelled counts
         """
+        operation = self.submit_removal(apps, on_progress=progress_callback, on_event=event_callback, token=token)
+        operation.wait()
+        return operation.summary()
+
+    def submit_removal(self, apps: List[App], token: CancelToken = None, **listeners) -> Operation:
+        """Queue the removal of several applications, like submit_update_all."""
         logger.info(f"Starting batch removal of {len(apps)} apps")
-        results = {'success': 0, 'failed': 0, 'total': len(apps)}
-        
-        for i, app in enumerate(apps):
-            if progress_callback:
-                progress_callback(i + 1, len(apps), app.name)
-            
-            try:
-                if self.remove_app(app):
-                    results['success'] += 1
-                else:
-                    results['failed'] += 1
-            except Exception as e:
-                logger.error(f"Error in batch removal for {app.name}: {e}")
-                results['failed'] += 1
-        
-        logger.info(f"Batch removal complete: {results['success']} success, {results['failed']} failed")
-        return results
+        return self.operations.submit('remove', apps, PRIORITY_BATCH, token=token, **listeners)
 
     def get_statistics(self) -> dict:
         """
@@ -179,57 +555,96 @@ class OrbitManager:
         Returns:
             Dictionary with various statistics
         """
-        stats = {
-            'total': len(self.apps),
-            'by_source': {},
-            'updates_available': 0,
-            'sandboxed': 0,
-            'conflicts': 0
-        }
-        
-        for app in self.apps:
-            # Count by source
-            source_name = app.source.value
-            stats['by_source'][source_name] = stats['by_source'].get(source_name, 0) + 1
-            
-            # Count updates
-            if app.update_status == UpdateStatus.UPDATE_AVAILABLE:
-                stats['updates_available'] += 1
-            
-            # Count sandboxed
-            if app.sandboxed:
-                stats['sandboxed'] += 1
-            
-            # Count conflicts
-            if "⚠️" in (app.summary or ""):
-                stats['conflicts'] += 1
+        # Counters are maintained by the inventory as apps come and go
+        stats = self.inventory.stats.snapshot()
+        stats['conflicts'] = self.conflicts.app_count
+        stats['conflict_groups'] = len(self.conflicts)
         
         return stats
 
-    def search_apps(self, query: str, source: PackageSource = None) -> List[App]:
+    def search_apps(self, query: str, source: PackageSource = None, on_results=None,
+                    token: CancelToken = None) -> List[App]:
         """
         Search for applications in repositories.
-        
+
+        Sources that can search are queried concurrently, so one slow
+        source does not hold back the others. A source that does not
+        answer within SEARCH_TIMEOUT is left out and its processes are
+        killed. Results are cached per source and query; repeated or
+        extended queries are answered from the cache without spawning any
+        process.
+
         Args:
             query: Search query
             source: Optional specific source to search
-            
+            on_results: Optional callback(source, apps) called on the
+                calling thread as soon as each source has answered
+            token: Optional token; cancelling it kills the running searches
+                and no further results are reported
+
         Returns:
-            List of matching apps
+            List of matching apps, in source registration order
         """
         logger.info(f"Searching for: {query}")
-        results = []
-        
-        adapters = [self.registry.get_adapter(source)] if source else self.registry.all_adapters()
-        
-        for adapter in adapters:
-            if adapter:
-                try:
-                    results.extend(adapter.search_apps(query))
-                except Exception as e:
-                    logger.error(f"Error searching in {adapter.__class__.__name__}: {e}")
-        
-        return results
+        if source:
+            adapter = self.registry.get_adapter(source)
+            sources = [(source, adapter)] if adapter else []
+        else:
+            sources = list(self.registry.items())
+        sources = [(source, adapter) for source, adapter in sources if adapter.supports_search]
+        if not sources:
+            return []
+
+        results = {}
+        fingerprints = {}
+        missing = []
+        for source, adapter in sources:
+            fingerprints[source] = adapter.get_search_fingerprint()
+            cached = self.search_cache.get(source, query, adapter.SEARCH_TTL, fingerprints[source])
+            if cached is None:
+                missing.append((source, adapter))
+                continue
+            logger.debug(f"{source.value} answered from cache with {len(cached)} results")
+            results[source] = cached
+            if on_results:
+                on_results(source, cached)
+        if not missing:
+            return [app for source, _ in sources for app in results[source]]
+
+        # Cancelled on timeout without cancelling the caller's token
+        search_token = CancelToken(token)
+        executor = ThreadPoolExecutor(max_workers=len(missing), thread_name_prefix='orbit-search')
+        try:
+            futures = {
+                executor.submit(adapter.search_apps, query, search_token): source
+                for source, adapter in missing
+            }
+            try:
+                for future in as_completed(futures, timeout=self.SEARCH_TIMEOUT):
+                    if search_token.cancelled:
+                        break
+                    source = futures[future]
+                    try:
+                        results[source] = future.result()
+                    except CommandCancelled:
+                        break
+                    except Exception as e:
+                        logger.error(f"Error searching in {source.value}: {e}")
+                        continue
+                    logger.debug(f"{source.value} returned {len(results[source])} results")
+                    if results[source]:
+                        # Adapters report failures as no results, which must not stick
+                        self.search_cache.put(source, query, results[source], fingerprints[source])
+                    if on_results:
+                        on_results(source, results[source])
+            except FutureTimeoutError:
+                pending = [source.value for future, source in futures.items() if not future.done()]
+                logger.error(f"Timed out searching in {', '.join(pending)} after {self.SEARCH_TIMEOUT}s")
+        finally:
+            search_token.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return [app for source, _ in sources for app in results.get(source, [])]
 
     def install_app(self, app: App) -> bool:
         """
@@ -240,20 +655,13 @@ class OrbitManager:
             
         Returns:
             True if successful
+
+        Raises:
+            OrbitException: The installation failed with an error
         """
         logger.info(f"Installing app: {app.name} from {app.source.value}")
-        adapter = self.registry.get_adapter(app.source)
-        if adapter and hasattr(adapter, 'install_app'):
-            try:
-                result = adapter.install_app(app.id)
-                if result:
-                    logger.info(f"Successfully installed {app.name}")
-                else:
-                    logger.warning(f"Failed to install {app.name}")
-                return result
-            except Exception as e:
-                logger.error(f"Error installing {app.name}: {e}")
-                raise OrbitException(f"Failed to install {app.name}: {e}")
+        return self._run_operation('install', app)
+
     def get_app_details(self, app: App) -> App:
         """
         Fetch detailed information for an application.
@@ -268,7 +676,13 @@ class OrbitManager:
         adapter = self.registry.get_adapter(app.source)
         if adapter and hasattr(adapter, 'get_details'):
             try:
-                return adapter.get_details(app)
+                app = adapter.get_details(app)
+                # Details may fill in the size of an app shown from the inventory
+                self.inventory.touch(app.key)
+                if app.key in self.inventory:
+                    # Make the fetched description searchable
+                    self.search_index.add(app)
+                return app
             except Exception as e:
                 logger.error(f"Error fetching details for {app.name}: {e}")
         return app
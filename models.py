@@ -1,5 +1,7 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import MISSING, dataclass, field, replace
 from enum import Enum, auto
+from typing import Optional
 
 class PackageSource(Enum):
     APT = "APT"
@@ -15,8 +17,50 @@ class UpdateStatus(Enum):
     MANUAL = auto()
     UNKNOWN = auto()
 
-@dataclass
+@dataclass(slots=True)
+class AppDetails:
+    """Rarely used metadata, attached to an App only once something sets it."""
+    description: str = ""  # Full description
+    launch_command: str = ""  # Command to launch the app
+    installed_date: str = ""  # Installation date
+    dependencies: list = field(default_factory=list)  # List of dependencies
+    developer: str = "" # Developer name
+    license: str = "" # License type
+    homepage: str = "" # Homepage URL
+
+def _detail(name):
+    """Property exposing an AppDetails field directly on App."""
+    default = AppDetails.__dataclass_fields__[name].default
+    # Mutable fields (lists) are edited in place, so reading one has to
+    # attach the details it belongs to
+    mutable = default is MISSING
+
+    def getter(self):
+        if self.details is None:
+            if not mutable:
+                return default
+            self.details = AppDetails()
+        return getattr(self.details, name)
+
+    def setter(self, value):
+        if self.details is None:
+            if not value:
+                return
+            self.details = AppDetails()
+        setattr(self.details, name, value)
+
+    return property(getter, setter)
+
+@dataclass(slots=True)
 class App:
+    """
+    An application as listed by a package source.
+
+    Inventories hold thousands of these, so the record is slotted and only
+    carries the fields needed for listing. Detail fields (description,
+    developer, ...) live in an AppDetails object that is created the first
+    time one of them is set, and are still readable as plain attributes.
+    """
     id: str
     name: str
     source: PackageSource
@@ -27,15 +71,44 @@ class App:
     icon: str = "system-run" # Default icon
     sandboxed: bool = False
     size: str = "" # Disk usage
-    description: str = ""  # Full description
-    launch_command: str = ""  # Command to launch the app
-    installed_date: str = ""  # Installation date
-    dependencies: list = None  # List of dependencies
-    developer: str = "" # Developer name
-    license: str = "" # License type
-    homepage: str = "" # Homepage URL
-    
+    details: Optional[AppDetails] = None
+
+    description = _detail('description')
+    launch_command = _detail('launch_command')
+    installed_date = _detail('installed_date')
+    dependencies = _detail('dependencies')
+    developer = _detail('developer')
+    license = _detail('license')
+    homepage = _detail('homepage')
+
     def __post_init__(self):
-        if self.dependencies is None:
-            self.dependencies = []
+        # Versions repeat heavily across a distribution's packages
+        if self.version:
+            self.version = sys.intern(self.version)
+
+    @property
+    def key(self):
+        """Identity of the app across refreshes: (source, id)."""
+        return (self.source, self.id)
+
+    def copy(self) -> 'App':
+        """Return a copy that does not share its details with this app."""
+        if self.details is None:
+            return replace(self)
+        return replace(self, details=replace(self.details, dependencies=list(self.details.dependencies)))
+
+class SearchResults(list):
+    """
+    Results of a search, best match first.
+
+    A plain list with one more attribute, so sources that cannot run out
+    of results may keep returning lists.
+
+    Attributes:
+        truncated: The source stopped at its result limit, so more apps
+            match the query than are listed
+    """
 
+    def __init__(self, apps=(), truncated: bool = False):
+        super().__init__(apps)
+        self.truncated = truncated
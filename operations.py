@@ -0,0 +1,534 @@
+"""Queue of package operations, journaled so interrupted ones can be recovered."""
+
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from models import App, PackageSource, UpdateStatus
+from transactions import BatchProgress, Transaction
+from utils.logger import setup_logger
+from utils.process import CancelToken
+
+logger = setup_logger('orbit.operations')
+
+# Lower values run first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+class Operation:
+    """
+    An install, update or removal of one or more apps, as queued by the user.
+
+    The queue runs it as one job per source (see transactions.Transaction),
+    so the sources of a batch proceed independently. Results are keyed by
+    app key: True or False once an app was acted on, None if it was
+    cancelled or withdrawn before that.
+
+    Attributes:
+        state: "queued", "running", "done", or "interrupted" for an
+            operation recovered from the journal
+        errors: Messages of the errors that failed apps, by app key
+        unfinished: For an interrupted operation, keys of the apps whose
+            job had started but not finished
+        remaining: For an interrupted operation, the apps recover() found
+            still to be done
+    """
+
+    def __init__(self, action: str, apps: List[App], priority: int = PRIORITY_INTERACTIVE,
+                 op_id: str = None, created_at: float = None, token: CancelToken = None):
+        if action not in Transaction.ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        self.id = op_id or uuid.uuid4().hex
+        self.action = action
+        self.apps = list(apps)
+        self.priority = priority
+        self.created_at = created_at or time.time()
+        self.state = 'queued'
+        self.results: Dict[tuple, Optional[bool]] = {}
+        self.errors: Dict[tuple, str] = {}
+        # A child of the submitter's token, so cancelling either stops the operation
+        self.token = CancelToken(token)
+        self.jobs = []
+        self.unfinished = set()
+        self.remaining = []
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self.progress = BatchProgress(len(self.apps), self._on_progress)
+
+    def __repr__(self) -> str:
+        return f"Operation({self.action!r}, {len(self.apps)} apps, {self.state!r})"
+
+    @property
+    def keys(self) -> frozenset:
+        return frozenset(app.key for app in self.apps)
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def add_listener(self, on_done: Callable = None, on_progress: Callable = None, on_event: Callable = None):
+        """
+        Follow the operation; callbacks are called from worker threads.
+
+        Args:
+            on_done: Called with the operation once every app has a result;
+                at once if it already has
+            on_progress: Called as on_progress(current, total, app_name)
+            on_event: Called as on_event(source, app, event) for the
+                utils.progress.ProgressEvents of the package managers
+        """
+        with self._lock:
+            if not self.done:
+                self._listeners.append((on_done, on_progress, on_event))
+                return
+        if on_done:
+            on_done(self)
+
+    def cancel(self):
+        """Stop the operation where that is safe; apps not yet acted on are cancelled."""
+        self.token.cancel()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until the operation is done; returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def summary(self) -> dict:
+        """Counts of results, in the format of OrbitManager.update_all."""
+        summary = {'success': 0, 'failed': 0, 'cancelled': 0, 'total': len(self.apps)}
+        for app in self.apps:
+            result = self.results.get(app.key)
+            if result:
+                summary['success'] += 1
+            elif result is None:
+                summary['cancelled'] += 1
+            else:
+                summary['failed'] += 1
+        return summary
+
+    def _on_progress(self, current: int, total: int, app_name: str):
+        for _, on_progress, _ in list(self._listeners):
+            if on_progress:
+                on_progress(current, total, app_name)
+
+    def _on_event(self, source: PackageSource, app: Optional[App], event):
+        for _, _, on_event in list(self._listeners):
+            if on_event:
+                on_event(source, app, event)
+
+    def _finish(self):
+        with self._lock:
+            self.state = 'done'
+            self._done.set()
+            listeners, self._listeners = self._listeners, []
+        for on_done, _, _ in listeners:
+            if on_done:
+                on_done(self)
+
+class _Job:
+    """The part of an operation that runs on one source."""
+
+    __slots__ = ('operation', 'transaction', 'priority', 'seq')
+
+    def __init__(self, operation: Operation, transaction: Transaction, seq: int):
+        self.operation = operation
+        self.transaction = transaction
+        self.priority = operation.priority
+        self.seq = seq
+
+    def __lt__(self, other: '_Job') -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+class OperationJournal:
+    """
+    Append-only record of queued operations, one JSON object per line.
+
+    Every operation is written when it is queued, and every job when it
+    starts and finishes. An operation without a "done" record was
+    interrupted, and the records tell which apps were never started,
+    which were being worked on, and which had finished.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def queued(self, operation: Operation):
+        self._append({'op': operation.id, 'event': 'queued', 'action': operation.action,
+                      'priority': operation.priority, 'time': operation.created_at,
+                      'apps': [{'source': app.source.value, 'id': app.id, 'name': app.name,
+                                'version': app.version} for app in operation.apps]})
+
+    def job(self, operation: Operation, event: str, apps: List[App], results: dict = None):
+        """Record that a job "started", "finished" or was "withdrawn"."""
+        record = {'op': operation.id, 'event': event,
+                  'apps': [[app.source.value, app.id] for app in apps]}
+        if results is not None:
+            record['results'] = [results.get(app.key) for app in apps]
+        self._append(record)
+
+    def done(self, op_id: str):
+        self._append({'op': op_id, 'event': 'done'})
+
+    def load(self) -> List[Operation]:
+        """
+        Read the operations that were not done.
+
+        Returns:
+            Operations in state "interrupted". Apps whose outcome the
+            journal knows have it in results; the keys of apps that were
+            being worked on are in unfinished.
+        """
+        operations = {}
+        try:
+            with open(self.path, 'r') as f:
+                lines = f.readlines()
+        except OSError:
+            return []
+        for line in lines:
+            try:
+                record = json.loads(line)
+                operation = operations.get(record['op'])
+                event = record['event']
+                if event == 'queued':
+                    apps = [App(id=item['id'], name=item['name'], source=PackageSource(item['source']),
+                                version=item['version']) for item in record['apps']]
+                    operation = Operation(record['action'], apps, record['priority'],
+                                          op_id=record['op'], created_at=record['time'])
+                    operation.state = 'interrupted'
+                    operations[operation.id] = operation
+                elif operation is None:
+                    continue
+                elif event == 'done':
+                    del operations[operation.id]
+                else:
+                    keys = [(PackageSource(source), app_id) for source, app_id in record['apps']]
+                    if event == 'started':
+                        operation.unfinished.update(keys)
+                    elif event == 'finished':
+                        operation.unfinished.difference_update(keys)
+                        operation.results.update(zip(keys, record['results']))
+                    elif event == 'withdrawn':
+                        operation.results.update((key, None) for key in keys)
+            except (ValueError, KeyError, TypeError):
+                # A record cut short by a crash
+                continue
+        return list(operations.values())
+
+    def compact(self, operations: List[Operation]):
+        """Rewrite the journal with only the records of the given operations."""
+        keep = {operation.id for operation in operations}
+        with self._lock:
+            try:
+                with open(self.path, 'r') as f:
+                    lines = [line for line in f if self._op_of(line) in keep]
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'w') as f:
+                    f.writelines(lines)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not compact the operation journal: {e}")
+
+    @staticmethod
+    def _op_of(line: str) -> Optional[str]:
+        try:
+            return json.loads(line)['op']
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def _append(self, record: dict):
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps(record) + '\n')
+                    f.flush()
+                    # The record must survive a crash of Orbit or of the machine
+                    os.fsync(f.fileno())
+            except OSError as e:
+                logger.warning(f"Could not write the operation journal: {e}")
+
+class OperationQueue:
+    """
+    Runs every install, update and removal of OrbitManager.
+
+    Operations are split into one job per source and run by priority,
+    then in order of submission. CONCURRENCY limits how many jobs of a
+    source run at once; package managers lock their database, so by
+    default a source runs one job at a time while different sources
+    proceed in parallel.
+
+    Submitting an operation that is already queued or running (the same
+    action on the same apps, or on apps an operation of the same action
+    already covers) returns that operation instead of queuing another.
+    A queued job is superseded by a later operation with another action
+    on the same app: removing an app withdraws its queued update.
+
+    Operations are journaled to ~/.cache/orbit/operations.journal; those
+    interrupted by a crash are reported by recover() on the next start.
+    """
+
+    MAX_WORKERS = 4
+    DEFAULT_CONCURRENCY = 1
+    # AppImages are independent files, so several can be handled at once
+    CONCURRENCY = {PackageSource.APPIMAGE: 4}
+
+    def __init__(self, manager, cache_dir: str = None, concurrency: Dict[PackageSource, int] = None):
+        """
+        Args:
+            manager: OrbitManager whose adapters and inventory are used
+            cache_dir: Directory of the journal, ~/.cache/orbit by default
+            concurrency: Overrides of CONCURRENCY
+        """
+        self.manager = manager
+        self.concurrency = dict(self.CONCURRENCY, **(concurrency or {}))
+        cache_dir = Path(cache_dir) if cache_dir else Path.home() / '.cache' / 'orbit'
+        self.journal = OperationJournal(cache_dir / 'operations.journal')
+        self._lock = threading.Lock()
+        self._queue = []  # heap of _Job waiting for their source
+        self._running = {}  # source -> jobs running
+        self._operations = {}  # id -> operation not done yet
+        self._seq = itertools.count()
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS, thread_name_prefix='orbit-operation')
+
+        # Operations the last exit interrupted, until the user resumes or discards them
+        self.interrupted = self.journal.load()
+        self._recovered = False
+        if self.interrupted:
+            logger.warning(f"{len(self.interrupted)} operations were interrupted by the last exit")
+        # Keep only what is still unresolved
+        self.journal.compact(self.interrupted)
+
+    def submit(self, action: str, apps: List[App], priority: int = PRIORITY_INTERACTIVE, token: CancelToken = None,
+               on_done: Callable = None, on_progress: Callable = None, on_event: Callable = None) -> Operation:
+        """
+        Queue an operation, or join an equivalent one.
+
+        Args:
+            action: "install", "update" or "remove"
+            apps: Apps to act on
+            priority: PRIORITY_INTERACTIVE for single clicks, PRIORITY_BATCH
+                for batches; lower values run first
+            token: Optional token that cancels the operation; ignored when
+                an equivalent operation is joined
+            on_done, on_progress, on_event: See Operation.add_listener
+
+        Returns:
+            The operation that will carry out the request
+        """
+        apps = list({app.key: app for app in apps}.values())
+        with self._lock:
+            operation = self._coalesce(action, apps, priority)
+            if operation is None:
+                operation = Operation(action, apps, priority, token=token)
+                self._supersede(operation)
+                self.journal.queued(operation)
+                self._operations[operation.id] = operation
+                for transaction in self.manager.planner.plan(action, apps):
+                    job = _Job(operation, transaction, next(self._seq))
+                    operation.jobs.append(job)
+                    heapq.heappush(self._queue, job)
+                logger.info(f"Queued {action} of {len(apps)} apps")
+        operation.add_listener(on_done, on_progress, on_event)
+        with self._lock:
+            # Nothing to do, e.g. no adapter for any of the apps' sources
+            completed = not operation.jobs and operation.id in self._operations
+            if completed:
+                self._complete(operation)
+            finished = self._dispatch()
+        if completed:
+            finished.append(operation)
+        for done in finished:
+            done._finish()
+        return operation
+
+    def pending(self) -> List[Operation]:
+        """Operations queued or running, in submission order."""
+        with self._lock:
+            return list(self._operations.values())
+
+    def recover(self) -> List[Operation]:
+        """
+        Reconcile the operations interrupted by the last exit with the inventory.
+
+        Call once the inventory has been refreshed. Apps whose intended
+        change already shows in the inventory (an update installed, a
+        removed app gone) count as done.
+
+        Returns:
+            Interrupted operations that still have apps left to do; pass
+            each to resume() or discard(). Empty after the first call.
+        """
+        if self._recovered:
+            return []
+        self._recovered = True
+        unresolved = []
+        for operation in self.interrupted:
+            # Apps with a result, even a failure, were dealt with before the exit
+            remaining = [app for app in operation.apps
+                         if app.key not in operation.results and not self._applied(operation.action, app)]
+            if remaining:
+                started = [app.name for app in remaining if app.key in operation.unfinished]
+                if started:
+                    logger.warning(f"{operation.action} of {', '.join(started)} was interrupted while running")
+                operation.remaining = remaining
+                unresolved.append(operation)
+            else:
+                self.journal.done(operation.id)
+        self.interrupted = unresolved
+        return list(unresolved)
+
+    def resume(self, interrupted: Operation, **listeners) -> Operation:
+        """Queue the apps an interrupted operation did not get to."""
+        operation = self.submit(interrupted.action, interrupted.remaining, interrupted.priority, None, **listeners)
+        self.discard(interrupted)
+        return operation
+
+    def discard(self, interrupted: Operation):
+        """Forget an interrupted operation."""
+        with self._lock:
+            if interrupted in self.interrupted:
+                self.interrupted.remove(interrupted)
+        self.journal.done(interrupted.id)
+
+    def _applied(self, action: str, app: App) -> bool:
+        """Whether the inventory shows that the action took effect on the app."""
+        current = self.manager.inventory.get(app.source, app.id)
+        if action == 'remove':
+            return current is None
+        if action == 'install':
+            return current is not None
+        return current is not None and (current.version != app.version
+                                        or current.update_status == UpdateStatus.UP_TO_DATE)
+
+    def _coalesce(self, action: str, apps: List[App], priority: int) -> Optional[Operation]:
+        """Find an unfinished operation that already does what is asked."""
+        keys = {app.key for app in apps}
+        for operation in self._operations.values():
+            if operation.action != action or not keys <= operation.keys:
+                continue
+            # Apps withdrawn from it will not be done by it
+            if any(key in operation.results and operation.results[key] is None for key in keys):
+                continue
+            if priority < operation.priority:
+                operation.priority = priority
+                for job in operation.jobs:
+                    job.priority = min(job.priority, priority)
+                heapq.heapify(self._queue)
+            logger.info(f"Joined queued {action} of {len(operation.apps)} apps")
+            return operation
+        return None
+
+    def _supersede(self, operation: Operation):
+        """Withdraw the apps of a new operation from queued jobs with another action."""
+        keys = operation.keys
+        for job in self._queue:
+            earlier = job.operation
+            if earlier.action == operation.action:
+                continue
+            withdrawn = [app for app in job.transaction.apps if app.key in keys]
+            if not withdrawn:
+                continue
+            job.transaction.apps = [app for app in job.transaction.apps if app.key not in keys]
+            for app in withdrawn:
+                earlier.results[app.key] = None
+            self.journal.job(earlier, 'withdrawn', withdrawn)
+            logger.info(f"{operation.action} supersedes queued {earlier.action} of "
+                        f"{', '.join(app.name for app in withdrawn)}")
+
+    def _dispatch(self) -> List[Operation]:
+        """
+        Start the queued jobs whose source has room, best first; called under the lock.
+
+        Returns:
+            Operations completed meanwhile, to be finished once the lock is released
+        """
+        finished = []
+        blocked = []
+        while self._queue:
+            job = heapq.heappop(self._queue)
+            source = job.transaction.source
+            if not job.transaction.apps:
+                # Everything in it was superseded
+                if self._job_done(job):
+                    finished.append(job.operation)
+                continue
+            # Cancelled jobs only record their apps as cancelled, so they need no room
+            if (not job.operation.token.cancelled and self._running.get(source, 0)
+                    >= self.concurrency.get(source, self.DEFAULT_CONCURRENCY)):
+                blocked.append(job)
+                continue
+            self._running[source] = self._running.get(source, 0) + 1
+            job.operation.state = 'running'
+            self._executor.submit(self._run, job)
+        for job in blocked:
+            heapq.heappush(self._queue, job)
+        return finished
+
+    def _run(self, job: _Job):
+        operation, transaction = job.operation, job.transaction
+        apps = list(transaction.apps)
+        outcome = {app.key: None for app in apps}
+        try:
+            if not operation.token.cancelled:
+                self.journal.job(operation, 'started', apps)
+                with self.manager.source_locks.get(transaction.source):
+                    logger.info(f"Running {operation.action} of {len(apps)} apps from {transaction.source.value}")
+                    outcome = transaction.run(operation.progress.started, operation.token,
+                                              lambda app, event: operation._on_event(transaction.source, app, event))
+                if transaction.error is not None:
+                    operation.errors.update((app.key, str(transaction.error)) for app in apps)
+            for app in apps:
+                if outcome[app.key] is None:
+                    continue
+                # Apps the package manager did not mention still count once
+                operation.progress.started(app)
+                if outcome[app.key]:
+                    if operation.action == 'update':
+                        self.manager._mark_updated(app)
+                else:
+                    logger.warning(f"Failed to {operation.action} {app.name}")
+        except Exception as e:
+            logger.error(f"{operation.action} for {transaction.source.value} failed: {e}")
+            operation.errors.update((app.key, str(e)) for app in apps)
+            outcome = {app.key: False for app in apps}
+        finally:
+            self.journal.job(operation, 'finished', apps, outcome)
+            with self._lock:
+                operation.results.update(outcome)
+                self._running[transaction.source] -= 1
+                finished = self._dispatch()
+                if self._job_done(job):
+                    finished.append(operation)
+            for done in finished:
+                done._finish()
+
+    def _job_done(self, job: _Job) -> bool:
+        """Account for a finished job; called under the lock. Returns whether its operation completed."""
+        operation = job.operation
+        operation.jobs.remove(job)
+        if operation.jobs:
+            return False
+        self._complete(operation)
+        return True
+
+    def _complete(self, operation: Operation):
+        """Finish an operation whose jobs are all done; called under the lock."""
+        self._operations.pop(operation.id, None)
+        self.journal.done(operation.id)
+        for app in operation.apps:
+            operation.results.setdefault(app.key, None)
+        if not self._operations:
+            # Nothing is in flight, so the journal only needs what awaits the user
+            self.journal.compact(self.interrupted)
+        logger.info(f"{operation.action.capitalize()} of {len(operation.apps)} apps done: {operation.summary()}")
@@ -0,0 +1,330 @@
+"""Search over the local inventory and remote sources."""
+
+import bisect
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+from models import App, SearchResults
+
+_TOKEN = re.compile(r'[^\W_]+', re.UNICODE)
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return _TOKEN.findall((text or '').lower())
+
+def _trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class _Document:
+    __slots__ = ('app', 'name', 'id', 'name_tokens', 'id_tokens', 'summary_tokens', 'description_tokens')
+
+    def __init__(self, app: App):
+        self.app = app
+        self.name = app.name.lower()
+        self.id = app.id.lower()
+        self.name_tokens = tokenize(app.name)
+        self.id_tokens = tokenize(app.id)
+        self.summary_tokens = tokenize(app.summary)
+        self.description_tokens = tokenize(app.description)
+
+    def weighted_tokens(self) -> dict:
+        """Each distinct token with the weight of the best field it appears in."""
+        weights = {}
+        for tokens, weight in ((self.description_tokens, 5), (self.summary_tokens, 10),
+                               (self.id_tokens, 25), (self.name_tokens, 60)):
+            for token in tokens:
+                weights[token] = weight
+        return weights
+
+    def score(self, token: str) -> int:
+        """
+        Best score for one query token, or 0 if it does not match.
+
+        Matches exactly what SearchIndex._lookup finds: word prefixes in
+        any field, plus substrings of name and id for tokens of three or
+        more characters.
+        """
+        infix = len(token) >= 3
+        if token in self.name_tokens:
+            return 100
+        if any(t.startswith(token) for t in self.name_tokens):
+            return 60
+        if infix and token in self.name:
+            return 40
+        if any(t.startswith(token) for t in self.id_tokens):
+            return 30 if token in self.id_tokens else 25
+        if infix and token in self.id:
+            return 20
+        if any(t.startswith(token) for t in self.summary_tokens):
+            return 10
+        if any(t.startswith(token) for t in self.description_tokens):
+            return 5
+        return 0
+
+class SearchIndex:
+    """
+    In-memory full-text index over app name, id, summary and description.
+
+    Words are kept in a sorted token dictionary, so each query word is
+    matched as a prefix with a binary search. Names and ids are also
+    indexed by trigrams, which keeps substring matches such as "fox" in
+    "firefox" working. Every query word must match; results are ranked by
+    where they matched (name before id before summary and description).
+
+    Typing usually extends the previous query, so when a query starts with
+    the last one the previous candidates are filtered instead of hitting
+    the index again.
+    """
+
+    def __init__(self, apps: Iterable[App] = ()):
+        self._lock = threading.RLock()
+        self.replace_all(apps)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def replace_all(self, apps: Iterable[App]):
+        """Rebuild the index from scratch."""
+        with self._lock:
+            # Documents are numbered internally; small ints hash much faster
+            # than (PackageSource, id) keys
+            self._ids = {}  # key -> document number
+            self._docs = {}  # document number -> _Document
+            self._next_id = 0
+            self._postings = {}  # token -> {document: weight of the best field holding it}
+            self._trigrams = {}  # trigram of name/id -> set of documents
+            self._vocabulary = []
+            self._vocabulary_dirty = False
+            self._last_query = None
+            self._last_candidates = None
+            for app in apps:
+                self._index(app)
+
+    def clear(self):
+        """Remove every app."""
+        self.replace_all(())
+
+    def add(self, app: App):
+        """Index an app, replacing any previous entry with the same key."""
+        with self._lock:
+            self._unindex(app.key)
+            self._index(app)
+
+    def remove(self, key):
+        """Drop an app from the index."""
+        with self._lock:
+            self._unindex(key)
+
+    def search(self, query: str, limit: int = None) -> List[App]:
+        """
+        Find apps matching every word of the query.
+
+        Args:
+            query: Free text typed by the user
+            limit: Maximum number of results
+
+        Returns:
+            Matching apps, best match first
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+
+        with self._lock:
+            normalized = ' '.join(tokens)
+            # Only a superset when every earlier word was long enough to
+            # have been matched as a substring as well
+            if (self._last_candidates is not None and self._last_query
+                    and normalized.startswith(self._last_query)
+                    and all(len(token) >= 3 for token in self._last_query.split())):
+                candidates = [
+                    doc_id for doc_id in self._last_candidates
+                    if all(self._docs[doc_id].score(token) for token in tokens)
+                ]
+                scores = {doc_id: sum(self._docs[doc_id].score(token) for token in tokens)
+                          for doc_id in candidates}
+            else:
+                scores = None
+                for token in tokens:
+                    matches = self._lookup(token)
+                    if scores is None:
+                        scores = matches
+                    else:
+                        scores = {doc_id: score + matches[doc_id]
+                                  for doc_id, score in scores.items() if doc_id in matches}
+                    if not scores:
+                        break
+            self._last_query = normalized
+            self._last_candidates = list(scores)
+
+            exact = query.strip().lower()
+            ranked = []
+            docs = self._docs
+            for doc_id, score in scores.items():
+                name = docs[doc_id].name
+                if name == exact:
+                    score += 200
+                ranked.append((-score, name, doc_id))
+            ranked.sort()
+            return [docs[doc_id].app for _, _, doc_id in ranked[:limit]]
+
+    def _lookup(self, token: str) -> dict:
+        """
+        Documents matching one query token as a word prefix or name/id substring.
+
+        Returns:
+            Dictionary of document number -> score, consistent with _Document.score
+        """
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+
+        matches = {}
+        index = bisect.bisect_left(self._vocabulary, token)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(token):
+            for doc_id, weight in self._postings[self._vocabulary[index]].items():
+                if matches.get(doc_id, 0) < weight:
+                    matches[doc_id] = weight
+            index += 1
+        # Whole-word hits in the name or id rank above prefix hits
+        for doc_id, weight in self._postings.get(token, {}).items():
+            if weight == 60:
+                matches[doc_id] = 100
+            elif weight == 25 and matches[doc_id] == 25:
+                matches[doc_id] = 30
+
+        if len(token) >= 3:
+            infix = None
+            for trigram in _trigrams(token):
+                docs = self._trigrams.get(trigram, set())
+                infix = set(docs) if infix is None else infix & docs
+                if not infix:
+                    break
+            for doc_id in infix or ():
+                doc = self._docs[doc_id]
+                weight = 40 if token in doc.name else 20 if token in doc.id else 0
+                if matches.get(doc_id, 0) < weight:
+                    matches[doc_id] = weight
+        return matches
+
+    def _index(self, app: App):
+        doc_id = self._next_id
+        self._next_id += 1
+        doc = _Document(app)
+        self._ids[app.key] = doc_id
+        self._docs[doc_id] = doc
+        for token, weight in doc.weighted_tokens().items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                self._vocabulary_dirty = True
+            self._postings[token][doc_id] = weight
+        for trigram in _trigrams(doc.name) | _trigrams(doc.id):
+            self._trigrams.setdefault(trigram, set()).add(doc_id)
+        self._last_candidates = None
+
+    def _unindex(self, key):
+        doc_id = self._ids.pop(key, None)
+        if doc_id is None:
+            return
+        doc = self._docs.pop(doc_id)
+        for token in doc.weighted_tokens():
+            docs = self._postings.get(token)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self._postings[token]
+                    self._vocabulary_dirty = True
+        for trigram in _trigrams(doc.name) | _trigrams(doc.id):
+            docs = self._trigrams.get(trigram)
+            if docs is not None:
+                docs.discard(doc_id)
+        self._last_candidates = None
+
+class SearchCache:
+    """
+    Bounded LRU cache of remote search results per source and query.
+
+    Entries expire after the source's TTL, or as soon as the source's
+    search fingerprint no longer matches the one they were stored with.
+    A query that extends a cached one (same words, more letters) is
+    answered by filtering the cached results locally, unless those were
+    truncated: the source may have left out apps the longer query matches.
+    """
+
+    MAX_ENTRIES = 64
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (source, normalized query) -> (stored at, fingerprint, SearchResults)
+
+    def get(self, source, query: str, ttl: float, fingerprint=None) -> Optional[SearchResults]:
+        """
+        Look up results for a query.
+
+        Args:
+            source: Package source the results came from
+            query: Query as typed by the user
+            ttl: Maximum age of usable results, in seconds
+            fingerprint: Current search fingerprint of the source
+
+        Returns:
+            Cached or locally refined results, with truncated as the
+            source reported it, or None on a miss
+        """
+        normalized = ' '.join(tokenize(query))
+        now = time.monotonic()
+        with self._lock:
+            best = None
+            for key, (stored_at, stored_fingerprint, apps) in list(self._entries.items()):
+                if now - stored_at > ttl or stored_fingerprint != fingerprint:
+                    if key[0] == source:
+                        del self._entries[key]
+                    continue
+                if key[0] != source or not normalized.startswith(key[1]):
+                    continue
+                if apps.truncated and key[1] != normalized:
+                    continue
+                if best is None or len(key[1]) > len(best[0][1]):
+                    best = (key, stored_at, apps)
+            if best is None:
+                return None
+
+            key, stored_at, apps = best
+            self._entries.move_to_end(key)
+            if key[1] == normalized:
+                return SearchResults(apps, apps.truncated)
+            tokens = normalized.split()
+            refined = SearchResults(app for app in apps if _matches_words(app, tokens))
+            # Refinements expire together with the results they came from
+            self._store((source, normalized), stored_at, fingerprint, refined)
+            return SearchResults(refined)
+
+    def put(self, source, query: str, apps: List[App], fingerprint=None):
+        """Store the results of a query; SearchResults keep their truncated flag."""
+        truncated = isinstance(apps, SearchResults) and apps.truncated
+        with self._lock:
+            self._store((source, ' '.join(tokenize(query))), time.monotonic(), fingerprint,
+                        SearchResults(apps, truncated))
+
+    def invalidate(self, source=None):
+        """Drop the entries of one source, or all entries."""
+        with self._lock:
+            if source is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == source]:
+                    del self._entries[key]
+
+    def _store(self, key, stored_at: float, fingerprint, apps: SearchResults):
+        self._entries[key] = (stored_at, fingerprint, apps)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+def _matches_words(app: App, tokens: List[str]) -> bool:
+    """Check that every word occurs in the app's id, name or summary."""
+    text = f"{app.id} {app.name} {app.summary}".lower()
+    return all(token in text for token in tokens)
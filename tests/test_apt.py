@@ -0,0 +1,68 @@
+"""Tests for the APT adapter's parsing of package manager output."""
+
+import subprocess
+import unittest
+from unittest import mock
+from adapters.apt import AptAdapter
+
+UPGRADABLE = """Listing...
+libc6/jammy-updates 2.35-0ubuntu3.6 amd64 [upgradable from: 2.35-0ubuntu3.5]
+libc6/jammy-updates 2.35-0ubuntu3.6 i386 [upgradable from: 2.35-0ubuntu3.5]
+libc6-dev/jammy-updates 2.35-0ubuntu3.6 amd64 [upgradable from: 2.35-0ubuntu3.5]
+vim/jammy-updates 2:8.2.3995-1ubuntu2.15 amd64 [upgradable from: 2:8.2.3995-1ubuntu2.13]
+tzdata/jammy-updates 2024a-0ubuntu0.22.04 all [upgradable from: 2023c-0ubuntu0.22.04.2]
+steam-libs-i386/jammy 1:1.0.0.79 i386 [upgradable from: 1:1.0.0.74]
+"""
+
+# ${binary:Package} of the installed packages: Multi-Arch: same packages
+# carry their architecture even when it is the native one
+INSTALLED = """libc6:amd64
+libc6:i386
+libc6-dev:amd64
+vim
+tzdata
+steam-libs-i386:i386
+"""
+
+class AptGetUpdatesTest(unittest.TestCase):
+    def get_updates(self, upgradable: str, installed: str) -> dict:
+        commands = []
+
+        def run_command(args, token=None, check=True, **kwargs):
+            commands.append(args)
+            output = upgradable if args[0] == "apt" else installed
+            return subprocess.CompletedProcess(args, 0, output, "")
+
+        with mock.patch("adapters.apt.run_command", run_command):
+            updates = AptAdapter().get_updates()
+        self.commands = commands
+        return updates
+
+    def test_ids_match_installed_packages(self):
+        updates = self.get_updates(UPGRADABLE, INSTALLED)
+        self.assertEqual(updates, {
+            "libc6:amd64": "2.35-0ubuntu3.6",
+            "libc6:i386": "2.35-0ubuntu3.6",
+            "libc6-dev:amd64": "2.35-0ubuntu3.6",
+            "vim": "2:8.2.3995-1ubuntu2.15",
+            "tzdata": "2024a-0ubuntu0.22.04",
+            "steam-libs-i386:i386": "1:1.0.0.79",
+        })
+
+    def test_dpkg_is_asked_once_for_every_upgradable_name(self):
+        self.get_updates(UPGRADABLE, INSTALLED)
+        self.assertEqual(len(self.commands), 2)
+        self.assertEqual(self.commands[1][-5:], ["libc6", "libc6-dev", "steam-libs-i386", "tzdata", "vim"])
+
+    def test_nothing_upgradable(self):
+        self.assertEqual(self.get_updates("Listing...\n", INSTALLED), {})
+        # No need to ask dpkg
+        self.assertEqual(len(self.commands), 1)
+
+    def test_unknown_to_dpkg_keeps_plain_name(self):
+        updates = self.get_updates(UPGRADABLE, "")
+        self.assertIn("libc6-dev", updates)
+        self.assertIn("vim", updates)
+
+if __name__ == '__main__':
+    unittest.main()
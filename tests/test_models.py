@@ -0,0 +1,48 @@
+"""Tests for the App record and its lazily attached details."""
+
+import unittest
+from models import App, AppDetails, PackageSource
+
+def make_app() -> App:
+    return App(id="firefox", name="Firefox", source=PackageSource.FLATPAK, version="120.0")
+
+class AppTest(unittest.TestCase):
+    def test_slotted(self):
+        app = make_app()
+        self.assertFalse(hasattr(app, '__dict__'))
+        with self.assertRaises(AttributeError):
+            app.not_a_field = 1
+
+    def test_details_are_attached_when_set(self):
+        app = make_app()
+        self.assertEqual(app.description, "")
+        self.assertIsNone(app.details)
+        # Empty values need no details
+        app.homepage = ""
+        self.assertIsNone(app.details)
+        app.homepage = "https://www.mozilla.org"
+        self.assertIsInstance(app.details, AppDetails)
+        self.assertEqual(app.homepage, "https://www.mozilla.org")
+
+    def test_dependencies_can_be_edited_in_place(self):
+        app = make_app()
+        app.dependencies.append("libgtk-3")
+        app.dependencies.append("libc6")
+        self.assertEqual(app.dependencies, ["libgtk-3", "libc6"])
+
+    def test_copy_does_not_share_details(self):
+        app = make_app()
+        app.developer = "Mozilla"
+        app.dependencies.append("libc6")
+        copy = app.copy()
+        copy.developer = "Someone else"
+        copy.dependencies.append("libgtk-3")
+        self.assertEqual(app.developer, "Mozilla")
+        self.assertEqual(app.dependencies, ["libc6"])
+        self.assertIsNone(make_app().copy().details)
+
+    def test_key(self):
+        self.assertEqual(make_app().key, (PackageSource.FLATPAK, "firefox"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+"""Tests for the operation queue and the recovery of its journal."""
+
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from typing import List
+from adapters import PackageAdapter
+from inventory import InventoryStore
+from manager import ProviderRegistry
+from models import App, PackageSource
+from operations import Operation, OperationJournal, OperationQueue, PRIORITY_BATCH
+from transactions import SourceLocks, TransactionPlanner
+
+class FakeAdapter(PackageAdapter):
+    """Records the apps it acts on; a cleared gate holds every command."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+
+    def get_installed_apps(self) -> List[App]:
+        return []
+
+    def update_app(self, app_id: str) -> bool:
+        return self._act('update', app_id)
+
+    def remove_app(self, app_id: str) -> bool:
+        return self._act('remove', app_id)
+
+    def search_apps(self, query: str, token=None) -> List[App]:
+        return []
+
+    def _act(self, action: str, app_id: str) -> bool:
+        self.started.set()
+        self.gate.wait(5)
+        self.calls.append((action, app_id))
+        return True
+
+class FakeManager:
+    """The parts of OrbitManager the queue uses."""
+
+    def __init__(self):
+        self.registry = ProviderRegistry()
+        self.adapter = FakeAdapter()
+        self.registry.register(PackageSource.APT, self.adapter)
+        self.planner = TransactionPlanner(self.registry)
+        self.source_locks = SourceLocks()
+        self.inventory = InventoryStore()
+        self.updated = []
+
+    def _mark_updated(self, app: App):
+        self.updated.append(app.id)
+
+def make_app(app_id: str, version: str = "1.0") -> App:
+    return App(id=app_id, name=app_id, source=PackageSource.APT, version=version)
+
+class OperationQueueTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = self._tmp.name
+        self.journal_path = Path(self.cache_dir) / 'operations.journal'
+        self.manager = FakeManager()
+
+    def tearDown(self):
+        self.manager.adapter.gate.set()
+        self._tmp.cleanup()
+
+    def queue(self) -> OperationQueue:
+        return OperationQueue(self.manager, cache_dir=self.cache_dir)
+
+    def test_runs_operation_and_compacts_journal(self):
+        queue = self.queue()
+        apps = [make_app("vim"), make_app("git")]
+        operation = queue.submit('update', apps)
+        self.assertTrue(operation.wait(5))
+        self.assertEqual(operation.summary(), {'success': 2, 'failed': 0, 'cancelled': 0, 'total': 2})
+        self.assertEqual(sorted(self.manager.updated), ["git", "vim"])
+        # Nothing unresolved is left once the queue is idle
+        self.assertEqual(self.journal_path.read_text(), "")
+        self.assertEqual(self.queue().interrupted, [])
+
+    def test_equivalent_request_joins_queued_operation(self):
+        queue = self.queue()
+        self.manager.adapter.gate.clear()
+        running = queue.submit('update', [make_app("vim")])
+        self.manager.adapter.started.wait(5)
+        queued = queue.submit('update', [make_app("git"), make_app("curl")], PRIORITY_BATCH)
+        self.assertIs(queue.submit('update', [make_app("git")]), queued)
+        self.manager.adapter.gate.set()
+        self.assertTrue(running.wait(5) and queued.wait(5))
+        self.assertEqual(self.manager.adapter.calls.count(('update', 'git')), 1)
+
+    def test_removal_withdraws_queued_update(self):
+        queue = self.queue()
+        self.manager.adapter.gate.clear()
+        running = queue.submit('update', [make_app("vim")])
+        self.manager.adapter.started.wait(5)
+        update = queue.submit('update', [make_app("git"), make_app("curl")])
+        removal = queue.submit('remove', [make_app("git")])
+        self.manager.adapter.gate.set()
+        for operation in (running, update, removal):
+            self.assertTrue(operation.wait(5))
+        self.assertIsNone(update.results[(PackageSource.APT, "git")])
+        self.assertTrue(update.results[(PackageSource.APT, "curl")])
+        self.assertTrue(removal.results[(PackageSource.APT, "git")])
+        self.assertNotIn(('update', 'git'), self.manager.adapter.calls)
+
+    def interrupt(self) -> Operation:
+        """Journal an update of three apps that stopped while the second one ran."""
+        journal = OperationJournal(self.journal_path)
+        apps = [make_app("vim"), make_app("git"), make_app("curl")]
+        operation = Operation('update', apps)
+        journal.queued(operation)
+        journal.job(operation, 'started', apps[:1])
+        journal.job(operation, 'finished', apps[:1], {apps[0].key: True})
+        journal.job(operation, 'started', apps[1:2])
+        # An operation that completed must not come back
+        done = Operation('remove', [make_app("nano")])
+        journal.queued(done)
+        journal.done(done.id)
+        # The crash cut the last record short
+        with open(self.journal_path, 'a') as f:
+            f.write('{"op": "' + operation.id + '", "event": "fini')
+        return operation
+
+    def test_journal_is_read_back_after_a_crash(self):
+        original = self.interrupt()
+        queue = self.queue()
+        self.assertEqual(len(queue.interrupted), 1)
+        operation = queue.interrupted[0]
+        self.assertEqual(operation.id, original.id)
+        self.assertEqual(operation.state, 'interrupted')
+        self.assertEqual(operation.results, {(PackageSource.APT, "vim"): True})
+        self.assertEqual(operation.unfinished, {(PackageSource.APT, "git")})
+
+    def test_recover_skips_apps_the_inventory_shows_done(self):
+        self.interrupt()
+        # git was upgraded before the exit, curl never started
+        self.manager.inventory.add(make_app("git", version="2.0"))
+        self.manager.inventory.add(make_app("curl"))
+        queue = self.queue()
+        unresolved = queue.recover()
+        self.assertEqual(len(unresolved), 1)
+        self.assertEqual([app.id for app in unresolved[0].remaining], ["curl"])
+        self.assertEqual(queue.recover(), [])
+
+    def test_resume_runs_only_the_remaining_apps(self):
+        self.interrupt()
+        self.manager.inventory.add(make_app("git", version="2.0"))
+        self.manager.inventory.add(make_app("curl"))
+        queue = self.queue()
+        interrupted = queue.recover()[0]
+        operation = queue.resume(interrupted)
+        self.assertTrue(operation.wait(5))
+        self.assertEqual(self.manager.adapter.calls, [('update', 'curl')])
+        self.assertEqual(queue.interrupted, [])
+        self.assertEqual(self.queue().interrupted, [])
+
+    def test_discard_forgets_the_operation(self):
+        self.interrupt()
+        queue = self.queue()
+        for operation in queue.recover():
+            queue.discard(operation)
+        self.assertEqual(self.queue().interrupted, [])
+        self.assertEqual(self.manager.adapter.calls, [])
+
+    def test_operation_without_work_left_is_closed(self):
+        self.interrupt()
+        for app_id in ("git", "curl"):
+            self.manager.inventory.add(make_app(app_id, version="2.0"))
+        self.assertEqual(self.queue().recover(), [])
+        self.assertEqual(self.queue().interrupted, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Tests for the progress parsers, fed the lines each package manager prints."""
+
+import unittest
+from utils.progress import (
+    AptProgressParser, DnfProgressParser, FlatpakProgressParser, PacmanProgressParser,
+    ProgressParser, SnapProgressParser, parse_size
+)
+
+class ParseSizeTest(unittest.TestCase):
+    def test_units(self):
+        self.assertEqual(parse_size("Need to get 1,234 kB of archives."), 1_234_000)
+        self.assertEqual(parse_size("1.7 MB"), 1_700_000)
+        self.assertEqual(parse_size("12.3 MiB"), int(12.3 * 1024 ** 2))
+        self.assertEqual(parse_size("Total download size: 12 M"), 12_000_000)
+        self.assertEqual(parse_size("512 B"), 512)
+        self.assertIsNone(parse_size("no size here"))
+
+class ProgressParserTest(unittest.TestCase):
+    def test_plain_percent(self):
+        parser = ProgressParser()
+        self.assertEqual(parser.feed("working 45%").percent, 45.0)
+        self.assertEqual(parser.feed("odd 120 %").percent, 100.0)
+        self.assertIsNone(parser.feed("no progress"))
+
+class AptProgressParserTest(unittest.TestCase):
+    def test_download_uses_need_to_get(self):
+        parser = AptProgressParser()
+        self.assertIsNone(parser.feed("Need to get 12.3 MB of archives."))
+        event = parser.feed("dlstatus:2:41.5:Retrieving file 2 of 5")
+        self.assertEqual(event.phase, 'download')
+        self.assertEqual(event.percent, 41.5)
+        self.assertEqual(event.total, 12_300_000)
+        self.assertEqual(event.downloaded, int(12_300_000 * 0.415))
+
+    def test_download_without_size(self):
+        event = AptProgressParser().feed("dlstatus:1:10:Retrieving file 1 of 5")
+        self.assertEqual(event.phase, 'download')
+        self.assertIsNone(event.total)
+        self.assertIsNone(event.downloaded)
+
+    def test_dpkg_status(self):
+        event = AptProgressParser().feed("pmstatus:vim:62.5:Unpacking vim (amd64)")
+        self.assertEqual((event.phase, event.percent, event.package), ('install', 62.5, 'vim'))
+
+    def test_other_lines(self):
+        parser = AptProgressParser()
+        for line in ("Reading package lists...", "dlstatus:", "pmstatus:vim:soon:Unpacking vim"):
+            self.assertIsNone(parser.feed(line))
+
+class PacmanProgressParserTest(unittest.TestCase):
+    def test_transaction(self):
+        parser = PacmanProgressParser()
+        self.assertIsNone(parser.feed("Packages (3) vim-9.1-1  gvim-9.1-1  vim-runtime-9.1-1"))
+        self.assertIsNone(parser.feed("Total Download Size:   12.34 MiB"))
+        event = parser.feed(":: Retrieving packages...")
+        self.assertEqual((event.phase, event.percent, event.total), ('download', 0.0, int(12.34 * 1024 ** 2)))
+
+        # Each download counts as one of the three packages
+        self.assertEqual(parser.feed(" vim-9.1-1-x86_64 downloading...").percent, 0.0)
+        event = parser.feed(" gvim-9.1-1-x86_64 downloading...")
+        self.assertAlmostEqual(event.percent, 100 / 3)
+        self.assertEqual(event.package, "gvim-9.1-1-x86_64")
+
+        self.assertEqual(parser.feed(":: Processing package changes...").phase, 'install')
+        event = parser.feed("(2/5) upgrading vim")
+        self.assertEqual((event.phase, event.percent, event.package), ('install', 20.0, 'vim'))
+
+    def test_padded_step(self):
+        event = PacmanProgressParser().feed("( 1/10) removing nano")
+        self.assertEqual((event.phase, event.percent, event.package), ('install', 0.0, 'nano'))
+
+class DnfProgressParserTest(unittest.TestCase):
+    def test_dnf_download(self):
+        parser = DnfProgressParser()
+        self.assertIsNone(parser.feed("Total download size: 3.4 M"))
+        event = parser.feed("(1/3): vim-9.1.rpm  1.2 MB/s | 1.7 MB  00:01")
+        self.assertEqual(event.phase, 'download')
+        self.assertAlmostEqual(event.percent, 100 / 3)
+        self.assertEqual(event.package, "vim-9.1.rpm")
+        self.assertEqual(event.downloaded, 1_700_000)
+        self.assertEqual(event.total, 3_400_000)
+
+    def test_dnf5_redraws_a_line(self):
+        parser = DnfProgressParser()
+        parser.feed("[1/3] vim-9.1.rpm 100% | 1.2 MiB/s | 1.7 MiB | 00m01s")
+        event = parser.feed("[2/3] gvim-9.1.rpm 40% | 1.2 MiB/s | 1.0 MiB | 00m01s")
+        self.assertAlmostEqual(event.percent, 100 * 1.4 / 3)
+        # The redrawn line replaces the earlier size of the same package
+        event = parser.feed("[2/3] gvim-9.1.rpm 100% | 1.2 MiB/s | 2.0 MiB | 00m02s")
+        self.assertAlmostEqual(event.percent, 200 / 3)
+        self.assertEqual(event.downloaded, int(1.7 * 1024 ** 2) + 2 * 1024 ** 2)
+
+    def test_dnf_step(self):
+        event = DnfProgressParser().feed("  Upgrading        : vim-2:9.1-1.fc39.x86_64          1/4")
+        self.assertEqual((event.phase, event.percent, event.package), ('install', 25.0, 'vim-2:9.1-1.fc39.x86_64'))
+
+    def test_dnf5_step(self):
+        event = DnfProgressParser().feed("[2/6] Upgrading vim-2:9.1-1.fc39.x86_64")
+        self.assertEqual(event.phase, 'install')
+        self.assertAlmostEqual(event.percent, 100 / 3)
+        self.assertEqual(event.package, 'vim-2:9.1-1.fc39.x86_64')
+
+class FlatpakProgressParserTest(unittest.TestCase):
+    def test_ref_progress(self):
+        parser = FlatpakProgressParser()
+        event = parser.feed("Updating org.gnome.Maps/x86_64/stable")
+        self.assertEqual((event.phase, event.percent, event.package), ('download', 0.0, 'org.gnome.Maps'))
+        event = parser.feed("Updating… 45%  1.2 MB/s")
+        self.assertEqual((event.percent, event.package), (45.0, 'org.gnome.Maps'))
+
+    def test_uninstall(self):
+        event = FlatpakProgressParser().feed("Uninstalling app/org.gnome.Maps/x86_64/stable")
+        self.assertEqual((event.phase, event.package), ('install', 'org.gnome.Maps'))
+
+class SnapProgressParserTest(unittest.TestCase):
+    def test_tasks(self):
+        parser = SnapProgressParser()
+        event = parser.feed('Download snap "firefox" (3836) from channel "stable" 45%')
+        self.assertEqual((event.phase, event.percent, event.package), ('download', 45.0, 'firefox'))
+        event = parser.feed('Mount snap "firefox" (3836) 80%')
+        self.assertEqual((event.phase, event.percent, event.package), ('install', 80.0, 'firefox'))
+        self.assertIsNone(parser.feed('firefox 120.0 from Mozilla refreshed'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""Tests for the remote search cache and the local search index."""
+
+import unittest
+from models import App, PackageSource, SearchResults
+from search import SearchCache, SearchIndex
+
+def make_app(app_id: str, summary: str = "", source: PackageSource = PackageSource.APT) -> App:
+    return App(id=app_id, name=app_id, source=source, version="1.0", summary=summary, is_installed=False)
+
+class SearchCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = SearchCache()
+        self.apps = [make_app("firefox", "Web browser"), make_app("firewall", "Packet filter"),
+                     make_app("fireplace", "Cosy")]
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.get(PackageSource.APT, "fire", 60))
+
+    def test_exact_hit(self):
+        self.cache.put(PackageSource.APT, "fire", self.apps)
+        self.assertEqual(self.cache.get(PackageSource.APT, "  Fire ", 60), self.apps)
+
+    def test_prefix_reuse_filters_complete_results(self):
+        self.cache.put(PackageSource.APT, "fire", self.apps)
+        results = self.cache.get(PackageSource.APT, "firef", 60)
+        self.assertEqual([app.id for app in results], ["firefox"])
+        self.assertFalse(results.truncated)
+        # Extra words are matched against the summary too
+        results = self.cache.get(PackageSource.APT, "fire packet", 60)
+        self.assertEqual([app.id for app in results], ["firewall"])
+
+    def test_truncated_results_are_not_refined(self):
+        # A source that stopped at its limit may have left out apps the longer query matches
+        apps = [make_app(f"python3-mod{i:03d}") for i in range(200)]
+        self.cache.put(PackageSource.APT, "python3", SearchResults(apps, truncated=True))
+        self.assertIsNone(self.cache.get(PackageSource.APT, "python3-requests", 60))
+
+        results = self.cache.get(PackageSource.APT, "python3", 60)
+        self.assertEqual(len(results), 200)
+        self.assertTrue(results.truncated)
+
+    def test_longest_complete_prefix_is_used(self):
+        self.cache.put(PackageSource.APT, "f", SearchResults(self.apps[:1], truncated=True))
+        self.cache.put(PackageSource.APT, "fir", self.apps)
+        results = self.cache.get(PackageSource.APT, "firew", 60)
+        self.assertEqual([app.id for app in results], ["firewall"])
+
+    def test_sources_are_separate(self):
+        self.cache.put(PackageSource.APT, "fire", self.apps)
+        self.assertIsNone(self.cache.get(PackageSource.FLATPAK, "fire", 60))
+
+    def test_expired_and_stale_entries(self):
+        self.cache.put(PackageSource.APT, "fire", self.apps, fingerprint="lists-1")
+        self.assertIsNone(self.cache.get(PackageSource.APT, "fire", 60, fingerprint="lists-2"))
+        self.cache.put(PackageSource.APT, "fire", self.apps)
+        self.assertIsNone(self.cache.get(PackageSource.APT, "fire", -1))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = SearchCache(max_entries=2)
+        cache.put(PackageSource.APT, "one", self.apps)
+        cache.put(PackageSource.APT, "two", self.apps)
+        cache.get(PackageSource.APT, "one", 60)
+        cache.put(PackageSource.APT, "three", self.apps)
+        self.assertIsNotNone(cache.get(PackageSource.APT, "one", 60))
+        self.assertIsNone(cache.get(PackageSource.APT, "two", 60))
+
+    def test_invalidate(self):
+        self.cache.put(PackageSource.APT, "fire", self.apps)
+        self.cache.put(PackageSource.SNAP, "fire", self.apps)
+        self.cache.invalidate(PackageSource.APT)
+        self.assertIsNone(self.cache.get(PackageSource.APT, "fire", 60))
+        self.assertIsNotNone(self.cache.get(PackageSource.SNAP, "fire", 60))
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.apps = [
+            make_app("firefox", "Web browser"),
+            make_app("thunderbird", "Mail client from the makers of firefox"),
+            make_app("gimp", "Image editor"),
+            make_app("inkscape", "Vector graphics editor"),
+            make_app("fire-starter", "Camp tool"),
+        ]
+        self.index = SearchIndex(self.apps)
+
+    def ids(self, query: str) -> list:
+        return [app.id for app in self.index.search(query)]
+
+    def test_word_prefixes_in_every_field(self):
+        self.assertEqual(set(self.ids("edit")), {"gimp", "inkscape"})
+        self.assertEqual(set(self.ids("brow")), {"firefox"})
+
+    def test_substrings_of_names(self):
+        self.assertEqual(self.ids("fox")[0], "firefox")
+        # Too short to be matched inside a word
+        self.assertEqual(self.ids("ox"), [])
+
+    def test_every_word_must_match(self):
+        self.assertEqual(self.ids("vector editor"), ["inkscape"])
+        self.assertEqual(self.ids("vector browser"), [])
+
+    def test_name_matches_rank_above_summary_matches(self):
+        self.assertEqual(self.ids("firefox"), ["firefox", "thunderbird"])
+
+    def test_typing_matches_a_fresh_search(self):
+        # Extending the previous query filters its candidates instead of
+        # querying the index again, which must not change the results
+        for query in ("f", "fi", "fir", "fire", "firef", "firefo", "firefox", "firefox m"):
+            with self.subTest(query=query):
+                self.assertEqual(self.ids(query), [app.id for app in SearchIndex(self.apps).search(query)])
+
+    def test_add_and_remove(self):
+        self.index.add(make_app("firewalld", "Firewall daemon"))
+        self.assertIn("firewalld", self.ids("firew"))
+        self.index.remove((PackageSource.APT, "firefox"))
+        self.assertNotIn("firefox", self.ids("fire"))
+        self.assertEqual(len(self.index), len(self.apps))
+
+    def test_limit(self):
+        self.assertEqual(len(self.index.search("e", limit=2)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
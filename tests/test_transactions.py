@@ -0,0 +1,152 @@
+"""Tests for batch transactions and the adapters' fallback to one command per app."""
+
+import re
+import unittest
+from typing import List
+from adapters import PackageAdapter
+from manager import ProviderRegistry
+from models import App, PackageSource
+from transactions import Transaction, TransactionPlanner
+
+class StubAdapter(PackageAdapter):
+    """
+    Runs no commands: the batch command exits with `status` and each
+    single-app command returns `results[app_id]`, or raises it if it is
+    an exception.
+    """
+
+    def __init__(self, status=0, results=None, privileged=True, lines=()):
+        self.status = status
+        self.results = results or {}
+        self.privileged = privileged
+        self.lines = lines
+        self.commands = []
+        self.singles = []
+
+    def get_installed_apps(self) -> List[App]:
+        return []
+
+    def search_apps(self, query: str, token=None) -> List[App]:
+        return []
+
+    def get_batch_command(self, action, app_ids):
+        command = [action, *app_ids]
+        return ["pkexec", *command] if self.privileged else command
+
+    def stream_command(self, command, on_line, token=None, can_stop=None) -> int:
+        self.commands.append(command)
+        for line in self.lines:
+            on_line(line)
+        return self.status
+
+    def update_app(self, app_id: str) -> bool:
+        return self._single(app_id)
+
+    def remove_app(self, app_id: str) -> bool:
+        return self._single(app_id)
+
+    def _single(self, app_id: str) -> bool:
+        self.singles.append(app_id)
+        result = self.results.get(app_id, True)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+class FailingAdapter(StubAdapter):
+    def update_apps(self, app_ids, on_package=None, token=None, on_progress=None):
+        raise OSError("database is locked")
+
+def make_app(app_id: str, source: PackageSource = PackageSource.APT) -> App:
+    return App(id=app_id, name=app_id, source=source, version="1.0")
+
+class TransactionPlannerTest(unittest.TestCase):
+    def test_groups_by_source_in_registration_order(self):
+        registry = ProviderRegistry()
+        registry.register(PackageSource.FLATPAK, StubAdapter())
+        registry.register(PackageSource.APT, StubAdapter())
+        apps = [make_app("vim"), make_app("org.gnome.Maps", PackageSource.FLATPAK),
+                make_app("firefox", PackageSource.SNAP), make_app("git")]
+        plan = TransactionPlanner(registry).plan('update', apps)
+        self.assertEqual([t.source for t in plan], [PackageSource.FLATPAK, PackageSource.APT, PackageSource.SNAP])
+        self.assertEqual([app.id for app in plan[1].apps], ["vim", "git"])
+        self.assertIs(plan[0].adapter, registry.get_adapter(PackageSource.FLATPAK))
+        # Apps of a source without an adapter still get a transaction, which fails them
+        self.assertIsNone(plan[2].adapter)
+        self.assertEqual(plan[2].run(), {(PackageSource.SNAP, "firefox"): False})
+
+    def test_unknown_action(self):
+        with self.assertRaises(ValueError):
+            TransactionPlanner(ProviderRegistry()).plan('downgrade', [make_app("vim")])
+
+class TransactionRunTest(unittest.TestCase):
+    def test_results_by_app_key(self):
+        adapter = StubAdapter(status=0)
+        transaction = Transaction('update', PackageSource.APT, adapter, [make_app("vim"), make_app("git")])
+        self.assertEqual(transaction.run(), {(PackageSource.APT, "vim"): True, (PackageSource.APT, "git"): True})
+        self.assertEqual(adapter.commands, [["pkexec", "update", "vim", "git"]])
+        self.assertIsNone(transaction.error)
+
+    def test_adapter_error_fails_every_app(self):
+        transaction = Transaction('update', PackageSource.APT, FailingAdapter(), [make_app("vim"), make_app("git")])
+        self.assertEqual(transaction.run(), {(PackageSource.APT, "vim"): False, (PackageSource.APT, "git"): False})
+        self.assertIsInstance(transaction.error, OSError)
+
+    def test_reports_apps_as_the_command_starts_on_them(self):
+        adapter = StubAdapter(status=0)
+        adapter.BATCH_PROGRESS = re.compile(r'^Unpacking (\S+)')
+        adapter.lines = ["Reading package lists...", "Unpacking git:amd64", "Unpacking vim"]
+        started = []
+        Transaction('update', PackageSource.APT, adapter, [make_app("vim"), make_app("git")]).run(
+            on_app=lambda app: started.append(app.id))
+        self.assertEqual(started, ["git", "vim"])
+
+class BatchFallbackTest(unittest.TestCase):
+    def run_update(self, adapter, app_ids):
+        transaction = Transaction('update', PackageSource.APT, adapter, [make_app(app_id) for app_id in app_ids])
+        return {key[1]: result for key, result in transaction.run().items()}
+
+    def test_failed_batch_retries_each_app(self):
+        adapter = StubAdapter(status=100, results={"git": False})
+        results = self.run_update(adapter, ["vim", "git", "curl"])
+        self.assertEqual(results, {"vim": True, "git": False, "curl": True})
+        self.assertEqual(len(adapter.commands), 1)
+        self.assertEqual(adapter.singles, ["vim", "git", "curl"])
+
+    def test_error_in_one_app_does_not_stop_the_others(self):
+        adapter = StubAdapter(status=1, results={"vim": OSError("dpkg was interrupted")})
+        self.assertEqual(self.run_update(adapter, ["vim", "git"]), {"vim": False, "git": True})
+
+    def test_refused_authorization_is_not_retried(self):
+        for status in (126, 127):
+            with self.subTest(status=status):
+                adapter = StubAdapter(status=status)
+                self.assertEqual(self.run_update(adapter, ["vim", "git"]), {"vim": False, "git": False})
+                self.assertEqual(adapter.singles, [])
+
+    def test_unprivileged_exit_126_is_retried(self):
+        adapter = StubAdapter(status=126, privileged=False)
+        self.assertEqual(self.run_update(adapter, ["vim", "git"]), {"vim": True, "git": True})
+        self.assertEqual(adapter.singles, ["vim", "git"])
+
+    def test_single_app_is_not_retried(self):
+        adapter = StubAdapter(status=100)
+        self.assertEqual(self.run_update(adapter, ["vim"]), {"vim": False})
+        self.assertEqual(adapter.singles, [])
+
+    def test_without_batch_command_apps_run_one_at_a_time(self):
+        adapter = StubAdapter(results={"git": False})
+        adapter.get_batch_command = lambda action, app_ids: None
+        self.assertEqual(self.run_update(adapter, ["vim", "git"]), {"vim": True, "git": False})
+        self.assertEqual(adapter.commands, [])
+
+    def test_error_of_a_lone_app_is_raised(self):
+        adapter = StubAdapter(results={"vim": OSError("dpkg was interrupted")})
+        adapter.get_batch_command = lambda action, app_ids: None
+        with self.assertRaises(OSError):
+            adapter.update_apps(["vim"])
+        transaction = Transaction('update', PackageSource.APT, adapter, [make_app("vim")])
+        self.assertEqual(transaction.run(), {(PackageSource.APT, "vim"): False})
+        self.assertEqual(str(transaction.error), "dpkg was interrupted")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""Version ordering checked against vectors of dpkg, rpm and pacman."""
+
+import unittest
+from utils.versions import DPKG, PACMAN, RPM
+
+# (a, b, expected result of compare(a, b)), as dpkg --compare-versions orders them
+DPKG_VECTORS = [
+    ('1.0', '1.0', 0),
+    ('1.0', '1.1', -1),
+    ('1.10', '1.9', 1),
+    ('1.0~rc1', '1.0', -1),
+    ('1.0~rc1', '1.0~rc2', -1),
+    ('1.0~~', '1.0~', -1),
+    ('1.0', '1.0+dfsg', -1),
+    ('1.0a', '1.0', 1),
+    ('1.0a', '1.0+', -1),
+    ('1.0-1', '1.0-2', -1),
+    ('1.0-1', '1.0', 1),
+    ('1.0-0', '1.0', 0),
+    ('1:0.9', '2.0', 1),
+    ('0:1.0', '1.0', 0),
+    ('2.30-0ubuntu1', '2.30-0ubuntu1.1', -1),
+    ('2.35-0ubuntu3.1', '2.35-0ubuntu3', 1),
+    ('1.2.3-1~deb12u1', '1.2.3-1', -1),
+    ('1.001', '1.1', 0),
+    ('1.0.0', '1.0', 1),
+    ('1.0', '1.0.', -1),
+    ('7.4.0~beta2', '7.4.0', -1),
+    ('9.0.0000', '9.0.0', 0),
+    ('1.0-1ubuntu1', '1.0-1build1', 1),
+]
+
+# From rpm's rpmvercmp.at
+RPM_VECTORS = [
+    ('1.0', '1.0', 0),
+    ('1.0', '2.0', -1),
+    ('2.0', '1.0', 1),
+    ('2.0.1', '2.0.1', 0),
+    ('2.0', '2.0.1', -1),
+    ('2.0.1a', '2.0.1', 1),
+    ('5.5p1', '5.5p2', -1),
+    ('5.5p10', '5.5p1', 1),
+    ('10xyz', '10.1xyz', -1),
+    ('xyz10', 'xyz10.1', -1),
+    ('xyz.4', '8', -1),
+    ('5.6p1', '6.5p1', -1),
+    ('6.0.rc1', '6.0', 1),
+    ('10b2', '10a1', 1),
+    ('1.0aa', '1.0aaa', -1),
+    ('10.0001', '10.1', 0),
+    ('10.0001', '10.0039', -1),
+    ('4.999.9', '5.0', -1),
+    ('20101121', '20101122', -1),
+    ('2_0', '2_0', 0),
+    ('2.0', '2_0', 0),
+    ('a', 'a', 0),
+    ('a+', 'a_', 0),
+    ('fc4', 'fc.4', 0),
+    ('FC5', 'fc4', -1),
+    ('2a', '2.0', -1),
+    ('1.0a', '1.0', 1),
+    ('1.0~rc1', '1.0', -1),
+    ('1.0~rc1', '1.0~rc2', -1),
+    ('1.0~rc1~git123', '1.0~rc1', -1),
+    ('1.0^', '1.0', 1),
+    ('1.0^git1', '1.0', 1),
+    ('1.0^git1', '1.01', -1),
+    ('1.0^20160101', '1.0.1', -1),
+    ('1.0^20160101^git1', '1.0^20160101', 1),
+    ('1.0~rc1^git1', '1.0~rc1', 1),
+    ('1.0^git1~pre', '1.0^git1', -1),
+    ('1:1.0', '2.0', 1),
+    ('1.0-2', '1.0-1', 1),
+]
+
+# From pacman's test/util/vercmptest.sh
+PACMAN_VECTORS = [
+    ('1.5.0', '1.5.0', 0),
+    ('1.5.1', '1.5.0', 1),
+    ('1.5.1', '1.5', 1),
+    ('1.5.0-1', '1.5.0-2', -1),
+    ('1.5.0-1', '1.5.1-1', -1),
+    ('1.5.0-2', '1.5.1-1', -1),
+    ('1.5-1', '1.5.1-1', -1),
+    ('1.5-2', '1.5.1-2', -1),
+    ('1.5', '1.5-1', 0),
+    ('1.5-1', '1.5', 0),
+    ('1.1-1', '1.1', 0),
+    ('1.0-1', '1.1', -1),
+    ('1.1-1', '1.0', 1),
+    ('1.5b-1', '1.5-1', -1),
+    ('1.5b', '1.5', -1),
+    ('1.5b-1', '1.5', -1),
+    ('1.5b', '1.5.1', -1),
+    ('1.0a', '1.0alpha', -1),
+    ('1.0alpha', '1.0b', -1),
+    ('1.0b', '1.0beta', -1),
+    ('1.0beta', '1.0rc', -1),
+    ('1.0rc', '1.0', -1),
+    ('1.5.a', '1.5', 1),
+    ('1.5.b', '1.5.a', 1),
+    ('1.5.1', '1.5.b', 1),
+    ('1.5.b-1', '1.5.b', 0),
+    ('1.5-1', '1.5.b', -1),
+    ('2.0', '2_0', 0),
+    ('2.0_a', '2_0.a', 0),
+    ('2.0a', '2.0.a', -1),
+    ('2___a', '2_a', 1),
+    ('0:1.0', '0:1.0', 0),
+    ('0:1.0', '0:1.1', -1),
+    ('1:1.0', '0:1.0', 1),
+    ('1:1.0', '0:1.1', 1),
+    ('1:1.0', '2:1.1', -1),
+    ('1:1.0', '0:1.0-1', 1),
+    ('1:1.0-1', '0:1.1-1', 1),
+    ('0:1.0', '1.0', 0),
+    ('0:1.0', '1.1', -1),
+    ('0:1.1', '1.0', 1),
+    ('1:1.0', '1.0', 1),
+    ('1:1.0', '1.1', 1),
+    ('1:1.1', '1.1', 1),
+]
+
+class VersionSchemeTest(unittest.TestCase):
+    def check(self, scheme, vectors):
+        for a, b, expected in vectors:
+            with self.subTest(scheme=scheme.name, a=a, b=b):
+                self.assertEqual(scheme.compare(a, b), expected)
+                self.assertEqual(scheme.compare(b, a), -expected)
+
+    def test_dpkg(self):
+        self.check(DPKG, DPKG_VECTORS)
+
+    def test_rpm(self):
+        self.check(RPM, RPM_VECTORS)
+
+    def test_pacman(self):
+        self.check(PACMAN, PACMAN_VECTORS)
+
+    def test_columns_match_pairwise_compare(self):
+        for scheme, vectors in ((DPKG, DPKG_VECTORS), (RPM, RPM_VECTORS), (PACMAN, PACMAN_VECTORS)):
+            left = [a for a, _, _ in vectors]
+            right = [b for _, b, _ in vectors]
+            with self.subTest(scheme=scheme.name):
+                self.assertEqual(scheme.compare_many(left, right), [expected for _, _, expected in vectors])
+                self.assertEqual(scheme.is_newer(left, right), [expected > 0 for _, _, expected in vectors])
+
+    def test_newest(self):
+        self.assertEqual(DPKG.newest(['1.0-1', '1.0~rc1-1', '1:0.1-1', '1.0-2']), '1:0.1-1')
+        self.assertEqual(RPM.newest(['1.0', '1.0^git1', '1.0~rc1']), '1.0^git1')
+        self.assertEqual(PACMAN.newest(['1.0rc', '1.0', '1.0alpha']), '1.0')
+        self.assertIsNone(DPKG.newest([]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+"""Batch package operations, grouped into one transaction per source."""
+
+import threading
+from typing import Callable, Dict, List, Optional
+from models import App
+from utils.logger import setup_logger
+from utils.process import CancelToken
+
+logger = setup_logger('orbit.transactions')
+
+class Transaction:
+    """
+    Apps of one source installed, updated or removed together.
+
+    The adapter runs a single command for all of them where the package
+    manager supports it, so there is one authentication prompt, one
+    dependency resolution and one database lock per source instead of one
+    per app.
+    """
+
+    ACTIONS = ('install', 'update', 'remove')
+
+    def __init__(self, action: str, source, adapter, apps: List[App]):
+        if action not in self.ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        self.action = action
+        self.source = source
+        self.adapter = adapter
+        self.apps = apps
+        # Set by run() when the adapter raised, failing every app
+        self.error: Optional[Exception] = None
+
+    def run(self, on_app: Callable[[App], None] = None, token: CancelToken = None,
+            on_progress: Callable = None) -> Dict[tuple, Optional[bool]]:
+        """
+        Execute the transaction.
+
+        Args:
+            on_app: Called with each app when the package manager starts on it
+            token: Optional token to cancel the transaction
+            on_progress: Called as on_progress(app, event) for each
+                utils.progress.ProgressEvent; app is None when the event is
+                about the transaction as a whole
+
+        Returns:
+            Dictionary of app key -> whether the action succeeded for it,
+            or None if it was cancelled before it ran
+        """
+        if self.adapter is None:
+            return {app.key: False for app in self.apps}
+
+        by_id = {app.id: app for app in self.apps}
+
+        def on_package(app_id):
+            app = by_id.get(app_id)
+            if app is not None and on_app:
+                on_app(app)
+
+        def on_event(app_id, event):
+            if on_progress:
+                on_progress(by_id.get(app_id), event)
+
+        run = {'install': self.adapter.install_apps, 'update': self.adapter.update_apps,
+               'remove': self.adapter.remove_apps}[self.action]
+        try:
+            outcome = run(list(by_id), on_package, token, on_event)
+        except Exception as e:
+            logger.error(f"Batch {self.action} for {self.source.value} failed: {e}")
+            self.error = e
+            outcome = {}
+        results = {}
+        for app in self.apps:
+            result = outcome.get(app.id, False)
+            results[app.key] = None if result is None else bool(result)
+        return results
+
+class TransactionPlanner:
+    """Splits a batch operation into one transaction per package source."""
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def plan(self, action: str, apps: List[App]) -> List[Transaction]:
+        """
+        Group apps by source.
+
+        Transactions follow the registration order of the sources, and
+        apps keep their order within a transaction.
+
+        Args:
+            action: "install", "update" or "remove"
+            apps: Apps to act on
+
+        Returns:
+            One transaction per source that has apps in the batch
+        """
+        groups = {}
+        for app in apps:
+            groups.setdefault(app.source, []).append(app)
+        order = [source for source, _ in self.registry.items() if source in groups]
+        order.extend(source for source in groups if source not in order)
+        return [Transaction(action, source, self.registry.get_adapter(source), groups[source])
+                for source in order]
+
+class SourceLocks:
+    """
+    One lock per package source.
+
+    Package managers take an exclusive lock on their database, so two
+    operations on the same source must run one after the other, while
+    operations on different sources (APT and Flatpak, say) can overlap.
+    """
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, source) -> threading.Lock:
+        """Return the lock serializing operations on a source."""
+        with self._lock:
+            lock = self._locks.get(source)
+            if lock is None:
+                lock = self._locks[source] = threading.Lock()
+            return lock
+
+class BatchProgress:
+    """
+    Reports per-app progress of a batch as progress_callback(current, total, app_name).
+
+    Package managers may mention an app several times (unpacking, then
+    configuring), and a failed transaction retries its apps one by one,
+    so each app is only counted the first time it is reported. Safe to
+    call from the threads of transactions running side by side.
+    """
+
+    def __init__(self, total: int, callback: Callable[[int, int, str], None] = None):
+        self.total = total
+        self.callback = callback
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def started(self, app: App):
+        """Record that work on an app has started."""
+        with self._lock:
+            if app.key in self._seen:
+                return
+            self._seen.add(app.key)
+            # Reported under the lock so counts never arrive out of order
+            if self.callback:
+                self.callback(len(self._seen), self.total, app.name)
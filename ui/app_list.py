@@ -1,3 +1,4 @@
+import bisect
 import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
@@ -6,31 +7,17 @@ from ui.icons import IconResolver
 from models import PackageSource, UpdateStatus
 
 class AppRow(Adw.ActionRow):
-    def __init__(self, app, advanced=False):
+    def __init__(self, app, advanced=False, conflict=None):
         super().__init__()
-        self.app = app
+        self.app = None
         self.advanced = advanced
         
         # Main Layout
-        self.set_title(app.name)
         self.add_css_class("premium-row")
         self.set_activatable(True)
 
-        # Subtitle Construction
-        subtitle_parts = []
-        if app.version:
-            subtitle_parts.append(f"v{app.version}")
-        
-        # Add summary if available and not too long
-        if app.summary:
-            summary = app.summary[:50] + "..." if len(app.summary) > 50 else app.summary
-            subtitle_parts.append(summary)
-            
-        self.set_subtitle(" • ".join(subtitle_parts))
-
         # Icon
-        icon_name = IconResolver.resolve(app.name, app.id)
-        self.icon_image = Gtk.Image.new_from_icon_name(icon_name)
+        self.icon_image = Gtk.Image()
         self.icon_image.set_pixel_size(48)
         self.icon_image.add_css_class("app-icon")
         self.icon_image.set_margin_top(8)
@@ -41,7 +28,7 @@ class AppRow(Adw.ActionRow):
         source_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
         source_box.set_valign(Gtk.Align.CENTER)
         
-        # Source Label
+        # Source Label; rows are only rebound to apps of the same source
         source_label = Gtk.Label(label=app.source.value)
         source_label.add_css_class("source-badge")
         source_label.add_css_class(f"source-{app.source.value.lower()}")
@@ -49,38 +36,83 @@ class AppRow(Adw.ActionRow):
         
         self.add_suffix(source_box)
 
-        # Status Badges
-        if app.is_installed:
-            installed_icon = Gtk.Image.new_from_icon_name("object-select-symbolic")
-            installed_icon.set_pixel_size(16)
-            installed_icon.add_css_class("dim-label")
-            installed_icon.set_tooltip_text("Installed")
-            # We don't necessarily need a big badge for installed if it's the default view, 
-            # but for search results it's useful.
-            source_box.append(installed_icon)
+        # Status Badges, shown by bind() as they apply
+        self.installed_icon = Gtk.Image.new_from_icon_name("object-select-symbolic")
+        self.installed_icon.set_pixel_size(16)
+        self.installed_icon.add_css_class("dim-label")
+        self.installed_icon.set_tooltip_text("Installed")
+        # We don't necessarily need a big badge for installed if it's the default view, 
+        # but for search results it's useful.
+        source_box.append(self.installed_icon)
         
-        if app.update_status == "UpdateStatus.UPDATE_AVAILABLE": # Enum check might need import
-            update_badge = Gtk.Label(label="Update")
-            update_badge.add_css_class("status-badge")
-            update_badge.add_css_class("update")
-            source_box.append(update_badge)
-
-        if app.sandboxed:
-            sandbox_icon = Gtk.Image.new_from_icon_name("security-high-symbolic")
-            sandbox_icon.set_pixel_size(16)
-            sandbox_icon.set_tooltip_text("Sandboxed")
-            sandbox_icon.add_css_class("dim-label")
-            source_box.append(sandbox_icon)
+        self.update_badge = Gtk.Label(label="Update")
+        self.update_badge.add_css_class("status-badge")
+        self.update_badge.add_css_class("update")
+        source_box.append(self.update_badge)
+
+        self.conflict_icon = Gtk.Image.new_from_icon_name("dialog-warning-symbolic")
+        self.conflict_icon.set_pixel_size(16)
+        self.conflict_icon.add_css_class("warning")
+        source_box.append(self.conflict_icon)
+
+        self.sandbox_icon = Gtk.Image.new_from_icon_name("security-high-symbolic")
+        self.sandbox_icon.set_pixel_size(16)
+        self.sandbox_icon.set_tooltip_text("Sandboxed")
+        self.sandbox_icon.add_css_class("dim-label")
+        source_box.append(self.sandbox_icon)
+
+        self.bind(app, conflict)
+
+    def bind(self, app, conflict=None):
+        """Show an app, or the current state of the app already shown."""
+        previous, self.app = self.app, app
+        self.set_title(app.name)
+
+        # Subtitle Construction
+        subtitle_parts = []
+        if app.version:
+            subtitle_parts.append(f"v{app.version}")
+        
+        # Add summary if available and not too long
+        if app.summary:
+            summary = app.summary[:50] + "..." if len(app.summary) > 50 else app.summary
+            subtitle_parts.append(summary)
+            
+        self.set_subtitle(" • ".join(subtitle_parts))
+
+        # Icon lookups touch the disk, so they are only redone when they could differ
+        if previous is None or (previous.name, previous.id, previous.icon) != (app.name, app.id, app.icon):
+            icon_file = IconResolver.icon_file(app)
+            if icon_file:
+                self.icon_image.set_from_file(icon_file)
+            else:
+                self.icon_image.set_from_icon_name(IconResolver.resolve(app.name, app.id))
+
+        self.installed_icon.set_visible(app.is_installed)
+        self.update_badge.set_visible(app.update_status == UpdateStatus.UPDATE_AVAILABLE)
+        self.conflict_icon.set_visible(conflict is not None)
+        if conflict:
+            others = conflict.others(app)
+            self.conflict_icon.set_tooltip_text(
+                f"Also installed from {len(others)} other source(s): "
+                + ", ".join(dict.fromkeys(other.source.value for other in others))
+            )
+        self.sandbox_icon.set_visible(app.sandboxed)
 
 class AppListView(Gtk.Box):
-    def __init__(self, on_app_selected):
+    def __init__(self, on_app_selected, conflict_lookup=None):
         super().__init__(orientation=Gtk.Orientation.VERTICAL)
         self.on_app_selected = on_app_selected
+        # Returns the ConflictGroup for an app key, or None
+        self.conflict_lookup = conflict_lookup or (lambda key: None)
         
         self.list_box = Gtk.ListBox()
         self.list_box.set_selection_mode(Gtk.SelectionMode.SINGLE)
         self.list_box.add_css_class("boxed-list")
         self.list_box.connect("row-activated", self._on_row_activated)
+        self.advanced = False
+        self._rows = {}  # (source, id) -> rows shown for that app
+        self._order = []  # Lowercase names, parallel to the row order
         
         self.scrolled = Gtk.ScrolledWindow()
         self.scrolled.set_vexpand(True)
@@ -99,10 +131,67 @@ class AppListView(Gtk.Box):
             self.on_app_selected(row.app)
 
     def update_list(self, apps, advanced=False):
+        # Rows of apps that stay in the list are rebound instead of rebuilt,
+        # so narrowing a search while typing does not recreate every widget
+        reusable = {}
+        if advanced == self.advanced:
+            reusable = {key: list(rows) for key, rows in self._rows.items()}
+
         # Clear existing
         while child := self.list_box.get_first_child():
             self.list_box.remove(child)
+        self.advanced = advanced
+        self._rows = {}
+        self._order = []
+
+        for app in apps:
+            rows = reusable.get(app.key)
+            if rows:
+                row = rows.pop(0)
+                row.bind(app, self.conflict_lookup(app.key))
+            else:
+                row = AppRow(app, advanced, self.conflict_lookup(app.key))
+            self.list_box.append(row)
+            self._rows.setdefault(app.key, []).append(row)
+            self._order.append(app.name.lower())
 
+    def append_apps(self, apps):
+        """Add rows for the given apps after the existing ones, in the given order."""
         for app in apps:
-            row = AppRow(app, advanced)
+            row = AppRow(app, self.advanced, self.conflict_lookup(app.key))
             self.list_box.append(row)
+            self._rows.setdefault(app.key, []).append(row)
+            self._order.append(app.name.lower())
+
+    def apply_changes(self, removed, added):
+        """
+        Patch the list in place instead of rebuilding it.
+
+        Only valid while the list is sorted by name; ranked search results
+        have to be rebuilt with update_list.
+
+        Args:
+            removed: Keys of apps whose rows should disappear
+            added: Apps to insert at their name-sorted position
+        """
+        # An app that changed is removed and added again; its row is reused
+        spare = {}
+        for key in removed:
+            rows = self._rows.pop(key, [])
+            for row in rows:
+                del self._order[row.get_index()]
+                self.list_box.remove(row)
+            spare[key] = rows
+
+        for app in added:
+            sort_key = app.name.lower()
+            index = bisect.bisect_right(self._order, sort_key)
+            self._order.insert(index, sort_key)
+            rows = spare.get(app.key)
+            if rows:
+                row = rows.pop(0)
+                row.bind(app, self.conflict_lookup(app.key))
+            else:
+                row = AppRow(app, self.advanced, self.conflict_lookup(app.key))
+            self.list_box.insert(row, index)
+            self._rows.setdefault(app.key, []).append(row)
@@ -6,8 +6,24 @@ gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw, GLib
 import threading
 
+PHASE_LABELS = {
+    'prepare': "Preparing",
+    'download': "Downloading",
+    'install': "Applying changes",
+}
+
 class BatchOperationDialog(Adw.Window):
-    """Dialog for batch operations with progress tracking."""
+    """
+    Dialog for batch operations with progress tracking.
+
+    The operation runs in the manager's operation queue; closing the
+    dialog leaves it running there. Progress arrives from worker threads,
+    often many times per second while packages download. The latest state
+    is kept and drawn at most every UPDATE_INTERVAL_MS, so a chatty
+    package manager cannot flood the main loop.
+    """
+
+    UPDATE_INTERVAL_MS = 33
     
     def __init__(self, parent, operation_name: str):
         super().__init__()
@@ -38,6 +54,12 @@ class BatchOperationDialog(Adw.Window):
         self.current_app_label = Gtk.Label(label="")
         self.current_app_label.add_css_class("dim-label")
         main_box.append(self.current_app_label)
+
+        # Download and install progress of the package manager
+        self.detail_label = Gtk.Label(label="")
+        self.detail_label.add_css_class("dim-label")
+        self.detail_label.add_css_class("caption")
+        main_box.append(self.detail_label)
         
         # Results area (initially hidden)
         self.results_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
@@ -49,8 +71,55 @@ class BatchOperationDialog(Adw.Window):
         self.close_button.connect('clicked', lambda _: self.close())
         self.close_button.set_visible(False)
         main_box.append(self.close_button)
+
+        # Cancel button, shown while the operation runs
+        self.cancel_button = Gtk.Button(label="Cancel")
+        self.cancel_button.connect('clicked', self.on_cancel)
+        main_box.append(self.cancel_button)
         
         self.operation_complete = False
+        self.operation = None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_id = None
+
+    def follow(self, operation):
+        """Show the progress and results of a queued operation."""
+        self.operation = operation
+        operation.add_listener(on_done=lambda op: GLib.idle_add(self.show_results, op.summary()),
+                               on_progress=self.progress_callback, on_event=self.event_callback)
+
+    def on_cancel(self, button):
+        """Ask the running operation to stop."""
+        if self.operation is not None:
+            self.operation.cancel()
+        self.cancel_button.set_sensitive(False)
+        self.cancel_button.set_label("Cancelling…")
+
+    def progress_callback(self, current: int, total: int, app_name: str):
+        """Record app progress; safe to call from any thread."""
+        self._post('count', (current, total, app_name))
+
+    def event_callback(self, source, app, event):
+        """Record a ProgressEvent of a source; safe to call from any thread."""
+        self._post('event', (source, app, event))
+
+    def _post(self, kind: str, value):
+        with self._pending_lock:
+            self._pending[kind] = value
+            if self._flush_id is None:
+                self._flush_id = GLib.timeout_add(self.UPDATE_INTERVAL_MS, self._flush)
+
+    def _flush(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._flush_id = None
+        if not self.operation_complete:
+            if 'count' in pending:
+                self.update_progress(*pending['count'])
+            if 'event' in pending:
+                self.update_detail(*pending['event'])
+        return GLib.SOURCE_REMOVE
     
     def update_progress(self, current: int, total: int, app_name: str):
         """Update progress display."""
@@ -59,13 +128,30 @@ class BatchOperationDialog(Adw.Window):
         self.progress_bar.set_text(f"{current} / {total}")
         self.status_label.set_text(f"Processing ({current}/{total})")
         self.current_app_label.set_text(f"Current: {app_name}")
+
+    def update_detail(self, source, app, event):
+        """Show the phase, percentage and download size of a ProgressEvent."""
+        parts = [PHASE_LABELS.get(event.phase, event.phase.capitalize())]
+        name = app.name if app is not None else event.package
+        if name:
+            parts.append(name)
+        elif source is not None:
+            parts.append(source.value)
+        if event.percent is not None:
+            parts.append(f"{event.percent:.0f}%")
+        if event.phase == 'download' and event.total:
+            downloaded = GLib.format_size(event.downloaded or 0)
+            parts.append(f"{downloaded} of {GLib.format_size(event.total)}")
+        self.detail_label.set_text(" · ".join(parts))
     
     def show_results(self, results: dict):
         """Show operation results."""
         self.operation_complete = True
-        self.status_label.set_text("Operation Complete")
+        self.status_label.set_text("Operation Cancelled" if results.get('cancelled') else "Operation Complete")
         self.progress_bar.set_fraction(1.0)
         self.current_app_label.set_text("")
+        self.detail_label.set_text("")
+        self.cancel_button.set_visible(False)
         
         # Success
         if results['success'] > 0:
@@ -84,6 +170,14 @@ class BatchOperationDialog(Adw.Window):
             )
             failed_row.add_css_class("error-row")
             self.results_box.append(failed_row)
+
+        # Cancelled
+        if results.get('cancelled', 0) > 0:
+            cancelled_row = Adw.ActionRow(
+                title=f"⏹ Cancelled: {results['cancelled']}",
+                subtitle="Operations stopped before they were applied"
+            )
+            self.results_box.append(cancelled_row)
         
         self.close_button.set_visible(True)
 
@@ -97,16 +191,8 @@ class BatchUpdateDialog(BatchOperationDialog):
         self.start_operation()
     
     def start_operation(self):
-        """Start the batch update operation."""
-        def progress_callback(current, total, app_name):
-            GLib.idle_add(self.update_progress, current, total, app_name)
-        
-        def run_update():
-            results = self.manager.update_all(progress_callback)
-            GLib.idle_add(self.show_results, results)
-        
-        thread = threading.Thread(target=run_update, daemon=True)
-        thread.start()
+        """Queue the batch update operation."""
+        self.follow(self.manager.submit_update_all())
 
 
 class BatchRemoveDialog(BatchOperationDialog):
@@ -119,13 +205,5 @@ class BatchRemoveDialog(BatchOperationDialog):
         self.start_operation()
     
     def start_operation(self):
-        """Start the batch remove operation."""
-        def progress_callback(current, total, app_name):
-            GLib.idle_add(self.update_progress, current, total, app_name)
-        
-        def run_remove():
-            results = self.manager.remove_multiple(self.apps, progress_callback)
-            GLib.idle_add(self.show_results, results)
-        
-        thread = threading.Thread(target=run_remove, daemon=True)
-        thread.start()
+        """Queue the batch remove operation."""
+        self.follow(self.manager.submit_removal(self.apps))
@@ -168,8 +168,12 @@ class DetailsView(Gtk.Box):
         self.developer_label.set_label(app.developer if app.developer else "Unknown Developer")
         
         # Icon
-        icon_name = IconResolver.resolve(app.name, app.id)
-        self.icon_image.set_from_icon_name(icon_name)
+        icon_file = IconResolver.icon_file(app)
+        if icon_file:
+            self.icon_image.set_from_file(icon_file)
+        else:
+            icon_name = IconResolver.resolve(app.name, app.id)
+            self.icon_image.set_from_icon_name(icon_name)
         
         # Metadata
         self.version_row.set_subtitle(app.version if app.version else "Unknown")
@@ -309,32 +313,24 @@ class DetailsView(Gtk.Box):
             Gtk.show_uri(None, self.app.homepage, Gdk.CURRENT_TIME)
 
     def perform_action(self, action_type):
-        """Perform action with UI feedback."""
+        """Queue the action with the manager and report when it is done."""
         self.action_bar.set_sensitive(False)
         self.status_label.set_text(f"{action_type.capitalize()}ing...")
-        
-        def run_action():
-            success = False
-            try:
-                if not self.orbit_app or not hasattr(self.orbit_app, 'manager'):
-                    raise Exception("Manager not ready")
 
-                if action_type == "install":
-                    success = self.orbit_app.manager.install_app(self.app)
-                elif action_type == "remove":
-                    success = self.orbit_app.manager.remove_app(self.app)
-                elif action_type == "update":
-                    success = self.orbit_app.manager.update_app(self.app)
-            except Exception as e:
-                print(f"Action failed: {e}")
-                GLib.idle_add(self.show_error, str(e))
-                success = False
-            
-            GLib.idle_add(self.on_action_complete, action_type, success)
+        if not self.orbit_app or not hasattr(self.orbit_app, 'manager'):
+            self.show_error("Manager not ready")
+            self.on_action_complete(action_type, False)
+            return
+
+        app = self.app
+
+        def on_done(operation):
+            GLib.idle_add(self.on_action_complete, action_type, bool(operation.results.get(app.key)),
+                          operation.errors.get(app.key))
 
-        threading.Thread(target=run_action, daemon=True).start()
+        self.orbit_app.manager.operations.submit(action_type, [app], on_done=on_done)
 
-    def on_action_complete(self, action_type, success):
+    def on_action_complete(self, action_type, success, error=None):
         self.action_bar.set_sensitive(True)
         if success:
             self.status_label.set_text(f"✅ {action_type.capitalize()} successful")
@@ -342,6 +338,8 @@ class DetailsView(Gtk.Box):
              # For now, rely on refresh callback
             if self.on_action_done:
                 self.on_action_done()
+        elif error:
+            self.show_error(error)
         else:
             self.status_label.set_text(f"❌ {action_type.capitalize()} failed")
 
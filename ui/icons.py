@@ -1,8 +1,16 @@
+import os
 import gi
 gi.require_version('Gtk', '4.0')
 from gi.repository import Gtk, Gio, Gdk
 
 class IconResolver:
+    @staticmethod
+    def icon_file(app):
+        """Returns the icon file an adapter found for the app (e.g. from appstream), if any."""
+        if app.icon and os.path.isabs(app.icon) and os.path.exists(app.icon):
+            return app.icon
+        return None
+
     @staticmethod
     def resolve(app_name, app_id):
         """Attempts to find a suitable icon for the app."""
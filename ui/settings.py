@@ -83,6 +83,15 @@ class SettingsDialog(Adw.PreferencesWindow):
         self.auto_update_row.connect('notify::active', self.on_auto_update_changed)
         updates_group.add(self.auto_update_row)
         
+        # Live inventory toggle
+        self.watch_row = Adw.SwitchRow(
+            title="Watch for Changes",
+            subtitle="Show packages installed outside Orbit without refreshing (applies on restart)"
+        )
+        self.watch_row.set_active(config.get('watch_for_changes', True))
+        self.watch_row.connect('notify::active', self.on_watch_changed)
+        updates_group.add(self.watch_row)
+        
         # Package sources page
         sources_page = Adw.PreferencesPage(title="Sources", icon_name="folder-symbolic")
         self.add(sources_page)
@@ -143,6 +152,10 @@ class SettingsDialog(Adw.PreferencesWindow):
         """Handle auto-update toggle."""
         self.config.set('auto_update_check', switch.get_active())
     
+    def on_watch_changed(self, switch, *args):
+        """Handle live inventory toggle."""
+        self.config.set('watch_for_changes', switch.get_active())
+    
     def on_theme_changed(self, row, *args):
         """Handle theme change."""
         selected = row.get_selected_item().get_string()
@@ -4,6 +4,7 @@ import gi
 gi.require_version('Gtk', '4.0')
 gi.require_version('Adw', '1')
 from gi.repository import Gtk, Adw
+from inventory import format_size
 
 class StatisticsView(Gtk.Box):
     """Display statistics about installed applications."""
@@ -23,76 +24,112 @@ class StatisticsView(Gtk.Box):
         # Stats container
         self.stats_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=12)
         self.append(self.stats_box)
-    
-    def update_statistics(self, stats: dict):
-        """Update the statistics display."""
-        # Clear existing
-        while child := self.stats_box.get_first_child():
-            self.stats_box.remove(child)
+        
+        # Widgets are built once; updates only rebind values that changed
+        self._values = {}
         
         # Total apps card
-        total_card = self._create_stat_card(
-            "Total Applications",
-            str(stats.get('total', 0)),
-            "📦"
-        )
+        total_card, self.total_label = self._create_stat_card("Total Applications", "0", "📦")
         self.stats_box.append(total_card)
         
         # By source breakdown
-        by_source = stats.get('by_source', {})
-        if by_source:
-            source_group = Adw.PreferencesGroup(title="By Package Source")
-            for source, count in sorted(by_source.items(), key=lambda x: x[1], reverse=True):
-                row = Adw.ActionRow(title=source)
-                badge = Gtk.Label(label=str(count))
-                badge.add_css_class("badge")
-                badge.add_css_class("numeric")
-                row.add_suffix(badge)
-                source_group.add(row)
-            self.stats_box.append(source_group)
+        self.source_group = Adw.PreferencesGroup(title="By Package Source")
+        self.source_group.set_visible(False)
+        self.source_rows = {}  # source -> (row, badge)
+        self.stats_box.append(self.source_group)
         
         # Other stats
         other_group = Adw.PreferencesGroup(title="Additional Info")
         
         # Updates available
-        updates_row = Adw.ActionRow(
-            title="Updates Available",
-            subtitle="Packages with updates ready"
+        self.updates_row, self.updates_badge = self._create_badge_row(
+            "Updates Available", "Packages with updates ready"
         )
-        updates_badge = Gtk.Label(label=str(stats.get('updates_available', 0)))
-        updates_badge.add_css_class("badge")
-        if stats.get('updates_available', 0) > 0:
-            updates_badge.add_css_class("warning")
-        updates_row.add_suffix(updates_badge)
-        other_group.add(updates_row)
+        other_group.add(self.updates_row)
         
         # Sandboxed apps
-        sandboxed_row = Adw.ActionRow(
-            title="Sandboxed Applications",
-            subtitle="Apps running in isolation"
+        self.sandboxed_row, self.sandboxed_badge = self._create_badge_row(
+            "Sandboxed Applications", "Apps running in isolation", "success"
         )
-        sandboxed_badge = Gtk.Label(label=str(stats.get('sandboxed', 0)))
-        sandboxed_badge.add_css_class("badge")
-        sandboxed_badge.add_css_class("success")
-        sandboxed_row.add_suffix(sandboxed_badge)
-        other_group.add(sandboxed_row)
+        other_group.add(self.sandboxed_row)
         
         # Conflicts
-        if stats.get('conflicts', 0) > 0:
-            conflicts_row = Adw.ActionRow(
-                title="Package Conflicts",
-                subtitle="Apps with multiple sources"
-            )
-            conflicts_badge = Gtk.Label(label=str(stats.get('conflicts', 0)))
-            conflicts_badge.add_css_class("badge")
-            conflicts_badge.add_css_class("error")
-            conflicts_row.add_suffix(conflicts_badge)
-            other_group.add(conflicts_row)
+        self.conflicts_row, self.conflicts_badge = self._create_badge_row(
+            "Package Conflicts", "Apps with multiple sources", "error"
+        )
+        self.conflicts_row.set_visible(False)
+        other_group.add(self.conflicts_row)
         
         self.stats_box.append(other_group)
     
-    def _create_stat_card(self, title: str, value: str, icon: str) -> Gtk.Box:
-        """Create a statistics card."""
+    def update_statistics(self, stats: dict):
+        """Update the statistics display, touching only values that changed."""
+        if self._changed('total', stats.get('total', 0)):
+            self.total_label.set_label(str(stats.get('total', 0)))
+        
+        by_source = stats.get('by_source', {})
+        disk_usage = stats.get('disk_usage', {})
+        if self._changed('by_source', (by_source, disk_usage)):
+            self._update_sources(by_source, disk_usage)
+        
+        updates = stats.get('updates_available', 0)
+        if self._changed('updates_available', updates):
+            self.updates_badge.set_label(str(updates))
+            if updates > 0:
+                self.updates_badge.add_css_class("warning")
+            else:
+                self.updates_badge.remove_css_class("warning")
+        
+        if self._changed('sandboxed', stats.get('sandboxed', 0)):
+            self.sandboxed_badge.set_label(str(stats.get('sandboxed', 0)))
+        
+        conflicts = stats.get('conflicts', 0)
+        if self._changed('conflicts', conflicts):
+            self.conflicts_badge.set_label(str(conflicts))
+            self.conflicts_row.set_visible(conflicts > 0)
+    
+    def _changed(self, name, value) -> bool:
+        """Remember a value and report whether it differs from the last one."""
+        if self._values.get(name) == value:
+            return False
+        self._values[name] = value
+        return True
+    
+    def _update_sources(self, by_source: dict, disk_usage: dict):
+        """Add, remove and relabel per-source rows."""
+        for source in list(self.source_rows):
+            if source not in by_source:
+                row, _ = self.source_rows.pop(source)
+                self.source_group.remove(row)
+        
+        for source, count in by_source.items():
+            if source not in self.source_rows:
+                row, badge = self._create_badge_row(source, None, "numeric")
+                self.source_rows[source] = (row, badge)
+                self.source_group.add(row)
+            row, badge = self.source_rows[source]
+            if badge.get_label() != str(count):
+                badge.set_label(str(count))
+            subtitle = format_size(disk_usage[source]) if disk_usage.get(source) else ""
+            if row.get_subtitle() != subtitle:
+                row.set_subtitle(subtitle)
+        
+        self.source_group.set_visible(bool(by_source))
+    
+    def _create_badge_row(self, title: str, subtitle: str = None, style: str = None):
+        """Create a row with a badge suffix."""
+        row = Adw.ActionRow(title=title)
+        if subtitle:
+            row.set_subtitle(subtitle)
+        badge = Gtk.Label(label="0")
+        badge.add_css_class("badge")
+        if style:
+            badge.add_css_class(style)
+        row.add_suffix(badge)
+        return row, badge
+    
+    def _create_stat_card(self, title: str, value: str, icon: str):
+        """Create a statistics card. Returns the card and its value label."""
         card = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
         card.add_css_class("card")
         card.set_margin_top(6)
@@ -121,4 +158,4 @@ class StatisticsView(Gtk.Box):
         
         card.append(text_box)
         
-        return card
+        return card, value_label
@@ -10,9 +10,13 @@ from ui.statistics import StatisticsView
 from ui.settings import SettingsDialog
 from ui.batch_operations import BatchUpdateDialog, BatchRemoveDialog
 from utils.backup import BackupManager
-from models import UpdateStatus
+from utils.process import CancelToken
+from models import PackageSource, SearchResults, UpdateStatus
 
 class OrbitWindow(Adw.ApplicationWindow):
+    # Quiet time after the last keystroke before the list is filtered
+    SEARCH_DELAY_MS = 200
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         
@@ -39,6 +43,7 @@ class OrbitWindow(Adw.ApplicationWindow):
         self.search_bar.set_hexpand(True)
         self.search_bar.set_halign(Gtk.Align.CENTER)
         self.search_bar.set_size_request(400, -1)
+        self.search_bar.set_search_delay(self.SEARCH_DELAY_MS)
         self.header.set_title_widget(self.search_bar)
 
         # Menu button
@@ -121,7 +126,7 @@ class OrbitWindow(Adw.ApplicationWindow):
 
 
         # Views
-        self.app_list_view = AppListView(self.on_app_selected)
+        self.app_list_view = AppListView(self.on_app_selected, self.get_conflict_group)
         self.details_view = DetailsView(
             self.orbit_app,
             self.on_back_to_list,
@@ -160,6 +165,13 @@ class OrbitWindow(Adw.ApplicationWindow):
         self.search_bar.connect("search-changed", self.on_search_changed)
         self.search_bar.connect("activate", self.on_search_activated)
         self.apps = []
+        self.showing_search_results = False
+        self._search_generation = 0
+        self._search_token = None
+        self._search_shown_ids = set()
+        self._search_count = 0
+        # Sources of the current search that only listed their best matches
+        self._search_truncated = []
         
         # Backup manager
         self.backup_manager = BackupManager()
@@ -225,6 +237,12 @@ class OrbitWindow(Adw.ApplicationWindow):
         self.details_view.set_app(app)
         self.stack.set_visible_child_name("details")
     
+    def get_conflict_group(self, key):
+        """Return the conflict group an app belongs to, if any."""
+        if self.orbit_app and hasattr(self.orbit_app, 'manager'):
+            return self.orbit_app.manager.conflicts.group_for(key)
+        return None
+    
     def on_back_to_list(self):
         """Handle back button from details view."""
         self.stack.set_visible_child_name("list")
@@ -232,10 +250,61 @@ class OrbitWindow(Adw.ApplicationWindow):
     def show_apps(self, apps):
         """Display the list of applications."""
         self.apps = apps
+        self.showing_search_results = False
         self.app_list_view.update_list(apps)
         self.stack.set_visible_child_name("list")
         self.status_bar.set_text(f"{len(apps)} applications installed")
-        
+        self.update_statistics()
+
+    def apply_changes(self, apps, changes):
+        """
+        Display a revalidated inventory, touching only the rows that changed.
+
+        Args:
+            apps: The full, refreshed list of applications
+            changes: Result of OrbitManager.diff_apps against the shown list,
+                or None to force a full rebuild
+        """
+        if changes is None or not self.apps or self.showing_search_results:
+            self.show_apps(apps)
+            return
+
+        self.apps = apps
+        state = self._filter_state()
+        self.stack.set_visible_child_name("list")
+        if state['matches'] is not None:
+            # The list is ranked by relevance, so rows cannot be placed by name
+            self.on_search_changed(self.search_bar)
+        else:
+            added = [app for app in changes['added'] if self._matches_filters(app, state)]
+            self.app_list_view.apply_changes(changes['removed'], added)
+            self.status_bar.set_text(f"{len(apps)} applications installed")
+        self.update_statistics()
+
+    def show_partial(self, apps, changes):
+        """
+        Insert a batch of streamed results while other sources are still loading.
+
+        Args:
+            apps: The provisional, sorted inventory so far
+            changes: Rows to replace and add, in the format of diff_apps
+        """
+        if not self.apps:
+            self.app_list_view.update_list([])
+            self.stack.set_visible_child_name("list")
+        self.apps = apps
+        self.showing_search_results = False
+        state = self._filter_state()
+        if state['matches'] is not None:
+            # The list is ranked by relevance, so rows cannot be placed by name
+            self.on_search_changed(self.search_bar)
+        else:
+            added = [app for app in changes['added'] if self._matches_filters(app, state)]
+            self.app_list_view.apply_changes(changes['removed'], added)
+        self.status_bar.set_text(f"Loading... {len(apps)} applications so far")
+
+    def update_statistics(self):
+        """Refresh the statistics view and toolbar from the manager."""
         # Update statistics - with safety check
         try:
             if self.orbit_app and hasattr(self.orbit_app, 'manager'):
@@ -263,45 +332,61 @@ class OrbitWindow(Adw.ApplicationWindow):
         # Re-trigger search/filter logic
         self.on_search_changed(self.search_bar)
 
+    def _filter_state(self):
+        """Snapshot the search text and filter toggles."""
+        state = {
+            'query': self.search_bar.get_text().lower(),
+            'matches': None,
+            'match_keys': None,
+            'show_installed': self.filter_installed.get_active(),
+            'show_updates_only': self.filter_updates.get_active(),
+            'active_sources': [s for s, check in self.source_filters.items() if check.get_active()]
+        }
+        if state['query'] and self.orbit_app and hasattr(self.orbit_app, 'manager'):
+            # Ranked apps matching the text, in the order they should be shown
+            state['matches'] = self.orbit_app.manager.search_index.search(state['query'])
+            state['match_keys'] = {app.key for app in state['matches']}
+        return state
+
+    def _matches_filters(self, app, state, check_query=True):
+        """Check whether an app passes the current search text and filters."""
+        query = state['query']
+        if check_query and query:
+            if state['match_keys'] is not None:
+                if app.key not in state['match_keys']:
+                    return False
+            elif query not in app.name.lower() and query not in app.id.lower():
+                return False
+        if not state['show_installed'] and app.is_installed:
+            return False
+        if state['show_updates_only'] and app.update_status != UpdateStatus.UPDATE_AVAILABLE:
+            return False
+        return app.source.value in state['active_sources']
+
+    def cancel_search(self):
+        """Abandon the running remote search, killing its processes."""
+        self._search_generation += 1
+        if self._search_token:
+            self._search_token.cancel()
+            self._search_token = None
+
     def on_search_changed(self, entry):
         """Handle search input (local filter) and advanced filters."""
-        query = entry.get_text().lower()
-        
-        # Gather active filters
-        show_installed = self.filter_installed.get_active()
-        show_updates_only = self.filter_updates.get_active()
-        active_sources = [s for s, check in self.source_filters.items() if check.get_active()]
-        
-        filtered = []
-        for app in self.apps:
-            # 1. Search Query
-            if query and (query not in app.name.lower() and query not in app.id.lower()):
-                continue
-            
-            # 2. Installed Status
-            # If "Installed" is unchecked, we assume we normally show everything? 
-            # Actually, "Installed" check usually means "Show Installed".
-            # If unchecked, maybe show only uninstalled? 
-            # Let's define:
-            # - Installed Checked: Show Installed
-            # - Installed Unchecked: Hide Installed (Show uninstalled only?)
-            # Wait, standard store behavior:
-            # Usually you want to toggle "Show Installed" vs "Show All".
-            # Let's make it simple:
-            # If "Installed" passed -> include installed.
-            # If "Updates Only" -> include only updates.
-            
-            if not show_installed and app.is_installed:
-                continue
-                
-            if show_updates_only and app.update_status != UpdateStatus.UPDATE_AVAILABLE:
-                continue
-                
-            # 3. Source
-            if app.source.value not in active_sources:
-                continue
-                
-            filtered.append(app)
+        # Emitted once typing pauses for SEARCH_DELAY_MS
+        self.cancel_search()
+        self.showing_search_results = False
+        state = self._filter_state()
+        if state['matches'] is not None:
+            # Indexed search over name, id, summary and description, best match first
+            filtered = [app for app in state['matches'] if self._matches_filters(app, state, check_query=False)]
+        elif self.orbit_app and hasattr(self.orbit_app, 'manager'):
+            filtered = self.orbit_app.manager.inventory.query(
+                sources=[PackageSource(s) for s in state['active_sources']],
+                update_status=UpdateStatus.UPDATE_AVAILABLE if state['show_updates_only'] else None,
+                installed=None if state['show_installed'] else False
+            )
+        else:
+            filtered = [app for app in self.apps if self._matches_filters(app, state)]
             
         self.app_list_view.update_list(filtered, self.advanced_toggle.get_active())
         self.status_bar.set_text(f"{len(filtered)} applications found")
@@ -311,30 +396,59 @@ class OrbitWindow(Adw.ApplicationWindow):
         query = entry.get_text()
         if not query:
             return
-            
-        self.stack.set_visible_child_name("loading")
-        self.status_bar.set_text(f"Searching for '{query}'...")
-        
+
+        # Local results first, then each source's results as they arrive.
+        # Only the newest search may touch the list.
+        self.cancel_search()
+        generation = self._search_generation
+        token = self._search_token = CancelToken()
+        local_results = self.orbit_app.manager.search_index.search(query)
+        self._search_shown_ids = {app.id for app in local_results}
+        self._search_count = len(local_results)
+        self._search_truncated = []
+        self.show_search_results(local_results)
+        self.status_bar.set_text(f"Searching for '{query}'... {len(local_results)} results so far")
+
+        def on_results(source, results):
+            GLib.idle_add(self.add_search_results, generation, results, source)
+
         def search():
             try:
-                # Local results first
-                local_results = [a for a in self.apps if query.lower() in a.name.lower() or query.lower() in a.id.lower()]
-                
-                # Remote results
-                remote_results = self.orbit_app.manager.search_apps(query)
-                
-                # Merge: remote results not in local
-                local_ids = {a.id for a in local_results}
-                final_results = local_results + [r for r in remote_results if r.id not in local_ids]
-                
-                GLib.idle_add(self.show_search_results, final_results)
+                self.orbit_app.manager.search_apps(query, on_results=on_results, token=token)
             except Exception as e:
                 print(f"Search error: {e}")
                 GLib.idle_add(self.show_error, str(e))
-        
+            GLib.idle_add(self.finish_search, generation)
+
         threading.Thread(target=search, daemon=True).start()
 
+    def add_search_results(self, generation, results, source=None):
+        """Append one source's remote results to the shown search results."""
+        if generation != self._search_generation or not self.showing_search_results:
+            return GLib.SOURCE_REMOVE
+        if isinstance(results, SearchResults) and results.truncated and source is not None:
+            self._search_truncated.append(source.value)
+        # Remote results not already shown
+        new = [app for app in results if app.id not in self._search_shown_ids]
+        self._search_shown_ids.update(app.id for app in new)
+        self.app_list_view.append_apps(new)
+        self._search_count += len(new)
+        self.status_bar.set_text(f"Searching... {self._search_count} results so far")
+        return GLib.SOURCE_REMOVE
+
+    def finish_search(self, generation):
+        """Mark the remote search as complete."""
+        if generation == self._search_generation and self.showing_search_results:
+            self._search_token = None
+            text = f"{self._search_count} results found"
+            if self._search_truncated:
+                # More packages match; a longer query narrows them down
+                text += f" (best matches only from {', '.join(self._search_truncated)}, refine the search for more)"
+            self.status_bar.set_text(text)
+        return GLib.SOURCE_REMOVE
+
     def show_search_results(self, results):
+        self.showing_search_results = True
         self.app_list_view.update_list(results, self.advanced_toggle.get_active())
         self.stack.set_visible_child_name("list")
         self.status_bar.set_text(f"{len(results)} results found")
@@ -359,6 +473,32 @@ class OrbitWindow(Adw.ApplicationWindow):
         if self.orbit_app and hasattr(self.orbit_app, 'load_apps_async'):
             self.orbit_app.load_apps_async(self)
 
+    def offer_resume(self, operations):
+        """Ask whether to resume operations interrupted by the last exit."""
+        manager = self.orbit_app.manager
+        lines = [f"• {operation.action.capitalize()} {', '.join(app.name for app in operation.remaining)}"
+                 for operation in operations]
+        dialog = Adw.MessageDialog.new(self)
+        dialog.set_heading("Interrupted Operations")
+        dialog.set_body("Orbit was closed before these operations finished:\n\n" + "\n".join(lines))
+        dialog.add_response("discard", "Discard")
+        dialog.add_response("resume", "Resume")
+        dialog.set_response_appearance("resume", Adw.ResponseAppearance.SUGGESTED)
+        dialog.set_default_response("resume")
+
+        def on_response(dialog, response):
+            # Dismissing the dialog keeps them in the journal, to be offered again next time
+            for operation in operations:
+                if response == "resume":
+                    manager.operations.resume(operation,
+                                              on_done=lambda _: GLib.idle_add(self.on_action_done))
+                elif response == "discard":
+                    manager.operations.discard(operation)
+
+        dialog.connect("response", on_response)
+        dialog.present()
+        return GLib.SOURCE_REMOVE
+
     def on_update_all(self, button):
         """Handle update all button."""
         if self.orbit_app and hasattr(self.orbit_app, 'manager'):
@@ -371,7 +511,7 @@ class OrbitWindow(Adw.ApplicationWindow):
         """Handle refresh button."""
         self.stack.set_visible_child_name("loading")
         if self.orbit_app and hasattr(self.orbit_app, 'load_apps_async'):
-            self.orbit_app.load_apps_async(self)
+            self.orbit_app.load_apps_async(self, check_updates=True)
 
     def on_show_statistics(self, action, param):
         """Show statistics view."""
@@ -4,5 +4,17 @@ from .logger import setup_logger
 from .config import Config
 from .backup import BackupManager
 from .notifications import NotificationManager
+from .cache import InventoryCache
+from .watcher import InventoryWatcher
+from .process import CancelToken, CommandCancelled, run_command, stream_command
+from .scheduler import UpdateScheduler
+from .versions import VersionScheme, DPKG, RPM, PACMAN
+from .progress import ProgressEvent, ProgressParser
+from .privileged import PrivilegedHelper
 
-__all__ = ['setup_logger', 'Config', 'BackupManager', 'NotificationManager']
+__all__ = [
+    'setup_logger', 'Config', 'BackupManager', 'NotificationManager',
+    'InventoryCache', 'InventoryWatcher', 'CancelToken', 'CommandCancelled',
+    'run_command', 'stream_command', 'UpdateScheduler', 'VersionScheme', 'DPKG', 'RPM', 'PACMAN',
+    'ProgressEvent', 'ProgressParser', 'PrivilegedHelper'
+]
@@ -0,0 +1,146 @@
+"""On-disk inventory snapshot for Orbit."""
+
+import json
+import os
+import struct
+import time
+import zlib
+from dataclasses import fields
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from models import App, AppDetails, PackageSource, UpdateStatus
+
+class InventoryCache:
+    """
+    Stores the last known application inventory on disk.
+
+    The snapshot is a small binary container: a fixed header, a JSON
+    preamble describing the record layout, then one zlib-compressed
+    section per package source. Each section holds its apps as positional
+    rows, so field names are written once instead of once per app.
+    """
+
+    MAGIC = b'ORBITINV'
+    VERSION = 3
+    _HEADER = struct.Struct('>8sHI')
+    _LENGTH = struct.Struct('>I')
+    _NAME = struct.Struct('>H')
+
+    def __init__(self, cache_dir: str = None):
+        if cache_dir:
+            self.cache_dir = Path(cache_dir)
+        else:
+            self.cache_dir = Path.home() / '.cache' / 'orbit'
+        self.cache_file = self.cache_dir / 'inventory.bin'
+        self._fields = [f.name for f in fields(App)]
+        self._detail_fields = [f.name for f in fields(AppDetails)]
+
+    def save(self, sections: Dict[PackageSource, List[App]], meta: dict = None):
+        """
+        Write a snapshot of the inventory.
+
+        Args:
+            sections: Installed apps keyed by their package source
+            meta: Optional extra metadata stored in the preamble
+        """
+        preamble = json.dumps({
+            'fields': self._fields,
+            'detail_fields': self._detail_fields,
+            'created_at': time.time(),
+            'meta': meta or {}
+        }).encode()
+
+        chunks = [
+            self._HEADER.pack(self.MAGIC, self.VERSION, len(sections)),
+            self._LENGTH.pack(len(preamble)),
+            preamble
+        ]
+        for source, apps in sections.items():
+            name = source.value.encode()
+            payload = zlib.compress(
+                json.dumps([self._encode(app) for app in apps], separators=(',', ':')).encode(),
+                6
+            )
+            chunks.extend([
+                self._NAME.pack(len(name)), name,
+                self._LENGTH.pack(len(payload)), payload
+            ])
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.cache_file.with_suffix('.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(b''.join(chunks))
+        os.replace(tmp_file, self.cache_file)
+
+    def load(self) -> Optional[Tuple[Dict[PackageSource, List[App]], dict]]:
+        """
+        Read the snapshot back, with a single read of the file.
+
+        Returns:
+            Apps keyed by package source and the extra metadata saved
+            with them, or None if there is no usable snapshot (missing,
+            corrupt, or written by another version)
+        """
+        return self._read()
+
+    def clear(self):
+        """Remove the snapshot from disk."""
+        try:
+            self.cache_file.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _read(self):
+        try:
+            with open(self.cache_file, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            magic, version, count = self._HEADER.unpack_from(data, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                return None
+            offset = self._HEADER.size
+            (length,) = self._LENGTH.unpack_from(data, offset)
+            offset += self._LENGTH.size
+            preamble = json.loads(data[offset:offset + length])
+            offset += length
+            if preamble.get('fields') != self._fields or preamble.get('detail_fields') != self._detail_fields:
+                return None
+
+            sections = {}
+            for _ in range(count):
+                (length,) = self._NAME.unpack_from(data, offset)
+                offset += self._NAME.size
+                source = PackageSource(data[offset:offset + length].decode())
+                offset += length
+                (length,) = self._LENGTH.unpack_from(data, offset)
+                offset += self._LENGTH.size
+                rows = json.loads(zlib.decompress(data[offset:offset + length]))
+                offset += length
+                sections[source] = [self._decode(row, source) for row in rows]
+            return sections, preamble.get('meta', {})
+        except (struct.error, ValueError, KeyError, zlib.error):
+            return None
+
+    def _encode(self, app: App) -> list:
+        row = []
+        for name in self._fields:
+            value = getattr(app, name)
+            if name == 'source':
+                value = None  # Implied by the section
+            elif name == 'update_status':
+                value = value.name
+            elif name == 'details' and value is not None:
+                value = [getattr(value, detail) for detail in self._detail_fields]
+            row.append(value)
+        return row
+
+    def _decode(self, row: list, source: PackageSource) -> App:
+        values = dict(zip(self._fields, row))
+        values['source'] = source
+        values['update_status'] = UpdateStatus[values['update_status']]
+        if values['details'] is not None:
+            values['details'] = AppDetails(*values['details'])
+        return App(**values)
@@ -10,6 +10,7 @@ class Config:
     DEFAULT_CONFIG = {
         'auto_update_check': True,
         'update_check_interval': 86400,  # 24 hours in seconds
+        'watch_for_changes': True,  # Pick up installs made outside Orbit
         'preferred_source': 'flatpak',
         'appimage_scan_dirs': [
             str(Path.home() / 'Applications'),
@@ -0,0 +1,185 @@
+"""Client for Orbit's privileged helper (helper.py)."""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, List
+from utils.logger import setup_logger
+from utils.process import CancelToken, CommandCancelled
+
+logger = setup_logger('orbit.privileged')
+
+HELPER_SCRIPT = str(Path(__file__).resolve().parent.parent / 'helper.py')
+
+class PrivilegedHelper:
+    """
+    Runs package manager commands as root through one long-lived helper.
+
+    The helper is started through the launcher (pkexec) the first time a
+    command needs it, so polkit asks once per session instead of once per
+    operation, and every later command is a connection to its socket. It
+    only accepts the operations listed in helper.OPERATIONS.
+
+    A helper created with an empty launcher runs helper.py as the current
+    user, which stands in for the real one in unprivileged tests.
+    """
+
+    # How often a waiting command looks at its cancel token
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, launcher: List[str] = None):
+        """
+        Args:
+            launcher: Command prefix that starts the helper as root;
+                defaults to pkexec
+        """
+        self.launcher = ['pkexec'] if launcher is None else list(launcher)
+        self._process = None
+        self._socket_path = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def run(self, args: List[str], on_line: Callable[[str], None] = None, token: CancelToken = None,
+            can_stop: Callable[[], bool] = None) -> int:
+        """
+        Run a command as root, like utils.process.stream_command.
+
+        Args:
+            args: Command and arguments, without pkexec
+            on_line: Called with every output line
+            token: Optional token to cancel the command
+            can_stop: As for stream_command: if given, a cancelled command
+                is only stopped once it returns True
+
+        Returns:
+            The exit status of the command, or of the launcher if the
+            helper could not be started (126 or 127 when authorization
+            was refused)
+
+        Raises:
+            CommandCancelled: The command was stopped because the token was cancelled
+            FileNotFoundError: The launcher or the command is not installed
+        """
+        if token is not None and token.cancelled:
+            raise CommandCancelled(args[0])
+        for attempt in range(2):
+            status = self._start()
+            if status is not None:
+                return status
+            try:
+                conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                conn.connect(self._socket_path)
+                break
+            except OSError as e:
+                conn.close()
+                # The helper went away since it was started; start it again once
+                logger.warning(f"Privileged helper unavailable: {e}")
+                self.stop()
+                if attempt:
+                    raise
+        with conn:
+            return self._exchange(conn, args, on_line, token, can_stop)
+
+    def stop(self):
+        """Let the helper exit once its running commands are done."""
+        with self._lock:
+            process, self._process = self._process, None
+            socket_path, self._socket_path = self._socket_path, None
+        if socket_path is not None:
+            shutil.rmtree(os.path.dirname(socket_path), ignore_errors=True)
+        if process is not None:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    def _start(self):
+        """Start the helper unless it is running; returns None or the launcher's exit status."""
+        with self._lock:
+            if self.running:
+                return None
+            if self._socket_path is not None:
+                # Left behind by a helper that died
+                shutil.rmtree(os.path.dirname(self._socket_path), ignore_errors=True)
+            directory = tempfile.mkdtemp(prefix='orbit-helper-', dir=os.environ.get('XDG_RUNTIME_DIR'))
+            socket_path = os.path.join(directory, 'helper.sock')
+            command = [*self.launcher, sys.executable, '-I', HELPER_SCRIPT, '--socket', socket_path]
+            logger.info("Starting privileged helper")
+            try:
+                process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+            except FileNotFoundError:
+                shutil.rmtree(directory, ignore_errors=True)
+                raise
+            # Blocks while the user answers the authorization dialog
+            if process.stdout.readline().strip() != 'ready':
+                process.stdin.close()
+                status = process.wait()
+                shutil.rmtree(directory, ignore_errors=True)
+                logger.warning(f"Privileged helper did not start (status {status})")
+                return status or 1
+            self._process = process
+            self._socket_path = socket_path
+            return None
+
+    def _exchange(self, conn: socket.socket, args: List[str], on_line, token, can_stop) -> int:
+        conn.sendall(json.dumps({'argv': list(args)}).encode() + b'\n')
+        conn.settimeout(self.POLL_INTERVAL)
+        cancel_sent = False
+        buffer = b''
+        while True:
+            # Looked at after every chunk of output and while the command is quiet
+            if (token is not None and token.cancelled and not cancel_sent
+                    and (can_stop is None or can_stop())):
+                conn.sendall(b'{"cancel": true}\n')
+                cancel_sent = True
+            try:
+                chunk = conn.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                raise OSError(f"Privileged helper closed the connection during {args[0]}")
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+            for raw in lines:
+                message = json.loads(raw)
+                if 'line' in message:
+                    if on_line:
+                        on_line(message['line'])
+                elif 'status' in message:
+                    if message.get('cancelled'):
+                        raise CommandCancelled(args[0])
+                    return message['status']
+                elif message.get('missing'):
+                    raise FileNotFoundError(message['error'])
+                else:
+                    raise ValueError(f"Privileged helper refused {args[0]}: {message.get('error')}")
+
+_helper = PrivilegedHelper()
+_helper_lock = threading.Lock()
+
+def get_helper() -> PrivilegedHelper:
+    """Return the helper shared by all adapters."""
+    with _helper_lock:
+        return _helper
+
+def set_helper(helper: PrivilegedHelper) -> PrivilegedHelper:
+    """
+    Replace the shared helper, e.g. with PrivilegedHelper(launcher=[]) in tests.
+
+    Returns:
+        The previous helper, which is stopped
+    """
+    global _helper
+    with _helper_lock:
+        previous, _helper = _helper, helper
+    previous.stop()
+    return previous
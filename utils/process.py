@@ -0,0 +1,190 @@
+"""Cancellable subprocess execution for Orbit."""
+
+import errno
+import os
+import shutil
+import subprocess
+import threading
+from typing import Callable, List
+
+class CommandCancelled(Exception):
+    """Raised when a command was killed because its token was cancelled."""
+    pass
+
+class CancelToken:
+    """
+    Cancellation flag shared by the work started for one request.
+
+    Processes started through run_command with the token are killed as
+    soon as it is cancelled. A token created with a parent is cancelled
+    together with it, so part of a request can be abandoned on its own.
+
+    Work nobody is waiting for, such as scheduled update checks, can use a
+    background token: its commands run at idle CPU priority so they do
+    not compete with the desktop. Child tokens inherit the setting.
+    """
+
+    def __init__(self, parent: 'CancelToken' = None, background: bool = False):
+        self.background = background or (parent is not None and parent.background)
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._children = []
+        if parent is not None:
+            parent._adopt(self)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """Cancel the token, its children, and kill their running processes."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            processes = list(self._processes)
+            children = list(self._children)
+        for process in processes:
+            _kill(process)
+        for child in children:
+            child.cancel()
+
+    def _adopt(self, child: 'CancelToken'):
+        with self._lock:
+            self._children.append(child)
+            cancelled = self._event.is_set()
+        if cancelled:
+            child.cancel()
+
+    def _attach(self, process: subprocess.Popen):
+        with self._lock:
+            self._processes.add(process)
+            cancelled = self._event.is_set()
+        if cancelled:
+            _kill(process)
+
+    def _detach(self, process: subprocess.Popen):
+        with self._lock:
+            self._processes.discard(process)
+
+def _kill(process: subprocess.Popen):
+    try:
+        process.kill()
+    except OSError:
+        pass
+
+# Run a command at idle CPU priority. Without an explicit IO priority the
+# kernel derives one from the scheduling policy, so SCHED_IDLE also puts
+# disk access last.
+_IDLE_PREFIXES = (('chrt', '--idle', '0'), ('nice', '-n', '19'))
+
+def _lower_priority(args: List[str]) -> List[str]:
+    """
+    Prefix a command with the tools that lower its priority.
+
+    Priorities are set by chrt and nice in the child rather than by a
+    preexec_fn, which is not safe in a process with threads. Tools that
+    are not installed are left out.
+
+    Raises:
+        FileNotFoundError: The command itself is not installed, as
+            subprocess would report it without a prefix
+    """
+    if shutil.which(args[0]) is None:
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), args[0])
+    prefix = [arg for tool in _IDLE_PREFIXES if shutil.which(tool[0]) for arg in tool]
+    return prefix + list(args)
+
+def run_command(args: List[str], token: CancelToken = None, timeout: float = None,
+                check: bool = True) -> subprocess.CompletedProcess:
+    """
+    Run a command and capture its text output, like subprocess.run.
+
+    Args:
+        args: Command and arguments
+        token: Optional token whose cancellation kills the process; a
+            background token also lowers the process priority
+        timeout: Seconds after which the process is killed
+        check: Raise CalledProcessError on a non-zero exit status
+
+    Returns:
+        The completed process with stdout and stderr as text
+
+    Raises:
+        CommandCancelled: The token was cancelled before the command finished
+        subprocess.TimeoutExpired: The command ran longer than timeout
+    """
+    if token is not None and token.cancelled:
+        raise CommandCancelled(args[0])
+
+    background = token is not None and token.background
+    process = subprocess.Popen(_lower_priority(args) if background else args,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if token is not None:
+        token._attach(process)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill(process)
+        process.communicate()
+        raise
+    finally:
+        if token is not None:
+            token._detach(process)
+
+    if token is not None and token.cancelled:
+        raise CommandCancelled(args[0])
+    if check and process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, process.returncode, stdout, stderr)
+
+def stream_command(args: List[str], on_line: Callable[[str], None], token: CancelToken = None,
+                   can_stop: Callable[[], bool] = None) -> int:
+    """
+    Run a command and hand each line of its output to a callback as it is printed.
+
+    stderr is merged into stdout. Carriage returns also end a line, so
+    progress bars that redraw themselves are seen as they change.
+
+    Args:
+        args: Command and arguments
+        on_line: Called with every output line, without its line ending
+        token: Optional token whose cancellation stops the process
+        can_stop: Makes cancellation cooperative: the process is only
+            stopped after an output line for which this returns True, and
+            otherwise runs to completion. Without it, cancelling the
+            token kills the process at once.
+
+    Returns:
+        The exit status of the command
+
+    Raises:
+        CommandCancelled: The process was stopped because the token was cancelled
+    """
+    if token is not None and token.cancelled:
+        raise CommandCancelled(args[0])
+
+    process = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                               stdin=subprocess.DEVNULL, errors='replace')
+    cooperative = can_stop is not None
+    if token is not None and not cooperative:
+        token._attach(process)
+    stopped = False
+    try:
+        with process:
+            for line in process.stdout:
+                on_line(line.rstrip('\n'))
+                if cooperative and token is not None and token.cancelled and can_stop():
+                    # Commands that need root run in the privileged helper,
+                    # which stops them on a cancel message instead
+                    _kill(process)
+                    stopped = True
+                    break
+    finally:
+        if token is not None and not cooperative:
+            token._detach(process)
+
+    if stopped or (token is not None and token.cancelled and not cooperative):
+        raise CommandCancelled(args[0])
+    return process.returncode
@@ -0,0 +1,248 @@
+"""Progress parsing for the output of package manager commands."""
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+@dataclass(slots=True)
+class ProgressEvent:
+    """
+    One progress report from a running package operation.
+
+    Attributes:
+        phase: "prepare" until the command starts on packages, "download"
+            while they are fetched, "install" while they are unpacked,
+            configured or removed
+        percent: Progress of the phase from 0 to 100, if known
+        downloaded: Bytes downloaded so far, if known
+        total: Bytes to download in total, if known
+        package: Package the line is about, as the command names it
+    """
+    phase: str = 'prepare'
+    percent: Optional[float] = None
+    downloaded: Optional[int] = None
+    total: Optional[int] = None
+    package: str = ''
+
+_SIZE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*([kKMGT]i?B?|B)(?![A-Za-z])')
+_POWERS = 'BKMGT'
+_PERCENT = re.compile(r'(\d{1,3}(?:\.\d+)?)\s*%')
+
+def parse_size(text: str) -> Optional[int]:
+    """
+    Parse the first size in text, such as "1,234 kB", "1.7 MB", "12.3 MiB" or "12 M".
+
+    Returns:
+        Size in bytes, or None if there is none
+    """
+    match = _SIZE.search(text)
+    if not match:
+        return None
+    number, unit = match.groups()
+    base = 1024 if 'i' in unit else 1000
+    return int(float(number.replace(',', '')) * base ** _POWERS.index(unit[0].upper()))
+
+def _transfer_size(columns: List[str]) -> Optional[int]:
+    """Size column of a download line, skipping the transfer rate."""
+    for column in columns:
+        if '/s' not in column:
+            size = parse_size(column)
+            if size is not None:
+                return size
+    return None
+
+class ProgressParser:
+    """
+    Turns the output lines of one command into ProgressEvents.
+
+    A parser instance follows a single command, since most formats only
+    make sense together with earlier lines (the phase, the download size).
+    The base class recognizes plain percentages.
+    """
+
+    def __init__(self):
+        self.phase = 'prepare'
+        self.total = None
+        self.downloaded = None
+
+    def feed(self, line: str) -> Optional[ProgressEvent]:
+        """
+        Parse one output line.
+
+        Returns:
+            The progress it reports, or None if it reports none
+        """
+        match = _PERCENT.search(line)
+        if match:
+            return self._event(float(match.group(1)))
+        return None
+
+    def _event(self, percent: float = None, package: str = '') -> ProgressEvent:
+        if percent is not None:
+            percent = max(0.0, min(100.0, percent))
+        return ProgressEvent(self.phase, percent, self.downloaded, self.total, package)
+
+class AptProgressParser(ProgressParser):
+    """
+    Parses apt-get run with -o APT::Status-Fd=1.
+
+    Status lines look like "dlstatus:2:41.5:Retrieving file 2 of 5" while
+    downloading and "pmstatus:vim:62.5:Unpacking vim (amd64)" while dpkg
+    works. The download size comes from "Need to get 12.3 MB of archives."
+    """
+
+    def feed(self, line: str) -> Optional[ProgressEvent]:
+        if line.startswith('Need to get '):
+            self.total = parse_size(line)
+            return None
+        kind, _, rest = line.partition(':')
+        if kind not in ('dlstatus', 'pmstatus') or not rest:
+            return None
+        fields = rest.split(':', 2)
+        if len(fields) < 2:
+            return None
+        try:
+            percent = float(fields[1])
+        except ValueError:
+            return None
+        if kind == 'dlstatus':
+            self.phase = 'download'
+            if self.total:
+                self.downloaded = int(self.total * percent / 100)
+            return self._event(percent)
+        self.phase = 'install'
+        return self._event(percent, fields[0])
+
+class PacmanProgressParser(ProgressParser):
+    """
+    Parses pacman, which prints no progress bars when its output is a pipe.
+
+    "Packages (3) ..." gives the package count, ":: Retrieving packages..."
+    starts the downloads with one "<file> downloading..." line each, and
+    ":: Processing package changes..." is followed by "(2/5) upgrading vim"
+    for each package.
+    """
+
+    _COUNT = re.compile(r'^Packages \((\d+)\)')
+    _STEP = re.compile(r'^\(\s*(\d+)/(\d+)\) (?:upgrading|reinstalling|installing|removing) (\S+)')
+
+    def __init__(self):
+        super().__init__()
+        self._count = 0
+        self._downloads = 0
+
+    def feed(self, line: str) -> Optional[ProgressEvent]:
+        stripped = line.strip()
+        match = self._COUNT.match(stripped)
+        if match:
+            self._count = int(match.group(1))
+            return None
+        if stripped.startswith('Total Download Size:'):
+            self.total = parse_size(stripped)
+            return None
+        if stripped.startswith(':: Retrieving packages'):
+            self.phase = 'download'
+            return self._event(0.0)
+        if self.phase == 'download' and stripped.endswith('downloading...'):
+            self._downloads += 1
+            percent = 100.0 * (self._downloads - 1) / self._count if self._count else None
+            return self._event(percent, stripped.split()[0])
+        if stripped.startswith(':: Processing package changes'):
+            self.phase = 'install'
+            return self._event(0.0)
+        match = self._STEP.match(stripped)
+        if match:
+            self.phase = 'install'
+            done, total = int(match.group(1)), int(match.group(2))
+            return self._event(100.0 * (done - 1) / total, match.group(3))
+        return None
+
+class DnfProgressParser(ProgressParser):
+    """
+    Parses dnf and dnf5.
+
+    Downloads are listed as "(1/3): vim-9.1.rpm  1.2 MB/s | 1.7 MB  00:01"
+    (dnf) or "[1/3] vim-9.1.rpm 100% | 1.2 MiB/s | 1.7 MiB | 00m01s"
+    (dnf5); transaction steps as "Upgrading : vim-2:9.1-1.fc39.x86_64  1/4"
+    or "[2/6] Upgrading vim-2:9.1-1.fc39.x86_64".
+    """
+
+    _DOWNLOAD = re.compile(r'^[(\[](\d+)/(\d+)[)\]]:?\s+(\S+\.rpm)\b(.*)$')
+    _STEP = re.compile(r'^\s*(?:\[(\d+)/(\d+)\]\s*)?'
+                       r'(?:Upgrading|Installing|Reinstalling|Erasing|Removing|Cleanup|Verifying)'
+                       r'\s*:?\s+(\S+)(?:\s+(\d+)/(\d+))?\s*$')
+
+    def __init__(self):
+        super().__init__()
+        self._sizes = {}  # package file -> bytes downloaded
+
+    def feed(self, line: str) -> Optional[ProgressEvent]:
+        stripped = line.strip()
+        if stripped.lower().startswith('total download size:'):
+            self.total = parse_size(stripped.split(':', 1)[1])
+            return None
+        match = self._DOWNLOAD.match(stripped)
+        if match:
+            self.phase = 'download'
+            done, total, package, rest = match.groups()
+            done, total = int(done), int(total)
+            columns = rest.split('|')
+            # dnf5 redraws the line of a package while it downloads
+            size = _transfer_size(columns[1:])
+            if size is not None:
+                self._sizes[package] = size
+                self.downloaded = sum(self._sizes.values())
+            percent = _PERCENT.search(columns[0])
+            fraction = float(percent.group(1)) / 100 if percent else 1.0
+            return self._event(100.0 * (done - 1 + fraction) / total if total else None, package)
+        match = self._STEP.match(line)
+        if match:
+            self.phase = 'install'
+            outer_done, outer_total, package, done, total = match.groups()
+            if not done:
+                done, total = outer_done, outer_total
+            percent = 100.0 * int(done) / int(total) if done and int(total) else None
+            return self._event(percent, package)
+        return None
+
+class FlatpakProgressParser(ProgressParser):
+    """
+    Parses flatpak run with --noninteractive.
+
+    Each ref starts with "Updating org.gnome.Maps/x86_64/stable" (or
+    Installing/Uninstalling) and its progress follows as a percentage,
+    e.g. "Updating… 45%  1.2 MB/s".
+    """
+
+    _START = re.compile(r'^\s*(?:Updating|Installing|Uninstalling)\S*:?\s+(?:app/)?([A-Za-z0-9_.-]+)/')
+
+    def __init__(self):
+        super().__init__()
+        self._package = ''
+
+    def feed(self, line: str) -> Optional[ProgressEvent]:
+        match = self._START.match(line)
+        if match:
+            self._package = match.group(1)
+            self.phase = 'install' if 'Uninstalling' in line else 'download'
+            return self._event(0.0, self._package)
+        match = _PERCENT.search(line)
+        if match:
+            return self._event(float(match.group(1)), self._package)
+        return None
+
+class SnapProgressParser(ProgressParser):
+    """
+    Parses snap, which reports each task as it changes, e.g.
+    'Download snap "firefox" (3836) from channel "stable" 45%'.
+    """
+
+    _SNAP = re.compile(r'"([^"]+)"')
+
+    def feed(self, line: str) -> Optional[ProgressEvent]:
+        match = _PERCENT.search(line)
+        if not match:
+            return None
+        package = self._SNAP.search(line)
+        self.phase = 'download' if line.lstrip().startswith('Download') else 'install'
+        return self._event(float(match.group(1)), package.group(1) if package else '')
@@ -0,0 +1,177 @@
+"""Scheduled update checks for Orbit."""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from gi.repository import GLib
+from models import PackageSource
+from utils.logger import setup_logger
+from utils.process import CancelToken
+
+logger = setup_logger('orbit.scheduler')
+
+class UpdateScheduler:
+    """
+    Runs OrbitManager.check_updates in the background every update_check_interval.
+
+    The time and results of the last check are kept in
+    ~/.cache/orbit/updates.json, so a restart within the interval shows
+    the known updates without running any package manager. Checks run at
+    idle priority, and the update notification is only sent when a check
+    finds updates that were not pending before.
+    """
+
+    # How often the schedule is looked at; the interval itself comes from the config
+    TICK_SECONDS = 300
+
+    def __init__(self, manager, config, on_changes, on_updates_found, cache_dir: str = None):
+        """
+        Args:
+            manager: OrbitManager whose updates should be checked
+            config: Config holding auto_update_check and update_check_interval
+            on_changes: Called on the main loop as on_changes(apps, changes)
+                with the format returned by OrbitManager.diff_apps
+            on_updates_found: Called on the main loop with the number of
+                pending updates when a check found new ones
+        """
+        self.manager = manager
+        self.config = config
+        self.on_changes = on_changes
+        self.on_updates_found = on_updates_found
+        cache_dir = Path(cache_dir) if cache_dir else Path.home() / '.cache' / 'orbit'
+        self.state_file = cache_dir / 'updates.json'
+        self.last_check = None
+        self._known = set()  # Updates pending after the last check, to spot new ones
+        self._timeout_id = None
+        self._token = None
+        self._lock = threading.Lock()
+
+    @property
+    def interval(self) -> int:
+        return max(int(self.config.get('update_check_interval', 86400)), 60)
+
+    def restore(self) -> bool:
+        """
+        Load the results of the last check if it is recent enough.
+
+        Call before the inventory is loaded, so the restored statuses are
+        applied to it.
+
+        Returns:
+            True if results were restored and no check is due yet
+        """
+        state = self._read_state()
+        if state is None:
+            return False
+        checked_at, updates = state
+        self.last_check = checked_at
+        self._known = self._pending(updates)
+        if not self.is_due():
+            self.manager.merge_updates(updates)
+            logger.info(f"Restored update check from {time.ctime(checked_at)}")
+            return True
+        return False
+
+    def start(self):
+        """Start looking at the schedule periodically."""
+        if self._timeout_id is None:
+            self._timeout_id = GLib.timeout_add_seconds(self.TICK_SECONDS, self._on_tick)
+
+    def stop(self):
+        """Stop the schedule and cancel a running check."""
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+        with self._lock:
+            if self._token is not None:
+                self._token.cancel()
+
+    def is_due(self) -> bool:
+        """Check whether automatic checks are enabled and the interval has passed."""
+        if not self.config.get('auto_update_check', True):
+            return False
+        # A clock set backwards must not postpone checks indefinitely
+        elapsed = time.time() - (self.last_check or 0)
+        return elapsed < 0 or elapsed >= self.interval
+
+    def check_if_due(self):
+        """Start a check if one is due."""
+        if self.is_due():
+            self.check_now()
+
+    def check_now(self):
+        """Start a check in a background thread unless one is already running."""
+        with self._lock:
+            if self._token is not None:
+                return
+            self._token = CancelToken(background=True)
+            token = self._token
+        thread = threading.Thread(target=self._check, args=(token,), daemon=True, name='orbit-update-check')
+        thread.start()
+
+    def save(self):
+        """
+        Persist the currently known updates, keeping the time of the last check.
+
+        Call after Orbit itself updated or removed apps, so a restart does
+        not restore updates that were already applied.
+        """
+        if self.last_check is not None:
+            self._write_state(self.last_check, self.manager.get_available_updates())
+
+    def _on_tick(self):
+        self.check_if_due()
+        return GLib.SOURCE_CONTINUE
+
+    def _check(self, token: CancelToken):
+        try:
+            changes = self.manager.check_updates(token)
+            if token.cancelled:
+                return
+            updates = self.manager.get_available_updates()
+            self.last_check = time.time()
+            self._write_state(self.last_check, updates)
+
+            if changes['added']:
+                GLib.idle_add(self.on_changes, self.manager.apps, changes)
+            pending = self._pending(updates)
+            if pending - self._known:
+                GLib.idle_add(self.on_updates_found, len(pending))
+            self._known = pending
+        except Exception as e:
+            logger.error(f"Scheduled update check failed: {e}")
+        finally:
+            with self._lock:
+                self._token = None
+
+    @staticmethod
+    def _pending(updates: dict) -> set:
+        """Flatten {source: {id: version}} into a set for comparing checks."""
+        return {(source, app_id, version) for source, versions in updates.items()
+                for app_id, version in versions.items()}
+
+    def _read_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                state = json.load(f)
+            updates = {PackageSource(source): dict(versions)
+                       for source, versions in state['updates'].items()}
+            return float(state['checked_at']), updates
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def _write_state(self, checked_at: float, updates: dict):
+        state = {
+            'checked_at': checked_at,
+            'updates': {source.value: versions for source, versions in updates.items()}
+        }
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.state_file.with_suffix('.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            logger.warning(f"Could not save update check results: {e}")
@@ -0,0 +1,243 @@
+"""Package version comparison following dpkg, rpm and pacman rules."""
+
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Sequence
+
+class VersionScheme:
+    """
+    Orders version strings the way one package manager does.
+
+    Each version is parsed once into a key that compares with the plain
+    < and == operators, and recent keys are cached, so comparing whole
+    columns of versions (every installed package against its candidate)
+    costs little more than the tuple comparisons themselves.
+    """
+
+    CACHE_SIZE = 1 << 16
+
+    def __init__(self, name: str, parse: Callable[[str], object]):
+        self.name = name
+        self.key = lru_cache(maxsize=self.CACHE_SIZE)(parse)
+
+    def __repr__(self) -> str:
+        return f"VersionScheme({self.name!r})"
+
+    def compare(self, a: str, b: str) -> int:
+        """
+        Compare two versions.
+
+        Returns:
+            -1 if a is older than b, 0 if they are equivalent, 1 if a is newer
+        """
+        key_a, key_b = self.key(a), self.key(b)
+        return (key_a > key_b) - (key_a < key_b)
+
+    def compare_many(self, left: Sequence[str], right: Sequence[str]) -> List[int]:
+        """Compare two equally long columns of versions pairwise, like compare."""
+        key = self.key
+        results = []
+        for a, b in zip(left, right):
+            key_a, key_b = key(a), key(b)
+            results.append((key_a > key_b) - (key_a < key_b))
+        return results
+
+    def is_newer(self, candidates: Sequence[str], installed: Sequence[str]) -> List[bool]:
+        """
+        Check, pairwise, whether each candidate version is newer than the installed one.
+
+        Args:
+            candidates: Versions an update would install
+            installed: Versions currently installed, in the same order
+        """
+        key = self.key
+        return [key(installed_version) < key(candidate) for candidate, installed_version in zip(candidates, installed)]
+
+    def newest(self, versions: Iterable[str]) -> Optional[str]:
+        """Return the newest of some versions, the first one on ties, or None if there are none."""
+        newest = None
+        newest_key = None
+        for version in versions:
+            version_key = self.key(version)
+            if newest is None or newest_key < version_key:
+                newest, newest_key = version, version_key
+        return newest
+
+def _split_evr(version: str):
+    """Split "[epoch:]version[-release]" into its parts; a missing epoch is 0."""
+    epoch, colon, rest = version.partition(':')
+    if not colon or not epoch.isdigit():
+        epoch, rest = '0', version
+    upstream, dash, release = rest.rpartition('-')
+    if not dash:
+        return int(epoch), rest, None
+    return int(epoch), upstream, release
+
+# dpkg
+
+_DPKG_PARTS = re.compile(r'([^0-9]*)([0-9]*)')
+# dpkg orders "~" before the end of a part, the end before letters, and
+# letters before everything else. Non-digit parts are translated so plain
+# string comparison gives the same order: "~" becomes \x01, the end of
+# the part is marked by \x02, letters stay, other characters move above
+# all letters.
+_DPKG_ORDER = {code: code + 256 for code in range(256)
+               if not (chr(code).isascii() and chr(code).isalpha())}
+_DPKG_ORDER[ord('~')] = '\x01'
+_DPKG_END = ('\x02', 0)
+
+def _dpkg_string_key(text: str) -> tuple:
+    """
+    Key of an upstream version or revision for dpkg's verrevcmp.
+
+    The string is a list of (non-digit part, number) pairs. A missing pair
+    compares like an empty part and 0; trailing pairs equal to that are
+    dropped and two are appended, which makes a shorter version compare
+    as if padded (only the first pair can itself be equal to one, as later
+    pairs always start with a non-digit).
+    """
+    pairs = [(letters.translate(_DPKG_ORDER) + '\x02', int(digits) if digits else 0)
+             for letters, digits in _DPKG_PARTS.findall(text) if letters or digits]
+    while pairs and pairs[-1] == _DPKG_END:
+        pairs.pop()
+    pairs.extend((_DPKG_END, _DPKG_END))
+    return tuple(pairs)
+
+def _dpkg_key(version: str) -> tuple:
+    epoch, upstream, revision = _split_evr(version.strip())
+    # No revision compares like revision "0"
+    return epoch, _dpkg_string_key(upstream), _dpkg_string_key(revision or '')
+
+# rpm
+
+_RPM_SEGMENTS = re.compile(r'[0-9]+|[a-zA-Z]+|~|\^')
+_RPM_TILDE = (0,)
+_RPM_END = (1,)
+_RPM_CARET = (2,)
+
+def _rpm_string_key(text: str) -> tuple:
+    """
+    Key of a version or release for rpmvercmp.
+
+    Separators are ignored. "~" sorts before the end of the string, "^"
+    after it but before any further segment, and numeric segments after
+    alphabetic ones.
+    """
+    items = []
+    for segment in _RPM_SEGMENTS.findall(text):
+        if segment == '~':
+            items.append(_RPM_TILDE)
+        elif segment == '^':
+            items.append(_RPM_CARET)
+        elif segment[0].isdigit():
+            items.append((4, int(segment)))
+        else:
+            items.append((3, segment))
+    items.append(_RPM_END)
+    return tuple(items)
+
+def _rpm_key(version: str) -> tuple:
+    epoch, upstream, release = _split_evr(version.strip())
+    return epoch, _rpm_string_key(upstream), _rpm_string_key(release or '')
+
+# pacman
+
+_PACMAN_SEGMENTS = re.compile(r'([^a-zA-Z0-9]*)([0-9]+|[a-zA-Z]+)')
+_PACMAN_TRAILING = re.compile(r'[^a-zA-Z0-9]*$')
+
+def _pacman_parse(text: str) -> tuple:
+    """
+    Parse a version for libalpm's rpmvercmp.
+
+    Returns:
+        Tuple of (separator length, is numeric, value) segments, and the
+        length of the separators after the last segment
+    """
+    segments = []
+    for separator, segment in _PACMAN_SEGMENTS.findall(text):
+        if segment[0].isdigit():
+            segments.append((len(separator), True, int(segment)))
+        else:
+            segments.append((len(separator), False, segment))
+    return tuple(segments), len(_PACMAN_TRAILING.search(text).group())
+
+def _pacman_starts_alpha(segments: tuple, position: int, skipped: bool) -> bool:
+    """Whether what is left after the common segments starts with a letter."""
+    if len(segments) <= position:
+        return False
+    separator, numeric, _ = segments[position]
+    return (skipped or separator == 0) and not numeric
+
+def _pacman_vercmp(one: tuple, two: tuple) -> int:
+    """Compare two parsed versions like libalpm's rpmvercmp."""
+    (segments_one, trailing_one), (segments_two, trailing_two) = one, two
+    for (separator_one, numeric_one, value_one), (separator_two, numeric_two, value_two) in zip(segments_one, segments_two):
+        # More separators before a segment make the version newer
+        if separator_one != separator_two:
+            return -1 if separator_one < separator_two else 1
+        # A number is newer than letters
+        if numeric_one != numeric_two:
+            return 1 if numeric_one else -1
+        if value_one != value_two:
+            return -1 if value_one < value_two else 1
+
+    # Separators are only skipped while both versions have characters left
+    common = min(len(segments_one), len(segments_two))
+    skipped = ((len(segments_one) > common or trailing_one > 0)
+               and (len(segments_two) > common or trailing_two > 0))
+    end_one = len(segments_one) == common and (skipped or not trailing_one)
+    end_two = len(segments_two) == common and (skipped or not trailing_two)
+    if end_one and end_two:
+        return 0
+    # A remaining alphabetic segment is older than the end of the other
+    # version; anything else left over is newer
+    alpha_one = not end_one and _pacman_starts_alpha(segments_one, common, skipped)
+    alpha_two = not end_two and _pacman_starts_alpha(segments_two, common, skipped)
+    if (end_one and not alpha_two) or alpha_one:
+        return -1
+    return 1
+
+class _PacmanKey:
+    """
+    Sortable key for pacman versions.
+
+    libalpm weighs the length of separators against segments, and what
+    is left of the longer version against the end of the shorter one, in
+    ways a plain tuple cannot express, so this compares through vercmp.
+    """
+
+    __slots__ = ('text', 'epoch', 'version', 'release')
+
+    def __init__(self, version: str):
+        self.text = version.strip()
+        epoch, upstream, release = _split_evr(self.text)
+        self.epoch = epoch
+        self.version = _pacman_parse(upstream)
+        self.release = _pacman_parse(release) if release is not None else None
+
+    def _compare(self, other: '_PacmanKey') -> int:
+        if self.text == other.text:
+            return 0
+        if self.epoch != other.epoch:
+            return -1 if self.epoch < other.epoch else 1
+        result = _pacman_vercmp(self.version, other.version)
+        # The release only counts when both versions have one
+        if result == 0 and self.release is not None and other.release is not None:
+            result = _pacman_vercmp(self.release, other.release)
+        return result
+
+    def __lt__(self, other: '_PacmanKey') -> bool:
+        return self._compare(other) < 0
+
+    def __gt__(self, other: '_PacmanKey') -> bool:
+        return self._compare(other) > 0
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _PacmanKey) and self._compare(other) == 0
+
+    def __hash__(self):
+        return hash(self.epoch)
+
+DPKG = VersionScheme('dpkg', _dpkg_key)
+RPM = VersionScheme('rpm', _rpm_key)
+PACMAN = VersionScheme('pacman', _PacmanKey)
@@ -0,0 +1,98 @@
+"""Live inventory updates for Orbit."""
+
+import os
+import threading
+from gi.repository import Gio, GLib
+from utils.logger import setup_logger
+
+logger = setup_logger('orbit.watcher')
+
+class InventoryWatcher:
+    """
+    Watches package databases and rescans only the source that changed.
+
+    Package managers touch their databases many times during a single
+    transaction, so events are debounced per source: a rescan starts once
+    the source has been quiet for DEBOUNCE_MS.
+    """
+
+    DEBOUNCE_MS = 1500
+
+    def __init__(self, manager, on_changes):
+        """
+        Args:
+            manager: OrbitManager whose inventory should be kept current
+            on_changes: Called on the main loop as on_changes(apps, changes)
+                with the format returned by OrbitManager.diff_apps
+        """
+        self.manager = manager
+        self.on_changes = on_changes
+        self._monitors = []
+        self._pending = {}  # source -> GLib timeout id
+        self._running = set()
+        self._dirty = set()
+
+    def start(self):
+        """Install file monitors for every adapter's watch paths."""
+        for source, adapter in self.manager.registry.items():
+            for path in adapter.get_watch_paths():
+                gfile = Gio.File.new_for_path(path)
+                try:
+                    if os.path.isdir(path):
+                        monitor = gfile.monitor_directory(Gio.FileMonitorFlags.WATCH_MOVES, None)
+                    else:
+                        # Also reports the file being created or replaced
+                        monitor = gfile.monitor_file(Gio.FileMonitorFlags.WATCH_MOVES, None)
+                except GLib.Error as e:
+                    logger.warning(f"Cannot watch {path}: {e.message}")
+                    continue
+                monitor.connect("changed", self._on_changed, source)
+                self._monitors.append(monitor)
+        logger.info(f"Watching {len(self._monitors)} paths for inventory changes")
+
+    def stop(self):
+        """Cancel all monitors and pending rescans."""
+        for monitor in self._monitors:
+            monitor.cancel()
+        self._monitors = []
+        for timeout_id in self._pending.values():
+            GLib.source_remove(timeout_id)
+        self._pending = {}
+
+    def _on_changed(self, monitor, file, other_file, event_type, source):
+        if event_type == Gio.FileMonitorEvent.ATTRIBUTE_CHANGED:
+            return
+        if source in self._pending:
+            GLib.source_remove(self._pending[source])
+        self._pending[source] = GLib.timeout_add(self.DEBOUNCE_MS, self._on_quiet, source)
+
+    def _on_quiet(self, source):
+        self._pending.pop(source, None)
+        if source in self._running:
+            # Rescan again once the current one finishes
+            self._dirty.add(source)
+        else:
+            self._rescan(source)
+        return GLib.SOURCE_REMOVE
+
+    def _rescan(self, source):
+        self._running.add(source)
+
+        def run():
+            try:
+                changes = self.manager.refresh_source(source)
+            except Exception as e:
+                logger.error(f"Error rescanning {source.value}: {e}")
+                changes = None
+            GLib.idle_add(self._on_rescanned, source, changes)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _on_rescanned(self, source, changes):
+        self._running.discard(source)
+        if changes and (changes['removed'] or changes['added']):
+            self.on_changes(self.manager.apps, changes)
+        if source in self._dirty:
+            self._dirty.discard(source)
+            self._rescan(source)
+        return GLib.SOURCE_REMOVE